@@ -0,0 +1,67 @@
+"""Build hook that ships prebuilt persona snapshots in the wheel."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from hatchling.builders.hooks.plugin.interface import BuildHookInterface
+
+
+class PersonaSnapshotsBuildHook(BuildHookInterface):
+    PLUGIN_NAME = "custom"
+
+    def initialize(self, version: str, build_data: dict[str, Any]) -> None:
+        # Editable installs read the persona definitions from the source tree.
+        if self.target_name != "wheel" or version == "editable":
+            return
+
+        src = Path(self.root) / "src"
+        sys.path.insert(0, str(src))
+        try:
+            self._write_snapshots(src=src, build_data=build_data)
+        finally:
+            sys.path.remove(str(src))
+
+    def _write_snapshots(self, src: Path, build_data: dict[str, Any]) -> None:
+        from _gettsim_personas.persona_objects import (  # noqa: PLC0415
+            OrigPersonaOverTime,
+        )
+        from gettsim_personas import (  # noqa: PLC0415
+            einkommensteuer_sozialabgaben,
+            gesetzliche_altersrente,
+            grundsicherung_für_erwerbsfähige,
+            grundsicherung_im_alter,
+        )
+
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = Path(self._tmp_dir.name)
+        for submodule in (
+            einkommensteuer_sozialabgaben,
+            gesetzliche_altersrente,
+            grundsicherung_für_erwerbsfähige,
+            grundsicherung_im_alter,
+        ):
+            for name in dir(submodule):
+                persona = getattr(submodule, name)
+                if not isinstance(persona, OrigPersonaOverTime):
+                    continue
+                relative_path = persona.path_to_persona_elements.relative_to(src)
+                snapshot_path = (
+                    relative_path.parent / "_snapshots" / relative_path.stem
+                ).as_posix()
+                persona.write_snapshot(tmp_path / snapshot_path)
+                build_data["force_include"][str(tmp_path / snapshot_path)] = (
+                    snapshot_path
+                )
+
+    def finalize(
+        self,
+        version: str,  # noqa: ARG002
+        build_data: dict[str, Any],  # noqa: ARG002
+        artifact_path: str,  # noqa: ARG002
+    ) -> None:
+        if hasattr(self, "_tmp_dir"):
+            self._tmp_dir.cleanup()
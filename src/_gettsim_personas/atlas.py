@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import functools
+import hashlib
+import importlib.metadata
+import inspect
+import json
+import sys
+import types
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.cli import iter_sweep, sweep_tasks
+from _gettsim_personas.instrumentation import stage
+from _gettsim_personas.registry import persona_registry
+from _gettsim_personas.result_files import (
+    _fail_if_output_suffix_is_invalid,
+    _fail_if_pyarrow_is_missing,
+    write_results,
+)
+from _gettsim_personas.snapshots import source_hash
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from _gettsim_personas.persona_objects import OrigPersonaOverTime
+
+ATLAS_FORMAT_VERSION = 1
+_MANIFEST_FILENAME = "manifest.json"
+
+
+@dataclass(frozen=True)
+class AtlasBuildReport:
+    """Outcome of `PersonaAtlas.build`.
+
+    Attributes:
+        recomputed:
+            The (persona name, policy date) pairs that were evaluated.
+        reused:
+            The pairs whose stored results were up to date.
+    """
+
+    recomputed: tuple[tuple[str, datetime.date], ...]
+    reused: tuple[tuple[str, datetime.date], ...]
+
+
+class PersonaAtlas:
+    """The targets of personas for many policy dates, stored on disk.
+
+    Results are stored in one file per persona and policy date, partitioned as
+    `persona=<name>/policy_date=<date>/results.<suffix>`. A manifest records a
+    fingerprint of everything the results depend on:
+
+    - the source of the persona definition, including the local modules it imports,
+      and the period of `active_periods` containing the policy date,
+    - GETTSIM's policy objects affecting the policy date, i.e. the values of the
+      parameters and the source of the functions active at that date,
+    - the versions of GETTSIM and the ttsim engine.
+
+    Rebuilding only evaluates the pairs whose fingerprint changed. Changing a
+    parameter value touches the years from its date on, changing a function the years
+    it is active in; a new version of GETTSIM or ttsim touches all pairs.
+
+    Example:
+        >>> atlas = PersonaAtlas(Path("atlas"))
+        >>> report = atlas.build(
+        ...     [datetime.date(year, 1, 1) for year in range(1950, 2026)], jobs=8
+        ... )
+        >>> atlas.load(
+        ...     "einkommensteuer_sozialabgaben.Couple1Child", datetime.date(2025, 1, 1)
+        ... )
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        personas: dict[str, OrigPersonaOverTime] | None = None,
+        suffix: str = ".npz",
+    ) -> None:
+        """Create an atlas at *path*.
+
+        Args:
+            path:
+                The directory of the atlas.
+            personas:
+                (Optional) The personas to include, by their name in
+                `persona_registry()`, see `select_personas`. Defaults to all personas.
+            suffix:
+                The format of the result files, one of `OUTPUT_SUFFIXES`.
+        """
+        _fail_if_output_suffix_is_invalid(Path(f"results{suffix}"))
+        _fail_if_pyarrow_is_missing(Path(f"results{suffix}"))
+        self.path = path
+        self.personas = personas if personas is not None else persona_registry()
+        self.suffix = suffix
+
+    def partition_path(self, persona_name: str, policy_date: datetime.date) -> Path:
+        """The file holding the results of *persona_name* at *policy_date*."""
+        return (
+            self.path
+            / f"persona={persona_name}"
+            / f"policy_date={policy_date.isoformat()}"
+            / f"results{self.suffix}"
+        )
+
+    def build(
+        self,
+        policy_dates: Iterable[datetime.date],
+        jobs: int = 1,
+    ) -> AtlasBuildReport:
+        """Evaluate all personas at *policy_dates* whose stored results are stale.
+
+        Args:
+            policy_dates:
+                The policy dates. Personas are skipped at dates they are not defined
+                for.
+            jobs:
+                The number of worker processes, see `run_sweep`.
+
+        Returns:
+            The pairs that were recomputed and reused.
+        """
+        tasks = sweep_tasks(personas=self.personas, policy_dates=list(policy_dates))
+        manifest = self._read_manifest()
+        with stage("atlas_fingerprints"):
+            fingerprints = _Fingerprints(self.personas)
+            current = {
+                _manifest_key(t.persona_name, t.policy_date): fingerprints(
+                    persona_name=t.persona_name, policy_date=t.policy_date
+                )
+                for t in tasks
+            }
+        stale = sorted(
+            (
+                t
+                for t in tasks
+                if manifest.get(_manifest_key(t.persona_name, t.policy_date))
+                != current[_manifest_key(t.persona_name, t.policy_date)]
+                or not self.partition_path(t.persona_name, t.policy_date).is_file()
+            ),
+            key=lambda t: t.policy_date,
+        )
+        for task, (table, _) in iter_sweep(stale, jobs=jobs):
+            write_results(
+                table, path=self.partition_path(task.persona_name, task.policy_date)
+            )
+            key = _manifest_key(task.persona_name, task.policy_date)
+            manifest[key] = current[key]
+            # Results arrive one by one; write the manifest after each of them, so
+            # that an interrupted build keeps its progress.
+            self._write_manifest(manifest)
+
+        stale_keys = {(t.persona_name, t.policy_date) for t in stale}
+        return AtlasBuildReport(
+            recomputed=tuple((t.persona_name, t.policy_date) for t in stale),
+            reused=tuple(
+                (t.persona_name, t.policy_date)
+                for t in tasks
+                if (t.persona_name, t.policy_date) not in stale_keys
+            ),
+        )
+
+    def load(
+        self,
+        persona_name: str,
+        policy_date: datetime.date,
+    ) -> dict[str, np.ndarray]:
+        """The stored flat results of *persona_name* at *policy_date*."""
+        path = self.partition_path(persona_name, policy_date)
+        if self.suffix == ".npz":
+            with np.load(path, allow_pickle=False) as table:
+                return dict(table)
+        import pyarrow.parquet as pq  # noqa: PLC0415
+
+        table = pq.read_table(path)
+        return {
+            name: column.to_numpy()
+            for name, column in zip(table.column_names, table.columns, strict=True)
+        }
+
+    def _read_manifest(self) -> dict[str, str]:
+        path = self.path / _MANIFEST_FILENAME
+        if not path.is_file():
+            return {}
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest["format_version"] != ATLAS_FORMAT_VERSION:
+            return {}
+        return manifest["fingerprints"]
+
+    def _write_manifest(self, fingerprints: dict[str, str]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "format_version": ATLAS_FORMAT_VERSION,
+            "versions": _package_versions(),
+            "fingerprints": dict(sorted(fingerprints.items())),
+        }
+        tmp_path = self.path / f"{_MANIFEST_FILENAME}.tmp"
+        tmp_path.write_text(
+            json.dumps(manifest, indent=1, ensure_ascii=False), encoding="utf-8"
+        )
+        tmp_path.replace(self.path / _MANIFEST_FILENAME)
+
+
+class _Fingerprints:
+    """Fingerprints of (persona, policy date) pairs, see `PersonaAtlas`.
+
+    GETTSIM's policy objects are loaded and hashed once, instead of creating the
+    policy environment of each date.
+    """
+
+    def __init__(self, personas: dict[str, OrigPersonaOverTime]) -> None:
+        self.personas = personas
+        self._dated_digests = dated_policy_object_digests(
+            evaluation.orig_policy_objects()
+        )
+        self._versions = json.dumps(_package_versions(), sort_keys=True)
+        self._environment_digests: dict[datetime.date, str] = {}
+
+    def __call__(self, persona_name: str, policy_date: datetime.date) -> str:
+        if policy_date not in self._environment_digests:
+            self._environment_digests[policy_date] = policy_environment_digest(
+                self._dated_digests, policy_date=policy_date
+            )
+        digest = hashlib.sha256(f"{ATLAS_FORMAT_VERSION};{self._versions}".encode())
+        digest.update(self._environment_digests[policy_date].encode())
+        digest.update(
+            persona_digest(
+                self.personas[persona_name], policy_date=policy_date
+            ).encode()
+        )
+        return digest.hexdigest()
+
+
+def persona_digest(
+    orig_persona: OrigPersonaOverTime, policy_date: datetime.date
+) -> str:
+    """Hash of the definition of *orig_persona* at *policy_date*.
+
+    Covers the source of the persona definition, including the local modules it
+    imports (see `source_hash`), and the period of `active_periods` containing
+    *policy_date*. The set of active elements does not change within that period.
+    """
+    period = next(
+        (
+            (start, end)
+            for start, end in orig_persona.active_periods()
+            if start <= policy_date <= end
+        ),
+        None,
+    )
+    return hashlib.sha256(
+        f"{source_hash(orig_persona.path_to_persona_elements)};{period}".encode()
+    ).hexdigest()
+
+
+def dated_policy_object_digests(
+    orig_policy_objects: dict[tuple[str, ...], Any],
+) -> list[tuple[datetime.date, datetime.date, str]]:
+    """Hashes of GETTSIM's policy objects with the first and last date they affect.
+
+    A function affects the dates it is active at. A parameter value affects all dates
+    from the date it is specified for on, because later values may update it. The
+    remaining entries of a parameter specification (e.g. its unit) affect all dates.
+    """
+    dated_digests = []
+    for key, orig_object in sorted(orig_policy_objects.items()):
+        if isinstance(orig_object, dict):
+            for spec_key, value in orig_object.items():
+                start_date = (
+                    spec_key
+                    if isinstance(spec_key, datetime.date)
+                    else datetime.date.min
+                )
+                dated_digests.append(
+                    (
+                        start_date,
+                        datetime.date.max,
+                        _sha256(f"{key}[{spec_key}]={_element_digest(value)}"),
+                    )
+                )
+        else:
+            dated_digests.append(
+                (
+                    orig_object.start_date,
+                    orig_object.end_date,
+                    _sha256(f"{key}={_element_digest(orig_object)}"),
+                )
+            )
+    return dated_digests
+
+
+def policy_environment_digest(
+    dated_digests: list[tuple[datetime.date, datetime.date, str]],
+    policy_date: datetime.date,
+) -> str:
+    """Hash of the policy objects that affect the policy environment at *policy_date*.
+
+    Args:
+        dated_digests:
+            The hashes of the policy objects, see `dated_policy_object_digests`.
+        policy_date:
+            The policy date.
+    """
+    digest = hashlib.sha256()
+    for start_date, end_date, object_digest in dated_digests:
+        if start_date <= policy_date <= end_date:
+            digest.update(object_digest.encode())
+    return digest.hexdigest()
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _element_digest(element: Any) -> str:
+    with np.printoptions(threshold=sys.maxsize):
+        return _stable_repr(element)
+
+
+def _stable_repr(obj: Any) -> str:
+    """Like `repr`, but without memory addresses, which differ between processes."""
+    if isinstance(obj, dict):
+        items = ", ".join(f"{k!r}: {_stable_repr(v)}" for k, v in obj.items())
+        return f"{{{items}}}"
+    if isinstance(obj, list | tuple):
+        return f"[{', '.join(_stable_repr(v) for v in obj)}]"
+    if isinstance(obj, functools.partial):
+        return f"partial({_stable_repr([obj.func, obj.args, obj.keywords])})"
+    attributes = _attributes(obj)
+    if attributes is not None:
+        fields = ", ".join(
+            f"{a}={_stable_repr(getattr(obj, a))}"
+            for a in attributes
+            if hasattr(obj, a)
+        )
+        return f"{type(obj).__name__}({fields})"
+    if callable(obj) and not isinstance(obj, type):
+        return _function_source(obj)
+    return obj.__name__ if isinstance(obj, types.ModuleType) else repr(obj)
+
+
+def _attributes(obj: Any) -> list[str] | None:
+    """The attributes that define *obj*, None if its repr does not hide them."""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return [f.name for f in dataclasses.fields(obj)]
+    if type(obj).__repr__ is object.__repr__ and not callable(obj):
+        return list(getattr(obj, "__slots__", ())) or list(vars(obj))
+    return None
+
+
+def _function_source(function: Callable[..., Any]) -> str:
+    try:
+        return inspect.getsource(function)
+    except (OSError, TypeError):
+        return f"{function.__module__}.{getattr(function, '__qualname__', '')}"
+
+
+def _package_versions() -> dict[str, str]:
+    return {
+        package: importlib.metadata.version(package)
+        for package in ("gettsim", "ttsim-backend")
+    }
+
+
+def _manifest_key(persona_name: str, policy_date: datetime.date) -> str:
+    return f"{persona_name}/{policy_date.isoformat()}"
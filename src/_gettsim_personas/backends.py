@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Literal
+
+import dags.tree as dt
+import numpy as np
+
+if TYPE_CHECKING:
+    from types import ModuleType
+
+    from _gettsim_personas.typing import NestedData
+
+Backend = Literal["numpy", "jax"]
+
+
+def to_backend(
+    qname_data: dict[str, np.ndarray],
+    backend: Backend,
+) -> dict[str, np.ndarray]:
+    """Convert the arrays of *qname_data* to arrays of *backend*.
+
+    JAX arrays are placed on JAX's default device, which is the CPU if no
+    accelerator is available.
+    """
+    _fail_if_backend_is_invalid(backend)
+    xnp = jax_numpy() if backend == "jax" else np
+    return {qname: xnp.asarray(array) for qname, array in qname_data.items()}
+
+
+def backend_of(input_data_tree: NestedData) -> Backend:
+    """The backend of the arrays in *input_data_tree*."""
+    is_jax = (
+        type(array).__module__.startswith("jax")
+        for array in dt.flatten_to_qnames(input_data_tree).values()
+    )
+    return "jax" if any(is_jax) else "numpy"
+
+
+def jax_module() -> ModuleType:
+    """JAX, with a helpful error if it is not installed."""
+    try:
+        import jax  # noqa: PLC0415
+    except ImportError as e:
+        msg = (
+            "The JAX backend requires jax. Install it via "
+            "`pip install gettsim-personas[jax]`."
+        )
+        raise ImportError(msg) from e
+    return jax
+
+
+def jax_numpy() -> ModuleType:
+    """JAX's NumPy API, see `jax_module`."""
+    return jax_module().numpy
+
+
+def _fail_if_backend_is_invalid(backend: str) -> None:
+    if backend not in ("numpy", "jax"):
+        msg = f"backend must be 'numpy' or 'jax', got {backend!r}."
+        raise ValueError(msg)
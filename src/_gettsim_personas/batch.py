@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import dags.tree as dt
+import numpy as np
+
+from _gettsim_personas.instrumentation import stage
+from _gettsim_personas.upsert import (
+    broadcast_column,
+    column_role,
+    dense_group_ids,
+    smallest_int_dtype,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from _gettsim_personas.typing import NestedData
+    from _gettsim_personas.upsert import ColumnRole
+
+
+class PersonaBatch:
+    """Flat, columnar input data of one or more households.
+
+    Persona operations work on flat columns; the nested tree GETTSIM expects is only
+    created via `to_tree`.
+
+    Attributes:
+        columns:
+            The input columns by qualified name, in order.
+        n_rows:
+            The number of rows (persons).
+        household_offsets:
+            The first row of each household followed by `n_rows`, so that household
+            `i` spans `household_offsets[i]:household_offsets[i + 1]`.
+        roles:
+            The role of each column, see `column_role`.
+    """
+
+    __slots__ = ("columns", "household_offsets", "n_rows", "roles")
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        roles: dict[str, ColumnRole] | None = None,
+        household_offsets: np.ndarray | None = None,
+    ) -> None:
+        self.columns = columns
+        self.n_rows = len(columns["p_id"])
+        self.roles = (
+            roles
+            if roles is not None
+            else {qname: column_role(qname) for qname in columns}
+        )
+        self.household_offsets = (
+            household_offsets
+            if household_offsets is not None
+            else _household_offsets(hh_id=columns.get("hh_id"), n_rows=self.n_rows)
+        )
+
+    @classmethod
+    def from_tree(cls, input_data_tree: NestedData) -> PersonaBatch:
+        """Create a batch from nested input data."""
+        return cls(
+            {
+                qname: np.asarray(array)
+                for qname, array in dt.flatten_to_qnames(input_data_tree).items()
+            }
+        )
+
+    def to_tree(self) -> NestedData:
+        """The nested input data, as expected by GETTSIM."""
+        return dt.unflatten_from_qnames(self.columns)
+
+    @property
+    def n_households(self) -> int:
+        return len(self.household_offsets) - 1
+
+    def household_values_to_rows(self, values: np.ndarray) -> np.ndarray:
+        """Assign one value per household to all of its members.
+
+        *values* may hold values for several copies of the batch (see `replicate`);
+        its length must be a multiple of `n_households`.
+        """
+        n_copies = len(values) // self.n_households
+        return np.repeat(
+            values, np.tile(np.diff(self.household_offsets), n_copies), axis=0
+        )
+
+    def replicate(self, n_copies: int) -> PersonaBatch:
+        """Stack *n_copies* of the batch, each copy forming its own households."""
+        return PersonaBatch(
+            columns={
+                qname: broadcast_column(
+                    role=self.roles[qname],
+                    array=array,
+                    expected_length=n_copies * self.n_rows,
+                )
+                for qname, array in self.columns.items()
+            },
+            roles=self.roles,
+            household_offsets=self._replicated_household_offsets(n_copies),
+        )
+
+    def upsert(self, data_to_upsert: dict[str, np.ndarray]) -> PersonaBatch:
+        """Copy the batch to the length of *data_to_upsert* and insert its columns.
+
+        The length of *data_to_upsert* must be a multiple of `n_rows`, see
+        `Persona.upsert_input_data`.
+        """
+        with stage("upsert_input_data") as s:
+            data_to_upsert = {
+                qname: np.asarray(array) for qname, array in data_to_upsert.items()
+            }
+            n_copies = len(next(iter(data_to_upsert.values()))) // self.n_rows
+            columns = {
+                qname: data_to_upsert[qname]
+                if qname in data_to_upsert
+                else broadcast_column(
+                    role=self.roles[qname],
+                    array=array,
+                    expected_length=n_copies * self.n_rows,
+                )
+                for qname, array in self.columns.items()
+            }
+            columns.update(data_to_upsert)
+            s.add_arrays(columns)
+        return PersonaBatch(
+            columns=columns,
+            roles={**self.roles, **{q: column_role(q) for q in data_to_upsert}},
+            household_offsets=None
+            if "hh_id" in data_to_upsert
+            else self._replicated_household_offsets(n_copies),
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence[PersonaBatch]) -> PersonaBatch:
+        """Stack *batches* with the same columns, re-keying IDs and pointers.
+
+        Like `replicate`, but for batches of different personas.
+        """
+        n_rows = np.array([b.n_rows for b in batches])
+        row_offsets = np.cumsum(n_rows) - n_rows
+        first = batches[0]
+        columns = {}
+        for qname, role in first.roles.items():
+            arrays = [b.columns[qname] for b in batches]
+            if role == "p_id":
+                columns[qname] = np.arange(n_rows.sum())
+            elif role == "foreign_key":
+                array = np.concatenate(arrays)
+                offsets = np.repeat(row_offsets, n_rows)
+                columns[qname] = np.where(array >= 0, array + offsets, array)
+            elif role == "group_id":
+                dense = [dense_group_ids(a) for a in arrays]
+                n_groups = np.array([n for _, n in dense])
+                offsets = np.repeat(np.cumsum(n_groups) - n_groups, n_rows)
+                array = np.concatenate([ids for ids, _ in dense])
+                columns[qname] = np.where(array >= 0, array + offsets, -1).astype(
+                    smallest_int_dtype(n_groups.sum() - 1)
+                )
+            else:
+                columns[qname] = np.concatenate(arrays)
+        return cls(
+            columns=columns,
+            roles=first.roles,
+            household_offsets=np.append(
+                np.concatenate(
+                    [
+                        b.household_offsets[:-1] + offset
+                        for b, offset in zip(batches, row_offsets, strict=True)
+                    ]
+                ),
+                n_rows.sum(),
+            ),
+        )
+
+    def _replicated_household_offsets(self, n_copies: int) -> np.ndarray:
+        first_rows = (
+            np.arange(n_copies)[:, None] * self.n_rows + self.household_offsets[:-1]
+        )
+        return np.append(first_rows.ravel(), n_copies * self.n_rows)
+
+    def slice_households(self, start: int, stop: int) -> PersonaBatch:
+        """Households `start` to `stop` (exclusive), as views of the columns.
+
+        IDs and pointers keep their values, so that results can be matched with the
+        full batch.
+        """
+        first_row = self.household_offsets[start]
+        rows = slice(first_row, self.household_offsets[stop])
+        return PersonaBatch(
+            columns={qname: array[rows] for qname, array in self.columns.items()},
+            roles=self.roles,
+            household_offsets=self.household_offsets[start : stop + 1] - first_row,
+        )
+
+
+def _household_offsets(hh_id: np.ndarray | None, n_rows: int) -> np.ndarray:
+    if hh_id is None or n_rows == 0:
+        return np.array([0, n_rows])
+    first_rows = np.flatnonzero(np.r_[True, hh_id[1:] != hh_id[:-1]])
+    return np.append(first_rows, n_rows)
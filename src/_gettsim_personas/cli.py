@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import argparse
+import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import dags.tree as dt
+import numpy as np
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.persona_objects import LinspaceRange, bruttolohn_m_grid_values
+from _gettsim_personas.registry import persona_registry, select_personas
+from _gettsim_personas.result_files import (
+    _fail_if_output_suffix_is_invalid,
+    _fail_if_pyarrow_is_missing,
+    write_results,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+    from _gettsim_personas.persona_objects import OrigPersonaOverTime, Persona
+
+
+@dataclass(frozen=True)
+class SweepTask:
+    """A single persona evaluation in a sweep.
+
+    Only contains names and plain values so that it can be sent to worker processes.
+    """
+
+    persona_name: str
+    policy_date: datetime.date
+    grid: tuple[tuple[int, LinspaceRange | float], ...] = ()
+    n_points: int = 1
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Entry point of the `gettsim-personas` console script."""
+    parser = _make_parser()
+    args = parser.parse_args(argv)
+    try:
+        personas = select_personas(args.personas)
+        policy_dates = _parse_policy_dates(years=args.years, dates=args.dates)
+        grid = tuple(_parse_grid_spec(spec) for spec in args.grid)
+        _fail_if_output_suffix_is_invalid(args.output)
+        _fail_if_pyarrow_is_missing(args.output)
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    tasks = sweep_tasks(
+        personas=personas,
+        policy_dates=policy_dates,
+        grid=grid,
+        n_points=args.n_points,
+    )
+    start = time.perf_counter()
+    results, n_households = run_sweep(tasks, jobs=args.jobs)
+    elapsed = time.perf_counter() - start
+    write_results(stack_results(results), path=args.output)
+
+    print(  # noqa: T201
+        f"Evaluated {len(tasks)} persona-date combinations with {n_households} "
+        f"households in {elapsed:.2f}s "
+        f"({n_households / elapsed:.1f} households/second)."
+    )
+    return 0
+
+
+def sweep_tasks(
+    personas: dict[str, OrigPersonaOverTime],
+    policy_dates: list[datetime.date],
+    grid: tuple[tuple[int, LinspaceRange | float], ...] = (),
+    n_points: int = 1,
+) -> list[SweepTask]:
+    """Combinations of *personas* and the *policy_dates* they are defined for."""
+    return [
+        SweepTask(
+            persona_name=name,
+            policy_date=policy_date,
+            grid=tuple((p, value) for p, value in grid if p < persona.persona_size),
+            n_points=n_points,
+        )
+        for policy_date in policy_dates
+        for name, persona in personas.items()
+        if persona.start_date <= policy_date <= persona.end_date
+    ]
+
+
+def run_sweep(
+    tasks: list[SweepTask], jobs: int = 1
+) -> tuple[list[dict[str, np.ndarray]], int]:
+    """Evaluate all *tasks*, in *jobs* worker processes if larger than one.
+
+    Tasks are sorted by policy date so that each worker process can reuse the policy
+    environments it created.
+
+    Returns:
+        The flat results of all tasks and the total number of households evaluated.
+    """
+    outcomes = [outcome for _, outcome in iter_sweep(tasks, jobs=jobs)]
+    return [results for results, _ in outcomes], sum(n for _, n in outcomes)
+
+
+def iter_sweep(
+    tasks: list[SweepTask], jobs: int = 1
+) -> Iterator[tuple[SweepTask, tuple[dict[str, np.ndarray], int]]]:
+    """Like `run_sweep`, but yield each task with its outcome as soon as it is done.
+
+    Tasks are yielded in the order of their policy dates.
+    """
+    tasks = sorted(tasks, key=lambda task: task.policy_date)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from zip(
+                tasks,
+                executor.map(
+                    evaluate_sweep_task,
+                    tasks,
+                    chunksize=max(1, len(tasks) // (4 * jobs)),
+                ),
+                strict=True,
+            )
+    else:
+        for task in tasks:
+            yield task, evaluate_sweep_task(task)
+
+
+def evaluate_sweep_task(task: SweepTask) -> tuple[dict[str, np.ndarray], int]:
+    """Evaluate a single task.
+
+    Returns:
+        The flat results, including columns identifying the task, and the number of
+        households evaluated.
+    """
+    orig_persona = persona_registry()[task.persona_name]
+    persona = orig_persona(policy_date_str=task.policy_date.isoformat())
+    if task.grid:
+        grid_values = bruttolohn_m_grid_values(
+            _linspace_grid(orig_persona, persona, task)
+        )
+        persona = persona.upsert_input_data(
+            {"einnahmen": {"bruttolohn_m": grid_values.ravel()}}
+        )
+    results = dt.flatten_to_qnames(
+        evaluation.evaluate(
+            persona,
+            policy_environment=evaluation.cached_policy_environment(task.policy_date),
+        )
+    )
+    n_rows = len(persona.input_data_tree["p_id"])
+    hh_id = persona.input_data_tree.get("hh_id")
+    n_households = len(np.unique(hh_id)) if hh_id is not None else 1
+    return {
+        "persona": np.full(n_rows, task.persona_name),
+        "policy_date": np.full(n_rows, task.policy_date.isoformat()),
+        "p_id": np.asarray(persona.input_data_tree["p_id"]),
+        **{qname: np.asarray(array) for qname, array in results.items()},
+    }, n_households
+
+
+def stack_results(results: list[dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+    """Stack the flat results of several tasks into a single table.
+
+    Columns missing for some tasks are filled with NaN.
+    """
+    columns = list(dict.fromkeys(qname for r in results for qname in r))
+    stacked: dict[str, np.ndarray] = {}
+    for column in columns:
+        if all(column in r for r in results):
+            stacked[column] = np.concatenate([r[column] for r in results])
+        else:
+            stacked[column] = np.concatenate(
+                [
+                    r[column].astype(float)
+                    if column in r
+                    else np.full(len(r["p_id"]), np.nan)
+                    for r in results
+                ]
+            )
+    return stacked
+
+
+def _make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="gettsim-personas",
+        description="Evaluate personas with GETTSIM over a range of policy dates.",
+    )
+    parser.add_argument(
+        "personas",
+        nargs="+",
+        help=(
+            "Persona names or glob patterns, e.g. 'grundsicherung_im_alter.*'. "
+            "Names have the form '<area>.<persona>'."
+        ),
+    )
+    parser.add_argument(
+        "--years",
+        help="A year (2020) or an inclusive range of years (2010:2020). Policy dates "
+        "are January 1st of each year.",
+    )
+    parser.add_argument(
+        "--dates",
+        nargs="+",
+        default=[],
+        help="Policy dates as dashed ISO strings (2020-07-01).",
+    )
+    parser.add_argument(
+        "--grid",
+        action="append",
+        default=[],
+        metavar="pN=VALUE|pN=BOTTOM:TOP",
+        help=(
+            "Linspace grid of einnahmen__bruttolohn_m for the member with p_id N, "
+            "either a constant or a range. Can be given several times. Members "
+            "without a spec keep their default earnings; specs for p_ids a persona "
+            "does not have are ignored."
+        ),
+    )
+    parser.add_argument(
+        "--n-points",
+        type=_positive_int,
+        default=10,
+        help="Number of grid points (default: 10).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=_positive_int,
+        default=1,
+        help="Number of worker processes (default: 1).",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        required=True,
+        help="Output file, either .parquet or .npz.",
+    )
+    return parser
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        msg = f"must be at least 1, got: {number}"
+        raise argparse.ArgumentTypeError(msg)
+    return number
+
+
+def _parse_policy_dates(years: str | None, dates: list[str]) -> list[datetime.date]:
+    policy_dates = [datetime.date.fromisoformat(d) for d in dates]
+    if years:
+        first, _, last = years.partition(":")
+        policy_dates.extend(
+            datetime.date(year, 1, 1)
+            for year in range(int(first), int(last or first) + 1)
+        )
+    if not policy_dates:
+        msg = "Specify policy dates via --years and/or --dates."
+        raise ValueError(msg)
+    return sorted(set(policy_dates))
+
+
+def _parse_grid_spec(spec: str) -> tuple[int, LinspaceRange | float]:
+    p, sep, value = spec.partition("=")
+    if not sep or not p.startswith("p") or not p[1:].isdigit():
+        msg = f"Invalid grid spec: '{spec}'. Expected 'pN=VALUE' or 'pN=BOTTOM:TOP'."
+        raise ValueError(msg)
+    bottom, sep, top = value.partition(":")
+    return int(p[1:]), LinspaceRange(float(bottom), float(top)) if sep else float(value)
+
+
+def _linspace_grid(
+    orig_persona: OrigPersonaOverTime, base_persona: Persona, task: SweepTask
+):
+    default_bruttolohn_m = dt.flatten_to_qnames(base_persona.input_data_tree).get(
+        "einnahmen__bruttolohn_m", np.zeros(orig_persona.persona_size)
+    )
+    values: dict[str, LinspaceRange | float] = {
+        f"p{p}": float(value) for p, value in enumerate(default_bruttolohn_m)
+    }
+    values.update({f"p{p}": value for p, value in task.grid})
+    return orig_persona.LinspaceGrid(n_points=task.n_points, **values)
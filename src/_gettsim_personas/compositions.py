@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import dags.tree as dt
+import numpy as np
+
+from _gettsim_personas.instrumentation import stage
+from _gettsim_personas.persona_objects import Persona
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+# Pointers derived from the household structure. Partners point to each other,
+# children to the first or second adult of their household.
+PARTNER_POINTER_QNAMES = (
+    "familie__p_id_ehepartner",
+    "arbeitslosengeld_2__p_id_einstandspartner",
+    "bürgergeld__p_id_einstandspartner",
+)
+FIRST_PARENT_POINTER_QNAMES = (
+    "familie__p_id_elternteil_1",
+    "kindergeld__p_id_empfänger",
+    "einkommensteuer__abzüge__p_id_kinderbetreuungskostenträger",
+)
+SECOND_PARENT_POINTER_QNAMES = ("familie__p_id_elternteil_2",)
+
+# Change of the column per year of age.
+AGE_DEPENDENT_QNAMES = {"alter": 1, "alter_monate": 12, "geburtsjahr": -1}
+
+
+@dataclass(frozen=True)
+class HouseholdComposition:
+    """The members of a household created by `compose_households`.
+
+    Attributes:
+        n_adults:
+            Number of adults, 1 (single) or 2 (couple).
+        child_ages:
+            Ages of the children, one entry per child.
+        joint_filing:
+            Whether a couple files taxes jointly. Ignored for singles.
+    """
+
+    n_adults: int = 1
+    child_ages: tuple[int, ...] = ()
+    joint_filing: bool = True
+
+    def __post_init__(self) -> None:
+        _fail_if_composition_is_invalid(self)
+
+    @property
+    def n_members(self) -> int:
+        return self.n_adults + len(self.child_ages)
+
+
+def compose_households(
+    template: Persona,
+    compositions: Sequence[HouseholdComposition],
+) -> Persona:
+    """Create one household per composition from the members of *template*.
+
+    Adults are copies of the template's adults (the second adult of a single
+    template is a copy of the first one), children are copies of the template's first
+    child with the ages set to those of the composition. IDs, pointers, ages and the
+    flags describing the household structure (joint filing, single parent, has
+    children) are derived from the compositions; all other columns are copied.
+
+    All households are stacked into a single persona, the household of
+    `compositions[i]` has `hh_id == i`. A composition sweep therefore is a single
+    GETTSIM call.
+
+    Example:
+        >>> template = grundsicherung_für_erwerbsfähige.Couple1Child(
+        ...     policy_date_str="2025-01-01"
+        ... )
+        >>> persona = compose_households(
+        ...     template,
+        ...     [
+        ...         HouseholdComposition(n_adults=n_adults, child_ages=child_ages)
+        ...         for n_adults in (1, 2)
+        ...         for child_ages in ((), (3,), (3, 8))
+        ...     ],
+        ... )
+
+    Args:
+        template:
+            A persona with a single household, at least one adult, and at least one
+            child if any composition has children.
+        compositions:
+            The households to create.
+
+    Returns:
+        A persona with one household per composition.
+    """
+    _fail_if_template_is_invalid(template=template, compositions=compositions)
+    qname_input_data = dt.flatten_to_qnames(template.input_data_tree)
+    is_child_in_template = qname_input_data["familie__p_id_elternteil_1"] >= 0
+    adult_rows = np.flatnonzero(~is_child_in_template)
+    child_rows = np.flatnonzero(is_child_in_template)
+
+    with stage("compose_households") as s:
+        n_adults = np.array([c.n_adults for c in compositions])
+        n_members = np.array([c.n_members for c in compositions])
+        has_children = n_members > n_adults
+        joint_filing = np.array([c.joint_filing for c in compositions])
+
+        hh_id = np.repeat(np.arange(len(compositions)), n_members)
+        first_p_id = np.repeat(np.cumsum(n_members) - n_members, n_members)
+        p_id = np.arange(len(hh_id))
+        position = p_id - first_p_id
+        is_adult = position < n_adults[hh_id]
+        is_couple = n_adults[hh_id] == 2  # noqa: PLR2004
+
+        template_row = np.where(
+            is_adult,
+            adult_rows[np.minimum(position, len(adult_rows) - 1)],
+            child_rows[0] if len(child_rows) else 0,
+        )
+        composed = {
+            qname: np.take(array, template_row, axis=0)
+            for qname, array in qname_input_data.items()
+        }
+
+        age_offset = np.zeros(len(p_id), dtype=composed["alter"].dtype)
+        age_offset[~is_adult] = (
+            np.fromiter(
+                itertools.chain.from_iterable(c.child_ages for c in compositions),
+                dtype=age_offset.dtype,
+            )
+            - composed["alter"][~is_adult]
+        )
+        for qname, change_per_year in AGE_DEPENDENT_QNAMES.items():
+            if qname in composed:
+                composed[qname] = composed[qname] + change_per_year * age_offset
+
+        partner = np.where(is_adult & is_couple, first_p_id + 1 - position, -1)
+        first_parent = np.where(is_adult, -1, first_p_id)
+        second_parent = np.where(~is_adult & is_couple, first_p_id + 1, -1)
+        derived = {
+            "p_id": p_id,
+            "hh_id": hh_id,
+            **dict.fromkeys(PARTNER_POINTER_QNAMES, partner),
+            **dict.fromkeys(FIRST_PARENT_POINTER_QNAMES, first_parent),
+            **dict.fromkeys(SECOND_PARENT_POINTER_QNAMES, second_parent),
+            "einkommensteuer__gemeinsam_veranlagt": is_adult
+            & is_couple
+            & joint_filing[hh_id],
+            "familie__alleinerziehend": is_adult & ~is_couple & has_children[hh_id],
+            "sozialversicherung__pflege__beitrag__hat_kinder": is_adult
+            & has_children[hh_id],
+        }
+        composed.update(
+            {
+                qname: array.astype(composed[qname].dtype, copy=False)
+                for qname, array in derived.items()
+                if qname in composed
+            }
+        )
+        s.add_arrays(composed)
+
+    return Persona(
+        description=template.description,
+        policy_date=template.policy_date,
+        evaluation_date=template.evaluation_date,
+        input_data_tree=dt.unflatten_from_qnames(composed),
+        tt_targets_tree={"hh_id": None, **template.tt_targets_tree}
+        if len(compositions) > 1
+        else template.tt_targets_tree,
+    )
+
+
+def _fail_if_composition_is_invalid(composition: HouseholdComposition) -> None:
+    if composition.n_adults not in (1, 2):
+        msg = f"n_adults must be 1 or 2, got: {composition.n_adults}."
+        raise ValueError(msg)
+    if any(age < 0 for age in composition.child_ages):
+        msg = f"Ages of children must be non-negative, got: {composition.child_ages}."
+        raise ValueError(msg)
+
+
+def _fail_if_template_is_invalid(
+    template: Persona,
+    compositions: Sequence[HouseholdComposition],
+) -> None:
+    if not compositions:
+        msg = "Specify at least one household composition."
+        raise ValueError(msg)
+    evaluation_dates = np.atleast_1d(template.evaluation_date)
+    if len(evaluation_dates) > 1:
+        msg = "The template persona must have a single evaluation date."
+        raise ValueError(msg)
+    qname_input_data = dt.flatten_to_qnames(template.input_data_tree)
+    missing_qnames = {"alter", "familie__p_id_elternteil_1"} - set(qname_input_data)
+    if missing_qnames:
+        msg = f"The template persona lacks the input columns {sorted(missing_qnames)}."
+        raise ValueError(msg)
+    if "hh_id" in qname_input_data and len(np.unique(qname_input_data["hh_id"])) > 1:
+        msg = "The template persona must consist of a single household."
+        raise ValueError(msg)
+    known_pointers = {
+        *PARTNER_POINTER_QNAMES,
+        *FIRST_PARENT_POINTER_QNAMES,
+        *SECOND_PARENT_POINTER_QNAMES,
+    }
+    unknown_pointers = sorted(
+        qname
+        for qname in qname_input_data
+        if "p_id_" in qname and qname not in known_pointers
+    )
+    if unknown_pointers:
+        msg = (
+            "Cannot derive the following pointers from household compositions: "
+            f"{unknown_pointers}"
+        )
+        raise ValueError(msg)
+    is_child = qname_input_data["familie__p_id_elternteil_1"] >= 0
+    if is_child.all():
+        msg = "The template persona must have at least one adult."
+        raise ValueError(msg)
+    if not is_child.any() and any(c.child_ages for c in compositions):
+        msg = (
+            "The template persona must have a child to create households with children."
+        )
+        raise ValueError(msg)
@@ -0,0 +1,498 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import datetime
+import functools
+import hashlib
+import sys
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import dags.tree as dt
+import numpy as np
+from gettsim import InputData, MainTarget, TTTargets, main, upsert_tree
+
+from _gettsim_personas.backends import _fail_if_backend_is_invalid, backend_of
+from _gettsim_personas.instrumentation import stage
+
+if TYPE_CHECKING:
+    from collections.abc import Hashable, Sequence
+    from concurrent.futures import Executor
+
+    from ttsim.typing import PolicyEnvironment
+
+    from _gettsim_personas.backends import Backend
+    from _gettsim_personas.persona_objects import OrigPersonaOverTime, Persona
+    from _gettsim_personas.typing import DashedISOString, NestedData
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def evaluate(
+    persona: Persona,
+    policy_environment: PolicyEnvironment | None = None,
+) -> NestedData:
+    """Compute the targets of *persona* with GETTSIM.
+
+    Args:
+        persona:
+            The persona to evaluate.
+        policy_environment:
+            (Optional) The policy environment at the persona's policy date, e.g. from
+            `cached_policy_environment`. Its backend must match the backend of the
+            persona's input data. Taken from `cached_policy_environment` if not
+            provided.
+
+    Returns:
+        The results with the same structure as `persona.tt_targets_tree`.
+    """
+    backend = backend_of(persona.input_data_tree)
+    if policy_environment is None:
+        policy_environment = cached_policy_environment(
+            persona.policy_date, backend=backend
+        )
+    with stage("gettsim") as s:
+        results = main(
+            main_target=MainTarget.results.tree,
+            policy_date=persona.policy_date,
+            evaluation_date=single_evaluation_date(persona),
+            input_data=InputData.tree(persona.input_data_tree),
+            tt_targets=TTTargets.tree(persona.tt_targets_tree),
+            policy_environment=policy_environment,
+            backend=backend,
+            include_warn_nodes=False,
+        )
+        s.add_arrays(results)
+    return results
+
+
+def single_evaluation_date(persona: Persona) -> datetime.date | None:
+    """The evaluation date of *persona* as passed to GETTSIM.
+
+    None if the persona has several evaluation dates; these are already reflected in
+    its input data.
+    """
+    return (
+        persona.evaluation_date
+        if isinstance(persona.evaluation_date, datetime.date)
+        else None
+    )
+
+
+# Inputs always kept when pruning input data, see `required_input_qnames`.
+ALWAYS_REQUIRED_INPUT_QNAMES = frozenset({"p_id", "hh_id"})
+# Number of sets of required inputs kept by `required_input_qnames`.
+MAX_REQUIRED_INPUT_QNAMES = 1024
+_REQUIRED_INPUT_QNAMES: collections.OrderedDict[Hashable, frozenset[str]] = (
+    collections.OrderedDict()
+)
+_REQUIRED_INPUT_QNAMES_LOCK = threading.Lock()
+
+
+def required_input_qnames(persona: Persona) -> frozenset[str]:
+    """Input qnames of *persona* that GETTSIM needs to compute its targets.
+
+    These are the inputs among GETTSIM's root nodes for the persona's targets, plus
+    `p_id` and `hh_id`. The result is cached per policy date, set of input qnames and
+    set of targets, so GETTSIM is queried only once for each of them. The
+    `MAX_REQUIRED_INPUT_QNAMES` most recently used results are kept.
+    """
+    input_qnames = frozenset(dt.qnames(persona.input_data_tree))
+    key = (
+        persona.policy_date,
+        input_qnames,
+        frozenset(dt.qnames(persona.tt_targets_tree)),
+    )
+    with _REQUIRED_INPUT_QNAMES_LOCK:
+        if key in _REQUIRED_INPUT_QNAMES:
+            _REQUIRED_INPUT_QNAMES.move_to_end(key)
+            return _REQUIRED_INPUT_QNAMES[key]
+    with stage("root_nodes"):
+        root_nodes = main(
+            main_target=MainTarget.labels.root_nodes,
+            policy_date=persona.policy_date,
+            input_data=InputData.tree(persona.input_data_tree),
+            tt_targets=TTTargets.tree(persona.tt_targets_tree),
+            policy_environment=cached_policy_environment(persona.policy_date),
+            include_warn_nodes=False,
+        )
+    required = input_qnames & (frozenset(root_nodes) | ALWAYS_REQUIRED_INPUT_QNAMES)
+    with _REQUIRED_INPUT_QNAMES_LOCK:
+        _REQUIRED_INPUT_QNAMES[key] = required
+        while len(_REQUIRED_INPUT_QNAMES) > MAX_REQUIRED_INPUT_QNAMES:
+            _REQUIRED_INPUT_QNAMES.popitem(last=False)
+    return required
+
+
+@functools.cache
+def gettsim_change_points() -> frozenset[datetime.date]:
+    """Dates on which a policy function of GETTSIM starts or stops being active."""
+    with stage("gettsim_change_points"):
+        orig_policy_objects = main(
+            main_target=MainTarget.orig_policy_objects.column_objects_and_param_functions
+        )
+    change_points = set()
+    for obj in orig_policy_objects.values():
+        change_points.add(obj.start_date)
+        change_points.add(obj.end_date + datetime.timedelta(days=1))
+    return frozenset(change_points)
+
+
+def orig_policy_objects() -> dict[tuple[str, ...], Any]:
+    """GETTSIM's parameter specifications and policy functions for all dates.
+
+    GETTSIM creates the policy environment at a date from these objects.
+    """
+    with stage("orig_policy_objects"):
+        return {
+            **main(main_target=MainTarget.orig_policy_objects.param_specs),
+            **main(
+                main_target=MainTarget.orig_policy_objects.column_objects_and_param_functions
+            ),
+        }
+
+
+# Number of policy environments kept by `cached_policy_environment`.
+DEFAULT_MAX_POLICY_ENVIRONMENTS = 8
+
+
+@dataclass(frozen=True)
+class PolicyEnvironmentCacheInfo:
+    """Statistics of a `PolicyEnvironmentCache`."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class PolicyEnvironmentCache:
+    """Least recently used policy environments, by date, modifications, and backend.
+
+    Creating a policy environment makes GETTSIM load and parse its parameter files,
+    which dominates the cost of evaluating small personas. Environments with
+    modifications are created from the cached environment without modifications.
+    Arrays of parameters (e.g. lookup tables) belong to the backend the environment
+    was created for, so environments for NumPy and JAX are cached separately.
+
+    The cache is thread-safe. An environment is created only once, even if several
+    threads request it at the same time, while environments for other keys can be
+    created and read concurrently.
+
+    Example:
+        >>> cache = PolicyEnvironmentCache(maxsize=2)
+        >>> env = cache.get(datetime.date(2025, 1, 1))
+        >>> cache.cache_info().misses
+        1
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAX_POLICY_ENVIRONMENTS) -> None:
+        _fail_if_maxsize_is_invalid(maxsize)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        # Values hold the modifications, such that the IDs of their functions in the
+        # key cannot be reused by other objects.
+        self._environments: collections.OrderedDict[
+            Hashable, tuple[PolicyEnvironment, NestedData | None]
+        ] = collections.OrderedDict()
+        # Environments being created, so that concurrent requests wait for them.
+        self._pending: dict[Hashable, concurrent.futures.Future[PolicyEnvironment]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        policy_date: datetime.date,
+        modifications: NestedData | None = None,
+        backend: Backend = "numpy",
+    ) -> PolicyEnvironment:
+        """The policy environment at *policy_date*.
+
+        Args:
+            policy_date:
+                The policy date.
+            modifications:
+                (Optional) Parameters or functions to upsert into the policy
+                environment.
+            backend:
+                (Optional) The backend of the persona evaluated with the environment,
+                "numpy" or "jax".
+        """
+        _fail_if_backend_is_invalid(backend)
+        key = (
+            policy_date,
+            _modifications_digest(modifications) if modifications else None,
+            backend,
+        )
+        with self._lock:
+            if key in self._environments:
+                self.hits += 1
+                self._environments.move_to_end(key)
+                return self._environments[key][0]
+            pending = self._pending.get(key)
+            if pending is None:
+                self.misses += 1
+                pending = self._pending[key] = concurrent.futures.Future()
+                is_creator = True
+            else:
+                self.hits += 1
+                is_creator = False
+        if not is_creator:
+            return pending.result()
+
+        try:
+            if modifications:
+                policy_environment = upsert_tree(
+                    base=self.get(policy_date, backend=backend),
+                    to_upsert=modifications,
+                )
+            else:
+                with stage("policy_environment"):
+                    policy_environment = main(
+                        main_target=MainTarget.policy_environment,
+                        policy_date=policy_date,
+                        backend=backend,
+                    )
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._environments[key] = (policy_environment, modifications)
+            while len(self._environments) > self.maxsize:
+                self._environments.popitem(last=False)
+        pending.set_result(policy_environment)
+        return policy_environment
+
+    def cache_info(self) -> PolicyEnvironmentCacheInfo:
+        """Hits, misses, and the current and maximum number of environments."""
+        return PolicyEnvironmentCacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            maxsize=self.maxsize,
+            currsize=len(self._environments),
+        )
+
+    def clear(self) -> None:
+        """Drop all environments and reset the statistics."""
+        with self._lock:
+            self._environments.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def cached_policy_environment(
+    policy_date: datetime.date,
+    modifications: NestedData | None = None,
+    backend: Backend = "numpy",
+) -> PolicyEnvironment:
+    """GETTSIM's policy environment at *policy_date*, see `PolicyEnvironmentCache`."""
+    return _default_policy_environment_cache().get(
+        policy_date, modifications=modifications, backend=backend
+    )
+
+
+def policy_environment_cache_info() -> PolicyEnvironmentCacheInfo:
+    """Statistics of the cache used by `cached_policy_environment`."""
+    return _default_policy_environment_cache().cache_info()
+
+
+@functools.cache
+def _default_policy_environment_cache() -> PolicyEnvironmentCache:
+    return PolicyEnvironmentCache()
+
+
+def _modifications_digest(modifications: NestedData) -> str:
+    digest = hashlib.sha256()
+    with np.printoptions(threshold=sys.maxsize):
+        for qname, element in sorted(dt.flatten_to_qnames(modifications).items()):
+            digest.update(
+                f"{qname}={id(element) if callable(element) else element!r};".encode()
+            )
+    return digest.hexdigest()
+
+
+class AsyncPersonaEvaluator:
+    """Create personas and evaluate them with GETTSIM without blocking the event loop.
+
+    Both steps run in *executor* (the default executor of the running event loop if
+    None). At most *max_concurrency* evaluations run at the same time; further
+    requests wait. Concurrent requests for the same persona, dates, and upserted input
+    data are computed only once and all callers receive the same result.
+
+    Example:
+        >>> from gettsim_personas.einkommensteuer_sozialabgaben import Couple1Child
+        >>> evaluator = AsyncPersonaEvaluator(max_concurrency=2)
+        >>> results = await evaluator.aevaluate(
+        ...     Couple1Child, policy_date_str="2025-01-01"
+        ... )
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        _fail_if_max_concurrency_is_invalid(max_concurrency)
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        # Semaphores and futures are bound to an event loop.
+        self._loop_states: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            tuple[asyncio.Semaphore, dict[Hashable, asyncio.Future[NestedData]]],
+        ] = weakref.WeakKeyDictionary()
+
+    async def aevaluate(
+        self,
+        orig_persona: OrigPersonaOverTime,
+        *,
+        policy_date_str: DashedISOString,
+        evaluation_date_str: DashedISOString | Sequence[DashedISOString] | None = None,
+        input_data_to_upsert: NestedData | None = None,
+    ) -> NestedData:
+        """Create the persona and compute its targets with GETTSIM.
+
+        Args:
+            orig_persona:
+                The persona to evaluate.
+            policy_date_str:
+                The date of the policy environment.
+            evaluation_date_str:
+                (Optional) The evaluation date(s), see `OrigPersonaOverTime.__call__`.
+            input_data_to_upsert:
+                (Optional) Input data to upsert, see `Persona.upsert_input_data`.
+
+        Returns:
+            The results with the same structure as the persona's targets.
+        """
+        semaphore, in_flight = self._loop_state()
+        key = _request_key(
+            orig_persona=orig_persona,
+            policy_date_str=policy_date_str,
+            evaluation_date_str=evaluation_date_str,
+            input_data_to_upsert=input_data_to_upsert,
+        )
+        future = in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._run_in_executor(
+                    semaphore,
+                    functools.partial(
+                        _create_and_evaluate,
+                        orig_persona=orig_persona,
+                        policy_date_str=policy_date_str,
+                        evaluation_date_str=evaluation_date_str,
+                        input_data_to_upsert=input_data_to_upsert,
+                    ),
+                )
+            )
+            in_flight[key] = future
+            future.add_done_callback(lambda _: in_flight.pop(key, None))
+        # Cancelling one caller must not cancel the computation for the others.
+        return await asyncio.shield(future)
+
+    @property
+    def n_in_flight(self) -> int:
+        """Number of distinct requests currently computed in the running event loop."""
+        _, in_flight = self._loop_state()
+        return len(in_flight)
+
+    async def _run_in_executor(
+        self,
+        semaphore: asyncio.Semaphore,
+        func: functools.partial[NestedData],
+    ) -> NestedData:
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func)
+
+    def _loop_state(
+        self,
+    ) -> tuple[asyncio.Semaphore, dict[Hashable, asyncio.Future[NestedData]]]:
+        loop = asyncio.get_running_loop()
+        if loop not in self._loop_states:
+            self._loop_states[loop] = (asyncio.Semaphore(self.max_concurrency), {})
+        return self._loop_states[loop]
+
+
+async def aevaluate(
+    orig_persona: OrigPersonaOverTime,
+    *,
+    policy_date_str: DashedISOString,
+    evaluation_date_str: DashedISOString | Sequence[DashedISOString] | None = None,
+    input_data_to_upsert: NestedData | None = None,
+    evaluator: AsyncPersonaEvaluator | None = None,
+) -> NestedData:
+    """Create a persona and compute its targets without blocking the event loop.
+
+    Uses *evaluator* or a shared default `AsyncPersonaEvaluator`.
+    """
+    return await (evaluator or _default_async_evaluator()).aevaluate(
+        orig_persona,
+        policy_date_str=policy_date_str,
+        evaluation_date_str=evaluation_date_str,
+        input_data_to_upsert=input_data_to_upsert,
+    )
+
+
+@functools.cache
+def _default_async_evaluator() -> AsyncPersonaEvaluator:
+    return AsyncPersonaEvaluator()
+
+
+def _create_and_evaluate(
+    orig_persona: OrigPersonaOverTime,
+    policy_date_str: DashedISOString,
+    evaluation_date_str: DashedISOString | Sequence[DashedISOString] | None,
+    input_data_to_upsert: NestedData | None,
+) -> NestedData:
+    persona = orig_persona(
+        policy_date_str=policy_date_str,
+        evaluation_date_str=evaluation_date_str,
+    )
+    if input_data_to_upsert:
+        persona = persona.upsert_input_data(input_data_to_upsert)
+    return evaluate(persona)
+
+
+def _request_key(
+    orig_persona: OrigPersonaOverTime,
+    policy_date_str: DashedISOString,
+    evaluation_date_str: DashedISOString | Sequence[DashedISOString] | None,
+    input_data_to_upsert: NestedData | None,
+) -> Hashable:
+    return (
+        orig_persona,
+        policy_date_str,
+        evaluation_date_str
+        if evaluation_date_str is None or isinstance(evaluation_date_str, str)
+        else tuple(evaluation_date_str),
+        _input_data_digest(input_data_to_upsert) if input_data_to_upsert else None,
+    )
+
+
+def _input_data_digest(input_data: NestedData) -> str:
+    digest = hashlib.sha256()
+    for qname, array in sorted(dt.flatten_to_qnames(input_data).items()):
+        values = np.asarray(array)
+        digest.update(f"{qname}{values.dtype.str}{values.shape}".encode())
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def _fail_if_maxsize_is_invalid(maxsize: int) -> None:
+    if not isinstance(maxsize, int) or maxsize < 1:
+        msg = f"maxsize must be a positive integer, got {maxsize!r}."
+        raise ValueError(msg)
+
+
+def _fail_if_max_concurrency_is_invalid(max_concurrency: int) -> None:
+    if not isinstance(max_concurrency, int) or max_concurrency < 1:
+        msg = f"max_concurrency must be a positive integer, got {max_concurrency!r}."
+        raise ValueError(msg)
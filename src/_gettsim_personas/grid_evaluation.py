@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import dataclasses
+from typing import TYPE_CHECKING
+
+import dags.tree as dt
+import networkx as nx
+import numpy as np
+from gettsim import InputData, MainTarget, TTTargets, main
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.backends import backend_of
+from _gettsim_personas.instrumentation import stage
+from _gettsim_personas.persona_objects import (
+    _fail_if_bruttolohn_m_linspace_grid_is_invalid,
+    _get_tt_targets_tree,
+    bruttolohn_m_grid_values,
+    upsert_with_bruttolohn_m_linspace_grid,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from ttsim.typing import PolicyEnvironment
+
+    from _gettsim_personas.persona_objects import LinspaceGridProtocol, Persona
+    from _gettsim_personas.typing import NestedData
+
+# Inputs set by `upsert_with_bruttolohn_m_linspace_grid`.
+GRID_QNAMES = frozenset({"einnahmen__bruttolohn_m"})
+
+
+@dataclasses.dataclass(frozen=True)
+class HoistedNodes:
+    """Nodes of GETTSIM's graph that do not depend on the columns of a grid.
+
+    Attributes:
+        boundary:
+            Invariant nodes that varying nodes depend on. Computed once; those with
+            one value per row are passed as input data to the evaluation over the
+            grid.
+        invariant_targets:
+            Targets that do not depend on the grid, computed once and repeated for
+            each grid point.
+    """
+
+    boundary: frozenset[str]
+    invariant_targets: frozenset[str]
+
+
+@dataclasses.dataclass(frozen=True)
+class GridResults:
+    """Results over a linspace grid with axes for grid points and members.
+
+    Attributes:
+        results:
+            The results with the structure of the persona's targets. Person-level
+            targets have shape `(n_points, n_members)`, household-level targets (those
+            ending in `_hh`) have shape `(n_points,)`.
+        bruttolohn_m:
+            The earnings of each member at each grid point, shape
+            `(n_points, n_members)`.
+        p_id:
+            The p_ids of the members of the base household, shape `(n_members,)`.
+    """
+
+    results: NestedData
+    bruttolohn_m: np.ndarray
+    p_id: np.ndarray
+
+
+def reshape_grid_results(
+    results: NestedData,
+    bruttolohn_m_linspace_grid: LinspaceGridProtocol,
+) -> GridResults:
+    """Reshape the flat results of a linspace grid persona to grid axes.
+
+    Rows of a grid persona are ordered by grid point, then by member (see
+    `upsert_with_bruttolohn_m_linspace_grid`), so the results are reshaped without
+    copying them.
+
+    Example:
+        >>> grid = Couple1Child.LinspaceGrid(
+        ...     p0=Couple1Child.LinspaceRange(bottom=0, top=10000),
+        ...     p1=0,
+        ...     p2=0,
+        ...     n_points=100,
+        ... )
+        >>> persona = Couple1Child(
+        ...     policy_date_str="2025-01-01", bruttolohn_m_linspace_grid=grid
+        ... )
+        >>> grid_results = reshape_grid_results(evaluate(persona), grid)
+        >>> grid_results.results["einkommensteuer"]["betrag_y_sn"].shape
+        (100, 3)
+
+    Args:
+        results:
+            The results of evaluating a persona created with
+            *bruttolohn_m_linspace_grid*, e.g. via `evaluate_linspace_grid`.
+        bruttolohn_m_linspace_grid:
+            The grid.
+
+    Returns:
+        The reshaped results with the grid's coordinates.
+    """
+    bruttolohn_m = bruttolohn_m_grid_values(bruttolohn_m_linspace_grid)
+    n_points, n_members = bruttolohn_m.shape
+    qname_results = dt.flatten_to_qnames(results)
+    _fail_if_results_do_not_match_grid(
+        qname_results=qname_results, n_points=n_points, n_members=n_members
+    )
+    reshaped = {}
+    for qname, values in qname_results.items():
+        by_member = values.reshape(n_points, n_members, *np.shape(values)[1:])
+        reshaped[qname] = by_member[:, 0] if qname.endswith("_hh") else by_member
+    return GridResults(
+        results=dt.unflatten_from_qnames(reshaped),
+        bruttolohn_m=bruttolohn_m,
+        p_id=np.arange(n_members),
+    )
+
+
+def hoisted_nodes(
+    tt_dag: nx.DiGraph,
+    varied_qnames: Iterable[str],
+    input_qnames: Iterable[str],
+    target_qnames: Iterable[str],
+) -> HoistedNodes:
+    """Split GETTSIM's graph into nodes that depend on *varied_qnames* and others.
+
+    IDs and pointers differ between copies of a household, so they are always
+    treated as varying.
+
+    Args:
+        tt_dag:
+            GETTSIM's graph, see `MainTarget.specialized_environment.tt_dag`.
+        varied_qnames:
+            The inputs that vary over the grid.
+        input_qnames:
+            All inputs.
+        target_qnames:
+            The targets.
+    """
+    varied_qnames = [q for q in varied_qnames if q in tt_dag]
+    varying = set(varied_qnames).union(
+        *(nx.descendants(tt_dag, qname) for qname in varied_qnames)
+    )
+    varying.update(qname for qname in tt_dag if _is_id_or_pointer(qname))
+    input_qnames = set(input_qnames)
+    return HoistedNodes(
+        boundary=frozenset(
+            predecessor
+            for qname in varying
+            for predecessor in tt_dag.predecessors(qname)
+            if predecessor not in varying and predecessor not in input_qnames
+        ),
+        invariant_targets=frozenset(
+            qname
+            for qname in target_qnames
+            if qname not in varying and qname not in input_qnames
+        ),
+    )
+
+
+def evaluate_linspace_grid(
+    persona: Persona,
+    bruttolohn_m_linspace_grid: LinspaceGridProtocol,
+    policy_environment: PolicyEnvironment | None = None,
+) -> NestedData:
+    """Compute the targets of *persona* over a linspace grid of earnings.
+
+    Gives the same results as evaluating the persona created with
+    `bruttolohn_m_linspace_grid`, but nodes of GETTSIM's graph that do not depend on
+    earnings are computed only once, for the single household of *persona*. Their
+    values are repeated for each grid point and passed to GETTSIM as input data, so
+    that the evaluation over the grid skips them.
+
+    Example:
+        >>> persona = Couple1Child(policy_date_str="2025-01-01")
+        >>> results = evaluate_linspace_grid(
+        ...     persona,
+        ...     Couple1Child.LinspaceGrid(
+        ...         p0=Couple1Child.LinspaceRange(bottom=0, top=10000),
+        ...         p1=0,
+        ...         p2=0,
+        ...         n_points=1000,
+        ...     ),
+        ... )
+
+    Args:
+        persona:
+            The persona without a linspace grid.
+        bruttolohn_m_linspace_grid:
+            The grid, created via the LinspaceGrid method of the persona's class.
+        policy_environment:
+            (Optional) The policy environment at the persona's policy date. Taken from
+            `cached_policy_environment` if not provided.
+
+    Returns:
+        The results with the same structure as the targets of the persona created
+        with `bruttolohn_m_linspace_grid`.
+    """
+    qname_input_data = dt.flatten_to_qnames(persona.input_data_tree)
+    _fail_if_bruttolohn_m_linspace_grid_is_invalid(
+        linspace_grid=bruttolohn_m_linspace_grid,
+        p_id_array=qname_input_data["p_id"],
+    )
+    if policy_environment is None:
+        policy_environment = evaluation.cached_policy_environment(
+            persona.policy_date, backend=backend_of(persona.input_data_tree)
+        )
+    target_qnames = dt.qnames(persona.tt_targets_tree)
+
+    with stage("hoist_invariant_nodes"):
+        hoisted = hoisted_nodes(
+            tt_dag=main(
+                main_target=MainTarget.specialized_environment.tt_dag,
+                policy_date=persona.policy_date,
+                evaluation_date=evaluation.single_evaluation_date(persona),
+                input_data=InputData.tree(persona.input_data_tree),
+                tt_targets=TTTargets.tree(persona.tt_targets_tree),
+                policy_environment=policy_environment,
+                include_warn_nodes=False,
+            ),
+            varied_qnames=GRID_QNAMES,
+            input_qnames=qname_input_data,
+            target_qnames=target_qnames,
+        )
+    hoisted_results = (
+        dt.flatten_to_qnames(
+            evaluation.evaluate(
+                dataclasses.replace(
+                    persona,
+                    tt_targets_tree=dt.unflatten_from_qnames(
+                        dict.fromkeys(
+                            sorted(hoisted.boundary | hoisted.invariant_targets)
+                        )
+                    ),
+                ),
+                policy_environment=policy_environment,
+            )
+        )
+        if hoisted.boundary or hoisted.invariant_targets
+        else {}
+    )
+
+    # Scalar boundary nodes (param functions) are cheap and cannot be passed as
+    # columns, so GETTSIM recomputes them in the evaluation over the grid.
+    n_rows = len(qname_input_data["p_id"])
+    row_boundary = {
+        qname: hoisted_results[qname]
+        for qname in hoisted.boundary
+        if np.ndim(hoisted_results[qname]) > 0 and len(hoisted_results[qname]) == n_rows
+    }
+    grid_input_data = upsert_with_bruttolohn_m_linspace_grid(
+        qname_input_data={**qname_input_data, **row_boundary},
+        bruttolohn_m_linspace_grid=bruttolohn_m_linspace_grid,
+    )
+    tt_targets_tree = _get_tt_targets_tree(
+        tt_targets=dict.fromkeys(target_qnames), qname_input_data=grid_input_data
+    )
+    varying_targets = {
+        qname: None
+        for qname in dt.qnames(tt_targets_tree)
+        if qname not in hoisted.invariant_targets
+    }
+    grid_results = (
+        dt.flatten_to_qnames(
+            evaluation.evaluate(
+                dataclasses.replace(
+                    persona,
+                    input_data_tree=dt.unflatten_from_qnames(grid_input_data),
+                    tt_targets_tree=dt.unflatten_from_qnames(varying_targets),
+                ),
+                policy_environment=policy_environment,
+            )
+        )
+        if varying_targets
+        else {}
+    )
+
+    n_points = bruttolohn_m_linspace_grid.n_points
+    # Rows of the grid are ordered by grid point, see
+    # `upsert_with_bruttolohn_m_linspace_grid`.
+    return dt.unflatten_from_qnames(
+        {
+            qname: grid_results[qname]
+            if qname in grid_results
+            else np.tile(hoisted_results[qname], n_points)
+            for qname in dt.qnames(tt_targets_tree)
+        }
+    )
+
+
+def _fail_if_results_do_not_match_grid(
+    qname_results: dict[str, np.ndarray],
+    n_points: int,
+    n_members: int,
+) -> None:
+    for qname, values in qname_results.items():
+        if len(values) != n_points * n_members:
+            msg = (
+                f"'{qname}' has {len(values)} rows, but the grid has {n_points} "
+                f"points for {n_members} members."
+            )
+            raise ValueError(msg)
+
+
+def _is_id_or_pointer(qname: str) -> bool:
+    name = dt.tree_path_from_qname(qname)[-1]
+    return name.endswith("_id") or "p_id_" in name
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Self
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+@dataclass(frozen=True)
+class StageEvent:
+    """A single timed execution of a stage.
+
+    Attributes:
+        name:
+            The name of the stage, e.g. "orig_elements" or "gettsim".
+        start_ns:
+            Start time in nanoseconds (`time.perf_counter_ns`).
+        duration_ns:
+            Wall time in nanoseconds.
+        nbytes:
+            Number of bytes of the arrays produced by the stage, if recorded.
+        thread_id:
+            The thread the stage ran in.
+    """
+
+    name: str
+    start_ns: int
+    duration_ns: int
+    nbytes: int
+    thread_id: int
+
+
+@dataclass(frozen=True)
+class StageSummary:
+    """Aggregate of all events of a stage."""
+
+    n_calls: int
+    total_seconds: float
+    total_nbytes: int
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.n_calls
+
+
+@dataclass
+class StageRecorder:
+    """Collects stage events while recording is active, see `record_stages`."""
+
+    events: list[StageEvent] = field(default_factory=list)
+
+    def summary(self) -> dict[str, StageSummary]:
+        """Aggregate events by stage name, in the order stages were first completed."""
+        summaries: dict[str, StageSummary] = {}
+        for event in self.events:
+            previous = summaries.get(event.name, StageSummary(0, 0.0, 0))
+            summaries[event.name] = StageSummary(
+                n_calls=previous.n_calls + 1,
+                total_seconds=previous.total_seconds + event.duration_ns / 1e9,
+                total_nbytes=previous.total_nbytes + event.nbytes,
+            )
+        return summaries
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        """Events in Chrome's trace event format (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": event.name,
+                    "cat": "gettsim_personas",
+                    "ph": "X",
+                    "ts": event.start_ns / 1e3,
+                    "dur": event.duration_ns / 1e3,
+                    "pid": pid,
+                    "tid": event.thread_id,
+                    "args": {"nbytes": event.nbytes},
+                }
+                for event in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write the events to *path* as Chrome trace event JSON."""
+        path.write_text(json.dumps(self.to_chrome_trace()), encoding="utf-8")
+
+
+class _Stage:
+    __slots__ = ("name", "nbytes", "recorder", "start_ns")
+
+    def __init__(self, name: str, recorder: StageRecorder) -> None:
+        self.name = name
+        self.recorder = recorder
+        self.nbytes = 0
+        self.start_ns = 0
+
+    def __enter__(self) -> Self:
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.recorder.events.append(
+            StageEvent(
+                name=self.name,
+                start_ns=self.start_ns,
+                duration_ns=time.perf_counter_ns() - self.start_ns,
+                nbytes=self.nbytes,
+                thread_id=threading.get_ident(),
+            )
+        )
+
+    def add_arrays(self, data: Any) -> None:
+        """Add the size of all arrays in (nested dictionaries) *data*."""
+        self.nbytes += _nbytes(data)
+
+
+class _DisabledStage:
+    __slots__ = ()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+    def add_arrays(self, data: Any) -> None:
+        pass
+
+
+_DISABLED_STAGE = _DisabledStage()
+_recorder: StageRecorder | None = None
+
+
+def stage(name: str) -> _Stage | _DisabledStage:
+    """Time the stage *name* if recording is active.
+
+    Use as a context manager. If recording is not active, a shared no-op object is
+    returned, so instrumented code costs one function call.
+
+    Example:
+        >>> with stage("input_data") as s:
+        ...     data = compute_input_data()
+        ...     s.add_arrays(data)
+    """
+    if _recorder is None:
+        return _DISABLED_STAGE
+    return _Stage(name, _recorder)
+
+
+@contextlib.contextmanager
+def record_stages() -> Iterator[StageRecorder]:
+    """Record the wall time and array sizes of all stages within the context.
+
+    Stages are creating personas ("orig_elements", "active_elements",
+    "input_data"), upserting data ("upsert_input_data"), and calling GETTSIM
+    ("gettsim"). Recording is off by default.
+
+    Example:
+        >>> with record_stages() as recorder:
+        ...     persona = Couple1Child(policy_date_str="2025-01-01")
+        >>> recorder.summary()
+        >>> recorder.write_chrome_trace(Path("trace.json"))
+    """
+    global _recorder  # noqa: PLW0603
+    previous = _recorder
+    _recorder = StageRecorder()
+    try:
+        yield _recorder
+    finally:
+        _recorder = previous
+
+
+def _nbytes(data: Any) -> int:
+    if isinstance(data, np.ndarray):
+        return data.nbytes
+    if isinstance(data, dict):
+        return sum(_nbytes(v) for v in data.values())
+    return 0
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import dags.tree as dt
+import numpy as np
+from gettsim import InputData, MainTarget, TTTargets, main
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.backends import jax_module, jax_numpy
+from _gettsim_personas.batch import PersonaBatch
+from _gettsim_personas.instrumentation import stage
+from _gettsim_personas.upsert import column_role
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from ttsim.typing import PolicyEnvironment, QNameData
+
+    from _gettsim_personas.persona_objects import Persona
+    from _gettsim_personas.typing import NestedData, NestedStrings
+
+
+class JittedPersonaEvaluator:
+    """GETTSIM's function for a persona, compiled once with JAX.
+
+    The function is specialized to the structure of *persona*: its columns, their
+    shapes and dtypes, and its targets. Calling the evaluator with new values of
+    input columns runs the compiled function without any of GETTSIM's preprocessing.
+    Compilation happens on the first call and is reused as long as the shapes of
+    the columns do not change, so sweeps over many grids of the same size compile
+    only once.
+
+    Example:
+        >>> persona = Couple1Child(
+        ...     policy_date_str="2025-01-01",
+        ...     bruttolohn_m_linspace_grid=grid,
+        ...     backend="jax",
+        ... )
+        >>> evaluator = JittedPersonaEvaluator(persona)
+        >>> for bruttolohn_m in sweeps:
+        ...     results = evaluator({"einnahmen": {"bruttolohn_m": bruttolohn_m}})
+
+    Requires JAX.
+    """
+
+    def __init__(
+        self,
+        persona: Persona,
+        policy_environment: PolicyEnvironment | None = None,
+        *,
+        rounding: bool = True,
+    ) -> None:
+        jax = jax_module()
+        _fail_if_p_ids_are_not_consecutive(persona)
+        if policy_environment is None:
+            policy_environment = evaluation.cached_policy_environment(
+                persona.policy_date, backend="jax"
+            )
+        with stage("jit_persona_evaluator"):
+            prepared = main(
+                main_targets=[
+                    MainTarget.processed_data,
+                    MainTarget.labels.root_nodes,
+                    MainTarget.tt_function,
+                ],
+                policy_date=persona.policy_date,
+                evaluation_date=evaluation.single_evaluation_date(persona),
+                input_data=InputData.tree(persona.input_data_tree),
+                tt_targets=TTTargets.tree(persona.tt_targets_tree),
+                policy_environment=policy_environment,
+                backend="jax",
+                rounding=rounding,
+                include_warn_nodes=False,
+            )
+        self.input_qnames = frozenset(dt.qnames(persona.input_data_tree))
+        root_nodes = set(prepared["labels"]["root_nodes"])
+        self.processed_data: QNameData = {
+            qname: array
+            for qname, array in prepared["processed_data"].items()
+            if qname in root_nodes
+        }
+        self.target_qnames = tuple(dt.qnames(persona.tt_targets_tree))
+        # Targets that are inputs, e.g. `hh_id`, are not computed by GETTSIM.
+        self._input_targets = {
+            qname: prepared["processed_data"][qname]
+            for qname in self.target_qnames
+            if qname in self.input_qnames
+        }
+        self.household_offsets = PersonaBatch.from_tree(
+            persona.input_data_tree
+        ).household_offsets
+        self._tt_function: Callable[[QNameData], QNameData] = jax.jit(
+            prepared["tt_function"]
+        )
+
+    def __call__(self, input_data_to_update: NestedData | None = None) -> NestedData:
+        """Compute the targets with updated values of some input columns.
+
+        Args:
+            input_data_to_update:
+                (Optional) New values of input columns of the persona, with the same
+                shapes as the persona's columns. Columns GETTSIM does not need for
+                the targets are ignored; IDs and pointers cannot be updated.
+
+        Returns:
+            The results with the same structure as the persona's targets, as JAX
+            arrays.
+        """
+        processed_data = self._updated_processed_data(input_data_to_update)
+        with stage("jitted_gettsim"):
+            raw_results = self._tt_function(processed_data)
+        return dt.unflatten_from_qnames(
+            {
+                qname: raw_results[qname]
+                if qname in raw_results
+                else processed_data.get(qname, self._input_targets.get(qname))
+                for qname in self.target_qnames
+            }
+        )
+
+    def marginal_rates(
+        self,
+        tt_targets_tree: NestedStrings,
+        wrt: str = "einnahmen__bruttolohn_m",
+        input_data_to_update: NestedData | None = None,
+    ) -> NestedData:
+        """Derivatives of targets with respect to each member's value of *wrt*.
+
+        For a target column, the value of row `i` is the derivative of the target of
+        row `i` with respect to the value of *wrt* of the person in row `i`. For
+        targets at the level of a group (e.g. `einkommensteuer__betrag_m_sn`), this is
+        the effect of this member's earnings on the group's amount.
+
+        Derivatives are exact, obtained by forward-mode automatic differentiation of
+        the compiled function: one Jacobian-vector product per position of a member
+        in its household, vectorized via `jax.vmap`. At kinks of the tax and
+        transfer schedule, JAX returns one of the one-sided derivatives. Create the
+        evaluator with `rounding=False`, otherwise rounded targets have a derivative
+        of zero almost everywhere. Enable `jax_enable_x64` for double precision.
+
+        Example:
+            >>> evaluator = JittedPersonaEvaluator(persona, rounding=False)
+            >>> rates = evaluator.marginal_rates(
+            ...     {"einkommensteuer": {"betrag_m_sn": None}}
+            ... )
+
+        Args:
+            tt_targets_tree:
+                The targets to differentiate, a subset of the persona's targets with
+                floating point values.
+            wrt:
+                The qualified name of the input to differentiate with respect to.
+            input_data_to_update:
+                (Optional) New values of input columns, see `__call__`.
+
+        Returns:
+            The derivatives with the same structure as *tt_targets_tree*.
+        """
+        jax = jax_module()
+        target_qnames = dt.qnames(tt_targets_tree)
+        _fail_if_tt_targets_cannot_be_differentiated(
+            target_qnames=target_qnames,
+            available_target_qnames=self.target_qnames,
+            wrt=wrt,
+            processed_data=self.processed_data,
+        )
+        processed_data = self._updated_processed_data(input_data_to_update)
+
+        def targets_given_wrt(values: jax.Array) -> dict[str, jax.Array]:
+            raw_results = self._tt_function({**processed_data, wrt: values})
+            return {qname: raw_results[qname] for qname in target_qnames}
+
+        values = processed_data[wrt]
+        n_rows = len(values)
+        position = np.arange(n_rows) - np.repeat(
+            self.household_offsets[:-1], np.diff(self.household_offsets)
+        )
+        n_positions = int(position.max()) + 1 if n_rows else 0
+        tangents = (position == np.arange(n_positions)[:, None]).astype(values.dtype)
+        with stage("marginal_rates"):
+            derivatives = jax.vmap(
+                lambda tangent: jax.jvp(targets_given_wrt, (values,), (tangent,))[1]
+            )(jax_numpy().asarray(tangents))
+        rows = np.arange(n_rows)
+        return dt.unflatten_from_qnames(
+            {qname: derivatives[qname][position, rows] for qname in target_qnames}
+        )
+
+    def _updated_processed_data(
+        self, input_data_to_update: NestedData | None
+    ) -> QNameData:
+        jnp = jax_numpy()
+        qname_data_to_update = dt.flatten_to_qnames(input_data_to_update or {})
+        _fail_if_data_to_update_is_incompatible(
+            qname_data_to_update=qname_data_to_update,
+            input_qnames=self.input_qnames,
+            processed_data=self.processed_data,
+        )
+        return {
+            **self.processed_data,
+            **{
+                qname: jnp.asarray(array, dtype=self.processed_data[qname].dtype)
+                for qname, array in qname_data_to_update.items()
+                if qname in self.processed_data
+            },
+        }
+
+
+def _fail_if_p_ids_are_not_consecutive(persona: Persona) -> None:
+    # GETTSIM's function works with internal p_ids, which coincide with the
+    # persona's p_ids only if these are 0, 1, 2, ...
+    p_id = np.asarray(persona.input_data_tree["p_id"])
+    if not np.array_equal(p_id, np.arange(len(p_id))):
+        msg = "The p_ids of the persona must be 0, 1, 2, ... to compile its function."
+        raise ValueError(msg)
+
+
+def _fail_if_tt_targets_cannot_be_differentiated(
+    target_qnames: list[str],
+    available_target_qnames: tuple[str, ...],
+    wrt: str,
+    processed_data: QNameData,
+) -> None:
+    unknown_targets = sorted(set(target_qnames) - set(available_target_qnames))
+    if unknown_targets:
+        msg = f"The following are not targets of the persona: {unknown_targets}"
+        raise ValueError(msg)
+    if wrt not in processed_data:
+        msg = f"'{wrt}' is not an input GETTSIM needs for the persona's targets."
+        raise ValueError(msg)
+    if not np.issubdtype(processed_data[wrt].dtype, np.floating):
+        msg = (
+            f"'{wrt}' must have a floating point dtype to differentiate with respect "
+            f"to it, got {processed_data[wrt].dtype}."
+        )
+        raise TypeError(msg)
+
+
+def _fail_if_data_to_update_is_incompatible(
+    qname_data_to_update: dict[str, np.ndarray],
+    input_qnames: frozenset[str],
+    processed_data: QNameData,
+) -> None:
+    unknown_qnames = sorted(set(qname_data_to_update) - input_qnames)
+    if unknown_qnames:
+        msg = f"The following columns are not inputs of the persona: {unknown_qnames}"
+        raise ValueError(msg)
+    ids_and_pointers = sorted(
+        qname
+        for qname in qname_data_to_update
+        if column_role(qname) in ("p_id", "foreign_key", "group_id")
+    )
+    if ids_and_pointers:
+        msg = f"IDs and pointers cannot be updated: {ids_and_pointers}"
+        raise ValueError(msg)
+    for qname, array in qname_data_to_update.items():
+        if qname in processed_data and np.shape(array) != np.shape(
+            processed_data[qname]
+        ):
+            msg = (
+                f"The shape of '{qname}' must not change, expected "
+                f"{np.shape(processed_data[qname])}, got {np.shape(array)}."
+            )
+            raise ValueError(msg)
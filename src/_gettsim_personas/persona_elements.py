@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import datetime
+import functools
 import inspect
+import weakref
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
@@ -41,6 +43,10 @@ class PersonaPIDElement:
     def persona_size(self) -> int:
         return len(self.function())
 
+    @property
+    def is_constant(self) -> bool:
+        return True
+
 
 def persona_pid_element() -> Callable[[Callable[..., Any]], PersonaPIDElement]:
     def inner(func: Callable[..., Any]) -> PersonaPIDElement:
@@ -76,6 +82,11 @@ class PersonaInputElement(TimeDependentPersonaElement):
     def __signature__(self):
         return inspect.signature(self.function)
 
+    @property
+    def is_constant(self) -> bool:
+        """Whether the element takes no arguments and hence always returns the same."""
+        return not inspect.signature(self.function).parameters
+
 
 def persona_input_element(
     *,
@@ -163,6 +174,44 @@ def persona_description(
     return inner
 
 
+# Arrays are kept only as long as an element or persona refers to them.
+_SHARED_ARRAYS: weakref.WeakValueDictionary[
+    tuple[str, tuple[int, ...], bytes], np.ndarray
+] = weakref.WeakValueDictionary()
+
+
+def constant_input_data(element: PersonaInputElement | PersonaPIDElement) -> Any:
+    """Input data of a constant persona input element.
+
+    Arrays are computed only once per element, marked read-only and shared among all
+    constant elements returning the same values. Other values (e.g. lists) could be
+    modified by their users, so the element is evaluated on each call.
+    """
+    array = _constant_array(element)
+    return element() if array is None else array
+
+
+@functools.cache
+def _constant_array(
+    element: PersonaInputElement | PersonaPIDElement,
+) -> np.ndarray | None:
+    data = element()
+    if isinstance(data, np.ndarray):
+        return shared_read_only_array(data)
+    return None
+
+
+def shared_read_only_array(array: np.ndarray) -> np.ndarray:
+    """A read-only array equal to *array* that is shared among all equal arrays."""
+    key = (array.dtype.str, array.shape, array.tobytes())
+    shared = _SHARED_ARRAYS.get(key)
+    if shared is None:
+        shared = array.copy()
+        shared.flags.writeable = False
+        _SHARED_ARRAYS[key] = shared
+    return shared
+
+
 def _fail_if_p_ids_not_consecutive_starting_at_zero(p_ids: np.ndarray) -> None:
     if not np.all(p_ids == np.arange(len(p_ids))):
         msg = f"p_ids must be consecutive starting at zero. Got: {p_ids}"
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import datetime
+import functools
 import inspect
+import operator
+import pickle
 from dataclasses import dataclass, field, fields, make_dataclass
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Protocol, cast
+from typing import TYPE_CHECKING, Any, Protocol, SupportsIndex, cast
 
 import dags
 import dags.tree as dt
@@ -11,6 +15,9 @@ import numpy as np
 from ttsim.interface_dag_elements.orig_policy_objects import load_module
 from ttsim.interface_dag_elements.shared import to_datetime
 
+from _gettsim_personas.backends import backend_of, to_backend
+from _gettsim_personas.batch import PersonaBatch
+from _gettsim_personas.instrumentation import stage
 from _gettsim_personas.persona_elements import (
     DEFAULT_END_DATE,
     DEFAULT_START_DATE,
@@ -19,14 +26,31 @@ from _gettsim_personas.persona_elements import (
     PersonaPIDElement,
     PersonaTargetElement,
     TimeDependentPersonaElement,
+    constant_input_data,
+)
+from _gettsim_personas.snapshots import (
+    PersonaSnapshot,
+    SnapshotInterval,
+    default_snapshot_path,
+    load_snapshot,
+    source_hash,
+    write_snapshot,
+)
+from _gettsim_personas.tabular_persona_elements import (
+    load_persona_elements_from_toml,
 )
 from _gettsim_personas.typing import PersonaElement
-from _gettsim_personas.upsert import upsert_input_data
+from _gettsim_personas.upsert import (
+    _fail_if_data_lengths_are_incompatible,
+    _fail_if_data_to_upsert_is_not_dict_with_array_leafs,
+)
 
 if TYPE_CHECKING:
-    import datetime
+    from collections.abc import Callable, Sequence
     from types import ModuleType
 
+    from _gettsim_personas.backends import Backend
+    from _gettsim_personas.evaluation import AsyncPersonaEvaluator
     from _gettsim_personas.typing import DashedISOString, NestedData, NestedStrings
 
 
@@ -47,15 +71,46 @@ class LinspaceGridProtocol(Protocol):
     p0: LinspaceRange | float | int
 
 
+@dataclass(frozen=True)
+class EvaluationDates:
+    """Several evaluation dates, passed to persona elements in place of a single date.
+
+    The `year`, `month` and `day` attributes are column vectors with one row per date,
+    so that elements written for a single date (e.g. `evaluation_date.year - alter`)
+    return one row of member values per date.
+    """
+
+    dates: tuple[datetime.date, ...]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def year(self) -> np.ndarray:
+        return np.array([[d.year] for d in self.dates])
+
+    @property
+    def month(self) -> np.ndarray:
+        return np.array([[d.month] for d in self.dates])
+
+    @property
+    def day(self) -> np.ndarray:
+        return np.array([[d.day] for d in self.dates])
+
+
 @dataclass(frozen=True)
 class Persona:
     description: str
     policy_date: datetime.date
-    evaluation_date: datetime.date
+    evaluation_date: datetime.date | tuple[datetime.date, ...]
     input_data_tree: NestedData
     tt_targets_tree: NestedStrings
 
-    def upsert_input_data(self, input_data_to_upsert: NestedData) -> Persona:
+    def upsert_input_data(
+        self,
+        input_data_to_upsert: NestedData,
+        backend: Backend | None = None,
+    ) -> Persona:
         """Upsert persona input data.
 
         Create a copy of this persona and **up**date or in**sert** input data. Useful if
@@ -90,60 +145,292 @@ class Persona:
         Args:
             input_data_to_upsert:
                 NestedData with data to be upserted.
+            backend:
+                (Optional) The array backend of the new persona, "numpy" or "jax".
+                Defaults to the backend of this persona.
 
         Returns:
             A new persona with upserted input data.
         """
-        upserted_input_data = upsert_input_data(
-            input_data=self.input_data_tree,
-            data_to_upsert=input_data_to_upsert,
+        _fail_if_data_to_upsert_is_not_dict_with_array_leafs(input_data_to_upsert)
+        _fail_if_data_lengths_are_incompatible(
+            input_data_to_upsert, self.input_data_tree
+        )
+        upserted = PersonaBatch.from_tree(self.input_data_tree).upsert(
+            dt.flatten_to_qnames(input_data_to_upsert)
         )
+        return self._with_input_data(upserted, backend=backend)
 
-        hh_id_array = upserted_input_data.get("hh_id")
-        multiple_households_in_persona = (
-            hh_id_array is not None and len(np.unique(hh_id_array)) > 1
+    def upsert_household_data(
+        self,
+        household_data_to_upsert: NestedData,
+        backend: Backend | None = None,
+    ) -> Persona:
+        """Upsert input data with one value per household.
+
+        Like `upsert_input_data`, but the arrays hold one value per household instead
+        of one value per person. Each value is assigned to all members of its
+        household. Use this for household-level inputs, e.g.
+        `('wohnen', 'bruttokaltmiete_m_hh')`.
+
+        The length of the arrays must be a multiple of the number of households in the
+        persona; the persona is copied accordingly.
+
+        Example:
+            >>> base_persona = grundsicherung_für_erwerbsfähige.Couple1Child(
+            >>>     policy_date_str="2025-01-01",
+            >>> )
+            >>> upserted_persona = base_persona.upsert_household_data(
+            >>>     {"wohnen": {"bruttokaltmiete_m_hh": np.array([400, 600])}},
+            >>> )
+            >>> upserted_persona.input_data_tree["wohnen"]["bruttokaltmiete_m_hh"]
+            >>> np.array([400, 400, 400, 600, 600, 600])
+
+        Args:
+            household_data_to_upsert:
+                NestedData with one value per household to be upserted.
+            backend:
+                (Optional) The array backend of the new persona, "numpy" or "jax".
+                Defaults to the backend of this persona.
+
+        Returns:
+            A new persona with upserted input data.
+        """
+        _fail_if_data_to_upsert_is_not_dict_with_array_leafs(household_data_to_upsert)
+        batch = PersonaBatch.from_tree(self.input_data_tree)
+        qname_household_data = {
+            qname: np.asarray(array)
+            for qname, array in dt.flatten_to_qnames(household_data_to_upsert).items()
+        }
+        _fail_if_household_data_lengths_are_incompatible(
+            qname_household_data=qname_household_data,
+            n_households=batch.n_households,
+        )
+        upserted = batch.upsert(
+            {
+                qname: batch.household_values_to_rows(array)
+                for qname, array in qname_household_data.items()
+            }
         )
+        return self._with_input_data(upserted, backend=backend)
 
+    def _with_input_data(
+        self,
+        batch: PersonaBatch,
+        backend: Backend | None = None,
+    ) -> Persona:
         return Persona(
             description=self.description,
             policy_date=self.policy_date,
             evaluation_date=self.evaluation_date,
-            input_data_tree=upserted_input_data,
+            input_data_tree=dt.unflatten_from_qnames(
+                to_backend(
+                    batch.columns,
+                    backend=backend or backend_of(self.input_data_tree),
+                )
+            ),
             tt_targets_tree={
                 "hh_id": None,
                 **self.tt_targets_tree,
             }
-            if multiple_households_in_persona
+            if batch.n_households > 1
             else self.tt_targets_tree,
         )
 
+    def __reduce_ex__(self, protocol: SupportsIndex) -> str | tuple[Any, ...]:
+        """Pickle input arrays as out-of-band buffers with protocol 5 or higher.
+
+        Pass a `buffer_callback` to `pickle.dumps` to obtain the arrays' memory
+        instead of copying it into the pickle stream.
+        """
+        if operator.index(protocol) < 5:  # noqa: PLR2004
+            return super().__reduce_ex__(protocol)
+        qname_input_data = dt.flatten_to_qnames(self.input_data_tree)
+        return _unpickle_persona, (
+            {
+                "description": self.description,
+                "policy_date": self.policy_date,
+                "evaluation_date": self.evaluation_date,
+                "tt_targets_tree": self.tt_targets_tree,
+            },
+            tuple(qname_input_data),
+            tuple(_to_pickle_buffer(array) for array in qname_input_data.values()),
+        )
+
+    def select_tt_targets(self, tt_targets_tree: NestedStrings) -> Persona:
+        """Restrict the persona to a subset of its targets and drop unneeded inputs.
+
+        Inputs that GETTSIM does not need to compute *tt_targets_tree* at the
+        persona's policy date are removed (see `required_input_qnames`), so that
+        subsequent upserts and evaluations handle fewer columns.
+
+        Example:
+            >>> persona = Couple1Child(policy_date_str="2025-01-01").select_tt_targets(
+            ...     {"einkommensteuer": {"betrag_m_sn": None}}
+            ... )
+
+        Args:
+            tt_targets_tree:
+                A subset of `tt_targets_tree`.
+
+        Returns:
+            A new persona with the selected targets and the inputs they require.
+        """
+        _fail_if_tt_targets_are_not_a_subset(
+            tt_targets_tree=tt_targets_tree,
+            available_tt_targets_tree=self.tt_targets_tree,
+        )
+        qname_input_data = dt.flatten_to_qnames(self.input_data_tree)
+        selected = Persona(
+            description=self.description,
+            policy_date=self.policy_date,
+            evaluation_date=self.evaluation_date,
+            input_data_tree=self.input_data_tree,
+            tt_targets_tree=_get_tt_targets_tree(
+                tt_targets=dict.fromkeys(dt.qnames(tt_targets_tree)),
+                qname_input_data=qname_input_data,
+            ),
+        )
+        required = _evaluation().required_input_qnames(selected)
+        return Persona(
+            description=self.description,
+            policy_date=self.policy_date,
+            evaluation_date=self.evaluation_date,
+            input_data_tree=dt.unflatten_from_qnames(
+                {
+                    qname: array
+                    for qname, array in qname_input_data.items()
+                    if qname in required
+                }
+            ),
+            tt_targets_tree=selected.tt_targets_tree,
+        )
+
+
+def _to_pickle_buffer(
+    array: np.ndarray,
+) -> tuple[pickle.PickleBuffer, str, tuple[int, ...]] | np.ndarray:
+    if not isinstance(array, np.ndarray) or array.dtype.hasobject:
+        return array
+    # Non-contiguous arrays (e.g. broadcast views) cannot be exported without a copy.
+    contiguous = np.ascontiguousarray(array)
+    return pickle.PickleBuffer(contiguous), contiguous.dtype.str, contiguous.shape
+
+
+def _from_pickle_buffer(
+    pickled: tuple[memoryview | bytes, str, tuple[int, ...]] | np.ndarray,
+) -> np.ndarray:
+    if not isinstance(pickled, tuple):
+        return pickled
+    buffer, dtype, shape = pickled
+    return np.frombuffer(buffer, dtype=dtype).reshape(shape)
+
+
+def _unpickle_persona(
+    persona_fields: dict[str, Any],
+    qnames: tuple[str, ...],
+    pickled_arrays: tuple[Any, ...],
+) -> Persona:
+    return Persona(
+        input_data_tree=dt.unflatten_from_qnames(
+            {
+                qname: _from_pickle_buffer(pickled)
+                for qname, pickled in zip(qnames, pickled_arrays, strict=True)
+            }
+        ),
+        **persona_fields,
+    )
+
+
+@dataclass(frozen=True)
+class PersonaDiff:
+    """Difference between the personas of an OrigPersonaOverTime at two dates.
+
+    Attributes:
+        added_input_qnames:
+            Input qnames that are only active at the new date.
+        removed_input_qnames:
+            Input qnames that are only active at the old date.
+        recomputed_input_qnames:
+            Input qnames active at both dates whose data must be recomputed, either
+            because a different element is active or because they depend on the
+            evaluation date or on other recomputed or added inputs.
+        unchanged_input_qnames:
+            Input qnames whose data is identical at both dates.
+        added_tt_targets:
+            Target qnames that are only active at the new date.
+        removed_tt_targets:
+            Target qnames that are only active at the old date.
+        description_changed:
+            Whether a different description is active at the new date.
+    """
+
+    added_input_qnames: frozenset[str]
+    removed_input_qnames: frozenset[str]
+    recomputed_input_qnames: frozenset[str]
+    unchanged_input_qnames: frozenset[str]
+    added_tt_targets: frozenset[str]
+    removed_tt_targets: frozenset[str]
+    description_changed: bool
+
+    @property
+    def input_data_changed(self) -> bool:
+        return bool(
+            self.added_input_qnames
+            or self.removed_input_qnames
+            or self.recomputed_input_qnames
+        )
+
+    @property
+    def tt_targets_changed(self) -> bool:
+        return bool(self.added_tt_targets or self.removed_tt_targets)
+
 
 @dataclass(frozen=True)
 class OrigPersonaOverTime:
-    """A persona containing inputs and targets to use with GETTSIM."""
+    """A persona containing inputs and targets to use with GETTSIM.
+
+    Persona elements are defined either in a Python module with decorated functions
+    or in a declarative TOML file (see `load_persona_elements_from_toml`).
+
+    If a snapshot built from the current persona definition exists (see
+    `write_snapshot`), input data that does not depend on the evaluation date is read
+    from the snapshot instead of being computed from the persona elements.
+    """
 
     path_to_persona_elements: Path
     start_date: datetime.date = DEFAULT_START_DATE
     end_date: datetime.date = DEFAULT_END_DATE
     error_if_not_implemented: str | None = None
+    path_to_snapshot: Path | None = None
     LinspaceGrid: type[LinspaceGridProtocol] = field(init=False)
     LinspaceRange: Any = field(init=False)
 
     def __post_init__(self) -> None:
-        p_id = next(
-            el for el in self.orig_elements() if isinstance(el, PersonaPIDElement)
-        )
         object.__setattr__(
-            self, "LinspaceGrid", _make_linspace_grid_class(p_id.persona_size)
+            self, "LinspaceGrid", _make_linspace_grid_class(self.persona_size)
         )
         object.__setattr__(self, "LinspaceRange", LinspaceRange)
 
+    @functools.cached_property
+    def persona_size(self) -> int:
+        """The number of members of the persona."""
+        snapshot = self.snapshot()
+        if snapshot is not None:
+            return snapshot.persona_size
+        p_id = next(
+            el for el in self.orig_elements() if isinstance(el, PersonaPIDElement)
+        )
+        return p_id.persona_size
+
     def __call__(
         self,
         *,
         policy_date_str: DashedISOString,
-        evaluation_date_str: DashedISOString | None = None,
+        evaluation_date_str: DashedISOString | Sequence[DashedISOString] | None = None,
         bruttolohn_m_linspace_grid: LinspaceGridProtocol | None = None,
+        tt_targets_tree: NestedStrings | None = None,
+        backend: Backend = "numpy",
     ) -> Persona:
         """An instance of persona for a given policy and evaluation date.
 
@@ -152,12 +439,22 @@ class OrigPersonaOverTime:
                 The date of the policy environment.
             evaluation_date_str:
                 (Optional) The date for which the persona is evaluated. If not provided,
-                the policy date is used.
+                the policy date is used. If a sequence of dates is provided, the
+                persona is copied once per date (in the given order, with IDs and
+                pointers set as in `upsert_input_data`) and date-dependent inputs are
+                computed for all dates at once.
             bruttolohn_m_linspace_grid:
                 (Optional) A linspace grid of einnahmen__bruttolohn_m. Use if you want
                 to calculate taxes and transfers over a range of earnings. The grid
                 specifies for each p_id a constant value or the range of earnings to be
                 evaluated. Create the grid via the LinspaceGrid method of this class.
+            tt_targets_tree:
+                (Optional) A subset of the persona's targets. Inputs not required for
+                these targets are dropped before applying the linspace grid, see
+                `Persona.select_tt_targets`.
+            backend:
+                (Optional) The array backend of the input data, "numpy" or "jax".
+                Personas with JAX arrays are evaluated with GETTSIM's JAX backend.
 
         Example:
             >>> from gettsim_personas.de.einkommensteuer_sozialabgaben import Couple1Child
@@ -177,19 +474,74 @@ class OrigPersonaOverTime:
             targets.
         """  # noqa: E501
         policy_date = to_datetime(policy_date_str)
-        evaluation_date = (
-            policy_date if not evaluation_date_str else to_datetime(evaluation_date_str)
-        )
+        evaluation_date: datetime.date | EvaluationDates
+        if evaluation_date_str is None or isinstance(evaluation_date_str, str):
+            evaluation_date = (
+                policy_date
+                if not evaluation_date_str
+                else to_datetime(evaluation_date_str)
+            )
+        else:
+            _fail_if_evaluation_dates_are_invalid(
+                evaluation_date_str=evaluation_date_str,
+                bruttolohn_m_linspace_grid=bruttolohn_m_linspace_grid,
+            )
+            evaluation_date = EvaluationDates(
+                dates=tuple(to_datetime(d) for d in evaluation_date_str)
+            )
 
         self._fail_if_persona_not_implemented(policy_date)
 
-        active_elements = self.active_elements(policy_date)
-        qname_input_data = _get_qname_input_data(
-            evaluation_date=evaluation_date,
-            persona_input_elements=active_persona_input_elements(active_elements),
-        )
+        snapshot = self.snapshot()
+        snapshot_interval = snapshot.interval(policy_date) if snapshot else None
+        if snapshot and snapshot_interval:
+            description = snapshot_interval.description
+            tt_targets = dict.fromkeys(snapshot_interval.tt_targets)
+            with stage("input_data") as s:
+                qname_input_data = self._qname_input_data_from_snapshot(
+                    snapshot=snapshot,
+                    interval=snapshot_interval,
+                    policy_date=policy_date,
+                    evaluation_date=evaluation_date,
+                )
+                s.add_arrays(qname_input_data)
+        else:
+            active_elements = self.active_elements(policy_date)
+            description = active_description(active_elements).description
+            tt_targets = active_tt_targets(active_elements)
+            with stage("input_data") as s:
+                qname_input_data = _get_qname_input_data(
+                    evaluation_date=evaluation_date,
+                    persona_input_elements=active_persona_input_elements(
+                        active_elements
+                    ),
+                )
+                s.add_arrays(qname_input_data)
+        if isinstance(evaluation_date, EvaluationDates):
+            qname_input_data = _replicate_over_evaluation_dates(
+                qname_input_data=qname_input_data,
+                n_dates=len(evaluation_date),
+            )
         _fail_if_qname_input_data_differs_in_length_from_p_id_array(qname_input_data)
 
+        persona_evaluation_date = (
+            evaluation_date.dates
+            if isinstance(evaluation_date, EvaluationDates)
+            else evaluation_date
+        )
+        if tt_targets_tree is not None:
+            selected = Persona(
+                description=description,
+                policy_date=policy_date,
+                evaluation_date=persona_evaluation_date,
+                input_data_tree=dt.unflatten_from_qnames(
+                    cast("dict[str, Any]", qname_input_data)
+                ),
+                tt_targets_tree=dt.unflatten_from_qnames(tt_targets),
+            ).select_tt_targets(tt_targets_tree)
+            qname_input_data = dt.flatten_to_qnames(selected.input_data_tree)
+            tt_targets = dict.fromkeys(dt.qnames(selected.tt_targets_tree))
+
         if bruttolohn_m_linspace_grid:
             _fail_if_bruttolohn_m_linspace_grid_is_invalid(
                 linspace_grid=bruttolohn_m_linspace_grid,
@@ -200,32 +552,20 @@ class OrigPersonaOverTime:
                 bruttolohn_m_linspace_grid=bruttolohn_m_linspace_grid,
             )
 
-        hh_id_array = qname_input_data.get("hh_id")
-        multiple_households_in_persona = (
-            hh_id_array is not None and len(np.unique(hh_id_array)) > 1
-        )
-
         return Persona(
-            description=active_description(active_elements).description,
+            description=description,
             policy_date=policy_date,
-            evaluation_date=evaluation_date,
+            evaluation_date=persona_evaluation_date,
             input_data_tree=dt.unflatten_from_qnames(
-                cast("dict[str, Any]", qname_input_data)
+                cast("dict[str, Any]", to_backend(qname_input_data, backend=backend))
+            ),
+            tt_targets_tree=_get_tt_targets_tree(
+                tt_targets=tt_targets, qname_input_data=qname_input_data
             ),
-            tt_targets_tree={
-                "hh_id": None,
-                **dt.unflatten_from_qnames(active_tt_targets(active_elements)),
-            }
-            if multiple_households_in_persona
-            else dt.unflatten_from_qnames(active_tt_targets(active_elements)),
         )
 
     def orig_elements(self) -> list[PersonaElement]:
-        module = load_module(
-            path=self.path_to_persona_elements,
-            root=Path(__file__).parent.parent.parent,
-        )
-        persona_elements = load_persona_elements_from_module(module)
+        persona_elements = self._load_orig_elements()
         _fail_if_not_exactly_one_p_id_array_in_persona_elements(
             persona_elements=persona_elements,
             path_to_persona_elements=self.path_to_persona_elements,
@@ -234,21 +574,380 @@ class OrigPersonaOverTime:
 
     def active_elements(self, policy_date: datetime.date) -> list[PersonaElement]:
         active_elements: list[PersonaElement] = []
+        orig_elements = self.orig_elements()
+        with stage("active_elements"):
+            for el in orig_elements:
+                if isinstance(el, TimeDependentPersonaElement):
+                    if el.is_active(policy_date):
+                        active_elements.append(el)
+                elif isinstance(el, PersonaPIDElement):
+                    active_elements.append(el)
+            _fail_if_active_tt_qnames_overlap(
+                active_elements=active_elements,
+                path_to_persona_elements=self.path_to_persona_elements,
+            )
+            _fail_if_not_exactly_one_description_is_active(
+                active_elements=active_elements,
+                path_to_persona_elements=self.path_to_persona_elements,
+            )
+        return active_elements
+
+    def diff(
+        self,
+        *,
+        from_policy_date: datetime.date,
+        to_policy_date: datetime.date,
+        from_evaluation_date: datetime.date | None = None,
+        to_evaluation_date: datetime.date | None = None,
+    ) -> PersonaDiff:
+        """Difference between the personas at two policy and evaluation dates.
+
+        Evaluation dates default to the respective policy dates, as in `__call__`.
+        """
+        from_active_elements = self.active_elements(from_policy_date)
+        to_active_elements = self.active_elements(to_policy_date)
+        from_inputs = active_persona_input_elements(from_active_elements)
+        to_inputs = active_persona_input_elements(to_active_elements)
+
+        added = set(to_inputs) - set(from_inputs)
+        changed = {
+            qname
+            for qname in set(to_inputs) & set(from_inputs)
+            if to_inputs[qname] != from_inputs[qname]
+        }
+        if (from_evaluation_date or from_policy_date) != (
+            to_evaluation_date or to_policy_date
+        ):
+            changed |= input_qnames_depending_on_evaluation_date(to_inputs)
+        recomputed = (
+            changed | input_qnames_depending_on(to_inputs, names=added | changed)
+        ) - added
+
+        from_targets = set(active_tt_targets(from_active_elements))
+        to_targets = set(active_tt_targets(to_active_elements))
+        return PersonaDiff(
+            added_input_qnames=frozenset(added),
+            removed_input_qnames=frozenset(set(from_inputs) - set(to_inputs)),
+            recomputed_input_qnames=frozenset(recomputed),
+            unchanged_input_qnames=frozenset(set(to_inputs) - added - recomputed),
+            added_tt_targets=frozenset(to_targets - from_targets),
+            removed_tt_targets=frozenset(from_targets - to_targets),
+            description_changed=active_description(from_active_elements)
+            != active_description(to_active_elements),
+        )
+
+    def advance(
+        self,
+        persona: Persona,
+        *,
+        policy_date_str: DashedISOString,
+        evaluation_date_str: DashedISOString | None = None,
+    ) -> Persona:
+        """Create the persona for another date from an existing persona.
+
+        Only input data that differs between the dates (see `diff`) is recomputed,
+        arrays of all other inputs are shared with *persona*. The result is identical
+        to calling this OrigPersonaOverTime with the new dates.
+
+        Args:
+            persona:
+                A persona created by calling this OrigPersonaOverTime without a
+                linspace grid and without upserting data.
+            policy_date_str:
+                The new date of the policy environment.
+            evaluation_date_str:
+                (Optional) The new evaluation date. If not provided, the new policy date
+                is used.
+
+        Example:
+            >>> from gettsim_personas.einkommensteuer_sozialabgaben import Couple1Child
+            >>> persona = Couple1Child(policy_date_str="2020-01-01")
+            >>> for year in range(2021, 2026):
+            ...     persona = Couple1Child.advance(
+            ...         persona, policy_date_str=f"{year}-01-01"
+            ...     )
+
+        Returns:
+            The persona for the new dates.
+        """
+        policy_date = to_datetime(policy_date_str)
+        evaluation_date = (
+            policy_date if not evaluation_date_str else to_datetime(evaluation_date_str)
+        )
+        self._fail_if_persona_not_implemented(policy_date)
+
+        persona_diff = self.diff(
+            from_policy_date=persona.policy_date,
+            to_policy_date=policy_date,
+            from_evaluation_date=persona.evaluation_date,
+            to_evaluation_date=evaluation_date,
+        )
+        active_elements = self.active_elements(policy_date)
+        persona_input_elements = active_persona_input_elements(active_elements)
+        previous_input_data = dt.flatten_to_qnames(persona.input_data_tree)
+        _fail_if_persona_cannot_be_advanced(
+            previous_input_data=previous_input_data,
+            expected_qnames=persona_diff.unchanged_input_qnames
+            | persona_diff.recomputed_input_qnames
+            | persona_diff.removed_input_qnames,
+            persona_size=self.persona_size,
+        )
+        unchanged_input_data = {
+            qname: previous_input_data[qname]
+            for qname in persona_diff.unchanged_input_qnames
+        }
+        new_input_data = _get_qname_input_data(
+            evaluation_date=evaluation_date,
+            persona_input_elements={
+                qname: el
+                for qname, el in persona_input_elements.items()
+                if qname not in unchanged_input_data
+            },
+            precomputed_input_data=unchanged_input_data,
+        )
+        qname_input_data = {
+            qname: unchanged_input_data[qname]
+            if qname in unchanged_input_data
+            else new_input_data[qname]
+            for qname in persona_input_elements
+        }
+        _fail_if_qname_input_data_differs_in_length_from_p_id_array(qname_input_data)
+
+        return Persona(
+            description=active_description(active_elements).description,
+            policy_date=policy_date,
+            evaluation_date=evaluation_date,
+            input_data_tree=dt.unflatten_from_qnames(
+                cast("dict[str, Any]", qname_input_data)
+            ),
+            tt_targets_tree=_get_tt_targets_tree(
+                tt_targets=active_tt_targets(active_elements),
+                qname_input_data=qname_input_data,
+            ),
+        )
+
+    async def aevaluate(
+        self,
+        *,
+        policy_date_str: DashedISOString,
+        evaluation_date_str: DashedISOString | Sequence[DashedISOString] | None = None,
+        input_data_to_upsert: NestedData | None = None,
+        evaluator: AsyncPersonaEvaluator | None = None,
+    ) -> NestedData:
+        """Create the persona and compute its targets without blocking the event loop.
+
+        See `AsyncPersonaEvaluator` for how work is offloaded, bounded, and coalesced.
+
+        Example:
+            >>> from gettsim_personas.einkommensteuer_sozialabgaben import Couple1Child
+            >>> results = await Couple1Child.aevaluate(policy_date_str="2025-01-01")
+        """
+        return await _evaluation().aevaluate(
+            self,
+            policy_date_str=policy_date_str,
+            evaluation_date_str=evaluation_date_str,
+            input_data_to_upsert=input_data_to_upsert,
+            evaluator=evaluator,
+        )
+
+    def snapshot(self) -> PersonaSnapshot | None:
+        """The snapshot of this persona, if one exists for its current definition."""
+        return load_snapshot(
+            path=self.path_to_snapshot
+            or default_snapshot_path(self.path_to_persona_elements),
+            expected_source_hash=source_hash(self.path_to_persona_elements),
+        )
+
+    def write_snapshot(self, path: Path | None = None) -> Path:
+        """Write a snapshot of this persona's input data.
+
+        The snapshot contains, for every period in which the set of active persona
+        elements is constant, all input arrays that do not depend on the evaluation
+        date, along with the active description and targets. Calling the persona then
+        loads these arrays as read-only memory maps and only evaluates elements that
+        depend on the evaluation date (like `geburtsjahr`).
+
+        Args:
+            path:
+                (Optional) The snapshot directory. Defaults to `path_to_snapshot` or, if
+                that is not set, to a `_snapshots` directory next to the persona
+                elements.
+
+        Returns:
+            The snapshot directory.
+        """
+        path = (
+            path
+            or self.path_to_snapshot
+            or default_snapshot_path(self.path_to_persona_elements)
+        )
+        p_id = next(
+            el for el in self.orig_elements() if isinstance(el, PersonaPIDElement)
+        )
+        write_snapshot(
+            path,
+            source_hash=source_hash(self.path_to_persona_elements),
+            persona_size=p_id.persona_size,
+            intervals=[
+                self._snapshot_interval(start_date=start_date, end_date=end_date)
+                for start_date, end_date in self.active_periods()
+            ],
+        )
+        return path
+
+    def active_periods(self) -> list[tuple[datetime.date, datetime.date]]:
+        """Periods during which the set of active persona elements does not change.
+
+        Only periods within the start and end date of this persona are returned.
+        """
+        breakpoints = {self.start_date}
         for el in self.orig_elements():
             if isinstance(el, TimeDependentPersonaElement):
-                if el.is_active(policy_date):
-                    active_elements.append(el)
-            elif isinstance(el, PersonaPIDElement):
-                active_elements.append(el)
-        _fail_if_active_tt_qnames_overlap(
-            active_elements=active_elements,
+                breakpoints.add(el.start_date)
+                if el.end_date < DEFAULT_END_DATE:
+                    breakpoints.add(el.end_date + datetime.timedelta(days=1))
+        starts = sorted(d for d in breakpoints if self.start_date <= d <= self.end_date)
+        ends = [s - datetime.timedelta(days=1) for s in starts[1:]] + [self.end_date]
+        return list(zip(starts, ends, strict=True))
+
+    def validation_intervals(
+        self,
+        date_range: tuple[datetime.date, datetime.date],
+    ) -> list[tuple[datetime.date, datetime.date]]:
+        """Periods within *date_range* during which GETTSIM needs the same inputs.
+
+        Periods start where the set of active persona elements changes (see
+        `active_periods`) or where a policy function of GETTSIM starts or ends being
+        active. Only periods within the start and end date of this persona are
+        returned.
+        """
+        return [clipped for _, clipped in self._validation_intervals(date_range)]
+
+    def _validation_intervals(
+        self,
+        date_range: tuple[datetime.date, datetime.date],
+    ) -> list[
+        tuple[tuple[datetime.date, datetime.date], tuple[datetime.date, datetime.date]]
+    ]:
+        """Periods of the persona overlapping *date_range*, and their part within it."""
+        _fail_if_date_range_is_invalid(date_range)
+        breakpoints = {start for start, _ in self.active_periods()}
+        breakpoints |= _evaluation().gettsim_change_points()
+        starts = sorted(d for d in breakpoints if self.start_date <= d <= self.end_date)
+        ends = [s - datetime.timedelta(days=1) for s in starts[1:]] + [self.end_date]
+        first, last = date_range
+        return [
+            ((start, end), (max(start, first), min(end, last)))
+            for start, end in zip(starts, ends, strict=True)
+            if start <= last and end >= first
+        ]
+
+    def validate(
+        self,
+        date_range: tuple[datetime.date, datetime.date],
+    ) -> list[tuple[datetime.date, datetime.date]]:
+        """Check that GETTSIM needs all inputs of this persona during *date_range*.
+
+        GETTSIM's root nodes are computed once per period of `validation_intervals`,
+        instead of once per date. Outcomes are cached per period and definition of the
+        persona, so repeated validation only checks periods that were not checked
+        before, also if *date_range* starts or ends within a checked period.
+
+        Example:
+            >>> Couple1Child.validate((date(2015, 1, 1), date(2025, 12, 31)))
+
+        Args:
+            date_range:
+                The first and last policy date to validate.
+
+        Returns:
+            The periods that were validated.
+
+        Raises:
+            ValueError: If the persona contains inputs GETTSIM does not need.
+        """
+        persona_source_hash = source_hash(self.path_to_persona_elements)
+        unnecessary_inputs = {
+            clipped: _unnecessary_inputs(
+                orig_persona=self,
+                interval=interval,
+                persona_source_hash=persona_source_hash,
+            )
+            for interval, clipped in self._validation_intervals(date_range)
+        }
+        _fail_if_persona_contains_unnecessary_inputs(
+            unnecessary_inputs=unnecessary_inputs,
             path_to_persona_elements=self.path_to_persona_elements,
         )
-        _fail_if_not_exactly_one_description_is_active(
-            active_elements=active_elements,
-            path_to_persona_elements=self.path_to_persona_elements,
+        return list(unnecessary_inputs)
+
+    def _snapshot_interval(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+    ) -> tuple[SnapshotInterval, dict[str, np.ndarray]]:
+        active_elements = self.active_elements(start_date)
+        persona_input_elements = active_persona_input_elements(active_elements)
+        live_input_qnames = input_qnames_depending_on_evaluation_date(
+            persona_input_elements
         )
-        return active_elements
+        precomputed_input_data = _get_qname_input_data(
+            evaluation_date=start_date,
+            persona_input_elements={
+                qname: el
+                for qname, el in persona_input_elements.items()
+                if qname not in live_input_qnames
+            },
+        )
+        interval = SnapshotInterval(
+            start_date=start_date,
+            end_date=end_date,
+            description=active_description(active_elements).description,
+            input_qnames=tuple(persona_input_elements),
+            live_input_qnames=tuple(
+                q for q in persona_input_elements if q in live_input_qnames
+            ),
+            array_files={},
+            tt_targets=tuple(active_tt_targets(active_elements)),
+        )
+        return interval, precomputed_input_data
+
+    def _load_orig_elements(self) -> list[PersonaElement]:
+        with stage("orig_elements"):
+            if self.path_to_persona_elements.suffix == ".toml":
+                return load_persona_elements_from_toml(self.path_to_persona_elements)
+            return load_persona_elements_from_python_file(self.path_to_persona_elements)
+
+    def _qname_input_data_from_snapshot(
+        self,
+        snapshot: PersonaSnapshot,
+        interval: SnapshotInterval,
+        policy_date: datetime.date,
+        evaluation_date: datetime.date | EvaluationDates,
+    ) -> dict[str, np.ndarray]:
+        precomputed_input_data = snapshot.load_arrays(interval)
+        live_input_data: dict[str, np.ndarray] = {}
+        if interval.live_input_qnames:
+            # The snapshot was built from validated elements, so only the live
+            # elements are selected, without validating all active elements again.
+            live_input_qnames = set(interval.live_input_qnames)
+            live_input_data = _get_qname_input_data(
+                evaluation_date=evaluation_date,
+                persona_input_elements={
+                    el.tt_qname: el
+                    for el in self._load_orig_elements()
+                    if isinstance(el, PersonaInputElement)
+                    and el.tt_qname in live_input_qnames
+                    and el.is_active(policy_date)
+                },
+                precomputed_input_data=precomputed_input_data,
+            )
+        return {
+            qname: precomputed_input_data[qname]
+            if qname in precomputed_input_data
+            else live_input_data[qname]
+            for qname in interval.input_qnames
+        }
 
     def _fail_if_persona_not_implemented(
         self,
@@ -269,6 +968,32 @@ def active_persona_input_elements(
     }
 
 
+def input_qnames_depending_on_evaluation_date(
+    persona_input_elements: dict[str, PersonaInputElement | PersonaPIDElement],
+) -> set[str]:
+    """Input qnames that depend on the evaluation date, directly or via other inputs."""
+    return input_qnames_depending_on(persona_input_elements, names={"evaluation_date"})
+
+
+def input_qnames_depending_on(
+    persona_input_elements: dict[str, PersonaInputElement | PersonaPIDElement],
+    names: set[str],
+) -> set[str]:
+    """Input qnames that depend on any of *names*, directly or via other inputs."""
+    dependent: set[str] = set()
+    changed = True
+    while changed:
+        changed = False
+        for qname, el in persona_input_elements.items():
+            if qname in dependent:
+                continue
+            args = inspect.signature(el).parameters
+            if names.intersection(args) or dependent.intersection(args):
+                dependent.add(qname)
+                changed = True
+    return dependent
+
+
 def active_tt_targets(
     active_elements: list[PersonaElement],
 ) -> dict[str, None]:
@@ -283,6 +1008,7 @@ def active_description(active_elements: list[PersonaElement]) -> PersonaDescript
     return next(s for s in active_elements if isinstance(s, PersonaDescription))
 
 
+@functools.cache
 def _make_linspace_grid_class(n_members: int):
     """Create a LinspaceGrid dataclass for a persona of size *n_members*.
 
@@ -293,21 +1019,59 @@ def _make_linspace_grid_class(n_members: int):
     Parameters can be either LinspaceRange objects or numeric values:
         - LinspaceRange(bottom=1000, top=3000): creates a range from 1000 to 3000
         - 4000: creates a constant value of 4000 (no range)
+
+    There is one class per persona size. The classes cannot be looked up by name, so
+    their instances are pickled by the number of members and the field values.
     """
     fields = [
         *[(f"p{i}", LinspaceRange | float | int) for i in range(n_members)],
         ("n_points", int),
     ]
     return make_dataclass(
-        cls_name=f"LinspaceGrid{n_members}PIDs", fields=fields, frozen=True
+        cls_name=f"LinspaceGrid{n_members}PIDs",
+        fields=fields,
+        frozen=True,
+        namespace={"__reduce__": _reduce_linspace_grid},
     )
 
 
+def _reduce_linspace_grid(
+    self: LinspaceGridProtocol,
+) -> tuple[Callable[..., LinspaceGridProtocol], tuple[int, dict[str, Any]]]:
+    values = {f.name: getattr(self, f.name) for f in fields(self)}  # ty: ignore[invalid-argument-type]
+    return _make_linspace_grid, (len(values) - 1, values)
+
+
+def _make_linspace_grid(n_members: int, values: dict[str, Any]) -> LinspaceGridProtocol:
+    return _make_linspace_grid_class(n_members)(**values)
+
+
 def upsert_with_bruttolohn_m_linspace_grid(
     qname_input_data: dict[str, np.ndarray],
     bruttolohn_m_linspace_grid: LinspaceGridProtocol,
-) -> NestedData:
+) -> dict[str, np.ndarray]:
     """Upsert the bruttolohn_m_linspace_grid into the qname_input_data."""
+    return (
+        PersonaBatch(qname_input_data)
+        .upsert(
+            {
+                "einnahmen__bruttolohn_m": bruttolohn_m_grid_values(
+                    bruttolohn_m_linspace_grid
+                ).ravel()
+            }
+        )
+        .columns
+    )
+
+
+def bruttolohn_m_grid_values(
+    bruttolohn_m_linspace_grid: LinspaceGridProtocol,
+) -> np.ndarray:
+    """The earnings of each member at each point of the grid.
+
+    Returns:
+        An array of shape `(n_points, n_members)`.
+    """
     n_points = bruttolohn_m_linspace_grid.n_points
     linspace_by_p_id = {}
     for p_id, param_value in bruttolohn_m_linspace_grid.__dict__.items():
@@ -323,40 +1087,194 @@ def upsert_with_bruttolohn_m_linspace_grid(
         else:
             linspace_by_p_id[p_id] = np.full(n_points, float(param_value))
 
-    bruttolohn_m_grid = np.array(
-        [
-            value
-            for pair in zip(*linspace_by_p_id.values(), strict=False)
-            for value in pair
-        ]
-    )
-    return upsert_input_data(
-        input_data=qname_input_data,
-        data_to_upsert={"einnahmen__bruttolohn_m": bruttolohn_m_grid},
+    # One row per grid point, one column per p_id.
+    return np.column_stack(list(linspace_by_p_id.values()))
+
+
+def _get_tt_targets_tree(
+    tt_targets: dict[str, None],
+    qname_input_data: dict[str, np.ndarray],
+) -> NestedStrings:
+    hh_id_array = qname_input_data.get("hh_id")
+    multiple_households_in_persona = (
+        hh_id_array is not None and len(np.unique(hh_id_array)) > 1
     )
+    if multiple_households_in_persona:
+        return {"hh_id": None, **dt.unflatten_from_qnames(tt_targets)}
+    return dt.unflatten_from_qnames(tt_targets)
 
 
 def _get_qname_input_data(
-    evaluation_date: datetime.date,
+    evaluation_date: datetime.date | EvaluationDates,
+    persona_input_elements: dict[str, PersonaInputElement | PersonaPIDElement],
+    precomputed_input_data: dict[str, np.ndarray] | None = None,
+) -> dict[str, np.ndarray]:
+    """Compute the input data of *persona_input_elements*.
+
+    Constant elements (those without arguments) are evaluated only once, see
+    `constant_input_data`. Arguments of the remaining elements are taken from
+    *precomputed_input_data* if they are not computed by the elements themselves.
+
+    If *evaluation_date* holds several dates, inputs depending on it are returned as
+    two-dimensional arrays with one row per date.
+    """
+    constant_data = {
+        qname: constant_input_data(el)
+        for qname, el in persona_input_elements.items()
+        if el.is_constant
+    }
+    live_data = _get_live_qname_input_data(
+        evaluation_date=evaluation_date,
+        persona_input_elements={
+            qname: el
+            for qname, el in persona_input_elements.items()
+            if qname not in constant_data
+        },
+        precomputed_input_data={**(precomputed_input_data or {}), **constant_data},
+    )
+    return {
+        qname: constant_data[qname] if qname in constant_data else live_data[qname]
+        for qname in persona_input_elements
+    }
+
+
+def _get_live_qname_input_data(
+    evaluation_date: datetime.date | EvaluationDates,
     persona_input_elements: dict[str, PersonaInputElement | PersonaPIDElement],
+    precomputed_input_data: dict[str, np.ndarray],
 ) -> dict[str, np.ndarray]:
+    if not persona_input_elements:
+        return {}
     f = dags.concatenate_functions(
         functions=persona_input_elements,
         targets=list(persona_input_elements.keys()),
         return_type="dict",
     )
     args = dags.get_free_arguments(f)
-
-    if args == ["evaluation_date"]:
-        return f(evaluation_date=evaluation_date)
-    if args:
+    kwargs = {
+        arg: precomputed_input_data[arg]
+        for arg in args
+        if arg in precomputed_input_data
+    }
+    missing_args = [
+        arg for arg in args if arg not in kwargs and arg != "evaluation_date"
+    ]
+    if missing_args:
         # We only support "evaluation_date" or no parameter at all for now
         msg = (
             f"The following parameters are needed to create the input data for this "
-            f"persona: {args}. "
+            f"persona: {missing_args}. "
         )
         raise ValueError(msg)
-    return f()
+    if "evaluation_date" not in args:
+        return f(**kwargs)
+    if isinstance(evaluation_date, EvaluationDates):
+        return _evaluate_over_evaluation_dates(
+            f=f,
+            kwargs=kwargs,
+            evaluation_dates=evaluation_date,
+            date_dependent_qnames=input_qnames_depending_on_evaluation_date(
+                persona_input_elements
+            ),
+        )
+    return f(**kwargs, evaluation_date=evaluation_date)
+
+
+def _evaluate_over_evaluation_dates(
+    f: Callable[..., dict[str, np.ndarray]],
+    kwargs: dict[str, np.ndarray],
+    evaluation_dates: EvaluationDates,
+    date_dependent_qnames: set[str],
+) -> dict[str, np.ndarray]:
+    """Evaluate *f* for all *evaluation_dates* at once.
+
+    Date-dependent results have one row per date. Elements that do not broadcast over
+    the column vectors of `EvaluationDates` are evaluated date by date instead. This
+    is the case if they fail (e.g. because they build arrays from
+    `evaluation_date.year` element by element or call methods of `datetime.date`)
+    or if they return fewer rows than there are dates (e.g. because they reduce over
+    `evaluation_date.year`).
+    """
+    n_dates = len(evaluation_dates)
+    try:
+        result = f(**kwargs, evaluation_date=evaluation_dates)
+    except (AttributeError, TypeError, ValueError):
+        result = None
+    if result is not None and all(
+        _has_one_row_per_date(result[qname], n_dates=n_dates)
+        for qname in date_dependent_qnames
+    ):
+        return {
+            qname: np.broadcast_to(array, (n_dates, np.shape(array)[-1]))
+            if qname in date_dependent_qnames
+            else array
+            for qname, array in result.items()
+        }
+
+    results = [f(**kwargs, evaluation_date=date) for date in evaluation_dates.dates]
+    return {
+        qname: np.stack([r[qname] for r in results])
+        if qname in date_dependent_qnames
+        else array
+        for qname, array in results[0].items()
+    }
+
+
+def _has_one_row_per_date(array: np.ndarray, n_dates: int) -> bool:
+    if n_dates == 1:
+        return np.ndim(array) <= 1 or np.shape(array)[0] == 1
+    return np.ndim(array) == 2 and np.shape(array)[0] == n_dates  # noqa: PLR2004
+
+
+def _replicate_over_evaluation_dates(
+    qname_input_data: dict[str, np.ndarray],
+    n_dates: int,
+) -> dict[str, np.ndarray]:
+    """Stack copies of the persona, one per evaluation date.
+
+    Two-dimensional (i.e., date-dependent) inputs are flattened date by date, all
+    other inputs are broadcast as in `PersonaBatch.replicate`.
+    """
+    persona_size = len(qname_input_data["p_id"])
+    replicated = (
+        PersonaBatch(
+            {
+                qname: array
+                for qname, array in qname_input_data.items()
+                if np.ndim(array) != 2  # noqa: PLR2004
+            }
+        )
+        .replicate(n_dates)
+        .columns
+    )
+    return {
+        qname: replicated[qname]
+        if qname in replicated
+        else np.broadcast_to(array, (n_dates, persona_size)).reshape(-1)
+        for qname, array in qname_input_data.items()
+    }
+
+
+def load_persona_elements_from_python_file(path: Path) -> list[PersonaElement]:
+    """Load persona elements from a Python module.
+
+    Results are cached by path and modification time of the file, so the module is
+    executed only once.
+    """
+    return list(
+        _load_persona_elements_from_python_file(
+            path=path, mtime_ns=path.stat().st_mtime_ns
+        )
+    )
+
+
+@functools.cache
+def _load_persona_elements_from_python_file(
+    path: Path,
+    mtime_ns: int,  # noqa: ARG001
+) -> tuple[PersonaElement, ...]:
+    module = load_module(path=path, root=Path(__file__).parent.parent.parent)
+    return tuple(load_persona_elements_from_module(module))
 
 
 def load_persona_elements_from_module(
@@ -367,6 +1285,35 @@ def load_persona_elements_from_module(
     ]
 
 
+# Number of (persona, interval) pairs kept by `_unnecessary_inputs`.
+MAX_UNNECESSARY_INPUTS = 1024
+
+
+@functools.lru_cache(maxsize=MAX_UNNECESSARY_INPUTS)
+def _unnecessary_inputs(
+    orig_persona: OrigPersonaOverTime,
+    interval: tuple[datetime.date, datetime.date],
+    persona_source_hash: str,  # noqa: ARG001
+) -> frozenset[str]:
+    """Inputs of *orig_persona* that GETTSIM does not need during *interval*.
+
+    GETTSIM needs the same inputs throughout a period of `validation_intervals`, so
+    they are determined at its start. *persona_source_hash* is part of the cache key,
+    such that changes to the persona definition are validated again.
+    """
+    with stage("validate"):
+        persona = orig_persona(policy_date_str=interval[0].isoformat())
+        required = _evaluation().required_input_qnames(persona)
+        return frozenset(dt.qnames(persona.input_data_tree)) - required
+
+
+def _evaluation() -> ModuleType:
+    # Importing GETTSIM is only required for evaluating personas.
+    from _gettsim_personas import evaluation  # noqa: PLC0415
+
+    return evaluation
+
+
 def _fail_if_not_exactly_one_p_id_array_in_persona_elements(
     persona_elements: list[PersonaElement],
     path_to_persona_elements: Path,
@@ -474,6 +1421,96 @@ def _fail_if_bruttolohn_m_linspace_grid_is_invalid(
         raise ValueError(msg)
 
 
+def _fail_if_tt_targets_are_not_a_subset(
+    tt_targets_tree: NestedStrings,
+    available_tt_targets_tree: NestedStrings,
+) -> None:
+    unknown_targets = set(dt.qnames(tt_targets_tree)) - set(
+        dt.qnames(available_tt_targets_tree)
+    )
+    if unknown_targets:
+        msg = (
+            "The following targets are not targets of this persona: "
+            f"{sorted(unknown_targets)}"
+        )
+        raise ValueError(msg)
+
+
+def _fail_if_household_data_lengths_are_incompatible(
+    qname_household_data: dict[str, np.ndarray],
+    n_households: int,
+) -> None:
+    lengths = {qname: len(array) for qname, array in qname_household_data.items()}
+    if len(set(lengths.values())) > 1:
+        msg = f"The length of household data to upsert differs: {lengths}"
+        raise ValueError(msg)
+    if any(length % n_households for length in lengths.values()):
+        msg = (
+            "The length of household data to upsert must be a multiple of the number "
+            f"of households in the persona ({n_households}), got: {lengths}"
+        )
+        raise ValueError(msg)
+
+
+def _fail_if_evaluation_dates_are_invalid(
+    evaluation_date_str: Sequence[DashedISOString],
+    bruttolohn_m_linspace_grid: LinspaceGridProtocol | None,
+) -> None:
+    if len(evaluation_date_str) == 0:
+        msg = "evaluation_date_str must contain at least one date."
+        raise ValueError(msg)
+    if bruttolohn_m_linspace_grid:
+        msg = (
+            "A bruttolohn_m_linspace_grid cannot be combined with multiple evaluation "
+            "dates. Upsert the earnings via `Persona.upsert_input_data` instead."
+        )
+        raise ValueError(msg)
+
+
+def _fail_if_date_range_is_invalid(
+    date_range: tuple[datetime.date, datetime.date],
+) -> None:
+    if len(date_range) != 2 or date_range[0] > date_range[1]:  # noqa: PLR2004
+        msg = (
+            f"date_range must be a tuple of the first and last date, got: {date_range}"
+        )
+        raise ValueError(msg)
+
+
+def _fail_if_persona_contains_unnecessary_inputs(
+    unnecessary_inputs: dict[tuple[datetime.date, datetime.date], frozenset[str]],
+    path_to_persona_elements: Path,
+) -> None:
+    failures = [
+        f"{start_date} to {end_date}: {sorted(qnames)}"
+        for (start_date, end_date), qnames in unnecessary_inputs.items()
+        if qnames
+    ]
+    if failures:
+        msg = (
+            f"The persona defined in {path_to_persona_elements} contains inputs that "
+            "GETTSIM does not need:\n\n" + "\n".join(failures)
+        )
+        raise ValueError(msg)
+
+
+def _fail_if_persona_cannot_be_advanced(
+    previous_input_data: dict[str, Any],
+    expected_qnames: frozenset[str],
+    persona_size: int,
+) -> None:
+    if (
+        set(previous_input_data) != expected_qnames
+        or len(previous_input_data["p_id"]) != persona_size
+    ):
+        msg = (
+            "The persona does not contain the input data expected at its policy date. "
+            "Only personas created by calling the OrigPersonaOverTime without a "
+            "linspace grid and without upserting data can be advanced."
+        )
+        raise ValueError(msg)
+
+
 def _fail_if_qname_input_data_differs_in_length_from_p_id_array(
     qname_input_data: dict[str, np.ndarray],
 ) -> None:
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import functools
+from typing import TYPE_CHECKING
+
+import dags.tree as dt
+from gettsim import (
+    InputData,
+    MainTarget,
+    SpecializedEnvironment,
+    TTTargets,
+    main,
+    upsert_tree,
+)
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.instrumentation import stage
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from concurrent.futures import Executor
+
+    import networkx as nx
+    from ttsim.typing import PolicyEnvironment, QNameData
+
+    from _gettsim_personas.persona_objects import Persona
+    from _gettsim_personas.typing import NestedData
+
+
+def evaluate_policy_variants(
+    persona: Persona,
+    variants: Mapping[str, NestedData],
+    executor: Executor | None = None,
+) -> dict[str, NestedData]:
+    """Compute the targets of *persona* under several variants of the policy.
+
+    Each variant is a tree of policy environment elements (parameters or functions)
+    that replace those of the policy environment at the persona's policy date, e.g.
+    a parameter with a different value. The base environment is never modified.
+
+    The persona's input data is processed once and shared by all variants. Variants
+    that only replace existing parameters also share GETTSIM's graph of functions,
+    which does not depend on parameter values.
+
+    Example:
+        >>> from ttsim.tt.param_objects import ScalarParam
+        >>> persona = Couple1Child(policy_date_str="2024-01-01")
+        >>> satz_m = cached_policy_environment(persona.policy_date)["kindergeld"][
+        ...     "satz_m"
+        ... ]
+        >>> results = evaluate_policy_variants(
+        ...     persona,
+        ...     {
+        ...         "status_quo": {},
+        ...         "higher_kindergeld": {
+        ...             "kindergeld": {
+        ...                 "satz_m": ScalarParam(
+        ...                     value=300,
+        ...                     unit=satz_m.unit,
+        ...                     start_date=satz_m.start_date,
+        ...                     end_date=satz_m.end_date,
+        ...                 )
+        ...             }
+        ...         },
+        ...     },
+        ... )
+        >>> results["status_quo"]["kindergeld"]["betrag_m_hh"]
+        array([250, 250, 250])
+        >>> results["higher_kindergeld"]["kindergeld"]["betrag_m_hh"]
+        array([300, 300, 300])
+
+    Args:
+        persona:
+            The persona to evaluate.
+        variants:
+            The elements to upsert into the policy environment, by name of the
+            variant.
+        executor:
+            (Optional) The executor to evaluate the variants in, e.g. a
+            `ThreadPoolExecutor`. Variants are evaluated one after another if None.
+
+    Returns:
+        The results of each variant, by name of the variant.
+    """
+    base_environment = evaluation.cached_policy_environment(persona.policy_date)
+    _fail_if_variants_are_invalid(variants=variants, base_environment=base_environment)
+    with stage("prepare_policy_variants"):
+        shared = main(
+            main_targets=[
+                MainTarget.processed_data,
+                MainTarget.specialized_environment.tt_dag,
+            ],
+            policy_date=persona.policy_date,
+            evaluation_date=evaluation.single_evaluation_date(persona),
+            input_data=InputData.tree(persona.input_data_tree),
+            tt_targets=TTTargets.tree(persona.tt_targets_tree),
+            policy_environment=base_environment,
+            include_warn_nodes=False,
+        )
+    evaluate_variant = functools.partial(
+        _evaluate_variant,
+        persona=persona,
+        base_environment=base_environment,
+        processed_data=shared["processed_data"],
+        tt_dag=shared["specialized_environment"]["tt_dag"],
+    )
+    results = (executor.map if executor is not None else map)(
+        evaluate_variant, variants.values()
+    )
+    return dict(zip(variants, results, strict=True))
+
+
+def _evaluate_variant(
+    to_upsert: NestedData,
+    persona: Persona,
+    base_environment: PolicyEnvironment,
+    processed_data: QNameData,
+    tt_dag: nx.DiGraph,
+) -> NestedData:
+    with stage("gettsim") as s:
+        results = main(
+            main_target=MainTarget.results.tree,
+            policy_date=persona.policy_date,
+            evaluation_date=evaluation.single_evaluation_date(persona),
+            input_data=InputData.tree(persona.input_data_tree),
+            tt_targets=TTTargets.tree(persona.tt_targets_tree),
+            policy_environment=upsert_tree(base=base_environment, to_upsert=to_upsert),
+            processed_data=processed_data,
+            specialized_environment=SpecializedEnvironment(tt_dag=tt_dag)
+            if _only_replaces_params(
+                to_upsert=to_upsert, base_environment=base_environment
+            )
+            else None,
+            include_warn_nodes=False,
+        )
+        s.add_arrays(results)
+    return results
+
+
+def _only_replaces_params(
+    to_upsert: NestedData,
+    base_environment: PolicyEnvironment,
+) -> bool:
+    """Whether upserting *to_upsert* leaves the graph of functions unchanged."""
+    flat_base_environment = dt.flatten_to_qnames(base_environment)
+    return all(
+        qname in flat_base_environment
+        and not callable(flat_base_environment[qname])
+        and not callable(element)
+        for qname, element in dt.flatten_to_qnames(to_upsert).items()
+    )
+
+
+def _fail_if_variants_are_invalid(
+    variants: Mapping[str, NestedData],
+    base_environment: PolicyEnvironment,
+) -> None:
+    if not variants:
+        msg = "Specify at least one policy variant."
+        raise ValueError(msg)
+    flat_base_environment = dt.flatten_to_qnames(base_environment)
+    for name, to_upsert in variants.items():
+        unknown_qnames = sorted(
+            qname
+            for qname, element in dt.flatten_to_qnames(to_upsert).items()
+            if qname not in flat_base_environment and not callable(element)
+        )
+        if unknown_qnames:
+            msg = (
+                f"Policy variant '{name}' sets parameters that are not part of the "
+                f"policy environment: {unknown_qnames}"
+            )
+            raise ValueError(msg)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import dags.tree as dt
+import numpy as np
+
+from _gettsim_personas.batch import PersonaBatch
+from _gettsim_personas.instrumentation import stage
+from _gettsim_personas.persona_objects import (
+    Persona,
+    _fail_if_bruttolohn_m_linspace_grid_is_invalid,
+    upsert_with_bruttolohn_m_linspace_grid,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from _gettsim_personas.persona_objects import LinspaceGridProtocol
+    from _gettsim_personas.typing import NestedData
+
+# Suffixes of GETTSIM columns aggregated at the level of a group. The values are
+# repeated for each member of the group, `<suffix>_id` identifies the groups.
+GROUP_SUFFIXES = ("hh", "bg", "eg", "fg", "wthh", "sn", "ehe")
+
+
+@dataclass(frozen=True)
+class PopulationComponent:
+    """A persona standing in for a share of the population.
+
+    Attributes:
+        persona:
+            The persona, e.g. `Couple1Child(policy_date_str="2025-01-01")`.
+        weight:
+            The number of households represented by the persona. Either a scalar,
+            which is split evenly over the points of the linspace grid, or an array
+            with the number of households represented by each grid point.
+        bruttolohn_m_linspace_grid:
+            (Optional) A linspace grid of earnings, created via the LinspaceGrid
+            method of the persona's class.
+    """
+
+    persona: Persona
+    weight: float | np.ndarray
+    bruttolohn_m_linspace_grid: LinspaceGridProtocol | None = None
+
+    @property
+    def n_points(self) -> int:
+        if self.bruttolohn_m_linspace_grid is None:
+            return 1
+        return self.bruttolohn_m_linspace_grid.n_points
+
+
+@dataclass(frozen=True)
+class WeightedPopulation:
+    """Households of several personas with one weight per household.
+
+    Attributes:
+        persona:
+            A persona holding the stacked households of all components. Evaluate it as
+            any other persona.
+        weight:
+            The weight of each row's household, i.e. the same for all members.
+        component:
+            The index of the component each row stems from.
+    """
+
+    persona: Persona
+    weight: np.ndarray
+    component: np.ndarray
+
+    @property
+    def n_households(self) -> int:
+        return len(np.unique(self.persona.input_data_tree["hh_id"]))
+
+    def aggregate(
+        self,
+        results: NestedData,
+        *,
+        by_component: bool = False,
+    ) -> NestedData:
+        """Weighted totals of GETTSIM *results* for this population.
+
+        Columns aggregated at a group level (e.g. `betrag_m_bg`) are counted once per
+        group. This requires the group IDs (e.g. `bg_id`) to be part of *results*,
+        except for `hh_id`, which is taken from the input data.
+
+        Example:
+            >>> results = evaluate(population.persona)
+            >>> population.aggregate(results)["bürgergeld"]["betrag_m_bg"]
+
+        Args:
+            results:
+                The results of evaluating `persona`.
+            by_component:
+                Whether to return one total per component instead of a single total.
+
+        Returns:
+            The totals, with the same tree structure as *results*.
+        """
+        qname_results = dt.flatten_to_qnames(results)
+        group_ids = {"hh_id": self.persona.input_data_tree["hh_id"], **qname_results}
+        n_components = int(self.component.max()) + 1
+        totals = {}
+        with stage("aggregate"):
+            for qname, values in qname_results.items():
+                if qname.endswith("_id") or "p_id_" in qname:
+                    continue
+                first_in_group = _first_in_group(qname=qname, group_ids=group_ids)
+                weighted = np.where(first_in_group, self.weight * values, 0.0)
+                if by_component:
+                    totals[qname] = np.bincount(
+                        self.component, weights=weighted, minlength=n_components
+                    )
+                else:
+                    totals[qname] = weighted.sum()
+        return dt.unflatten_from_qnames(totals)
+
+
+def build_population(components: Sequence[PopulationComponent]) -> WeightedPopulation:
+    """Stack the households of all *components* into a weighted population.
+
+    Each component is copied once per point of its linspace grid, all copies are
+    stacked, and IDs and pointers are re-keyed such that every copy forms its own
+    household.
+
+    Example:
+        >>> population = build_population(
+        ...     [
+        ...         PopulationComponent(
+        ...             persona=SingleAdult(policy_date_str="2025-01-01"),
+        ...             weight=17e6,
+        ...             bruttolohn_m_linspace_grid=SingleAdult.LinspaceGrid(
+        ...                 p0=LinspaceRange(0, 8000), n_points=1000
+        ...             ),
+        ...         ),
+        ...         PopulationComponent(
+        ...             persona=Couple1Child(policy_date_str="2025-01-01"),
+        ...             weight=4e6,
+        ...         ),
+        ...     ]
+        ... )
+
+    Args:
+        components:
+            The personas making up the population and their weights.
+
+    Returns:
+        The weighted population.
+    """
+    _fail_if_components_are_incompatible(components)
+    with stage("build_population") as s:
+        batches = []
+        weight = []
+        component = []
+        for i, c in enumerate(components):
+            data = dt.flatten_to_qnames(c.persona.input_data_tree)
+            n_members = len(data["p_id"])
+            if c.bruttolohn_m_linspace_grid is not None:
+                data = upsert_with_bruttolohn_m_linspace_grid(
+                    qname_input_data=data,
+                    bruttolohn_m_linspace_grid=c.bruttolohn_m_linspace_grid,
+                )
+            batches.append(PersonaBatch(data))
+            weight_per_point = np.broadcast_to(
+                np.asarray(c.weight, dtype=float)
+                / (1 if np.ndim(c.weight) else c.n_points),
+                c.n_points,
+            )
+            weight.append(np.repeat(weight_per_point, n_members))
+            component.append(np.full(len(data["p_id"]), i))
+
+        stacked = PersonaBatch.concat(batches).columns
+        s.add_arrays(stacked)
+
+    first = components[0].persona
+    tt_targets = {}
+    for c in components:
+        tt_targets.update(dict.fromkeys(dt.qnames(c.persona.tt_targets_tree)))
+    tt_targets.pop("hh_id", None)
+    return WeightedPopulation(
+        persona=Persona(
+            description="Weighted population of "
+            f"{len(components)} personas.\n\n{first.description}",
+            policy_date=first.policy_date,
+            evaluation_date=first.evaluation_date,
+            input_data_tree=dt.unflatten_from_qnames(stacked),
+            tt_targets_tree={"hh_id": None, **dt.unflatten_from_qnames(tt_targets)},
+        ),
+        weight=np.concatenate(weight),
+        component=np.concatenate(component),
+    )
+
+
+def _first_in_group(
+    qname: str,
+    group_ids: dict[str, np.ndarray],
+) -> np.ndarray | bool:
+    """Mask of the rows that count a value of column *qname*."""
+    suffix = qname.rsplit("_", 1)[-1]
+    if suffix not in GROUP_SUFFIXES:
+        return True
+    group_id = group_ids.get(f"{suffix}_id")
+    if group_id is None:
+        msg = (
+            f"Cannot aggregate '{qname}' without '{suffix}_id'. Add '{suffix}_id' to "
+            "the targets of the persona."
+        )
+        raise ValueError(msg)
+    _, first_rows = np.unique(group_id, return_index=True)
+    first_in_group = np.zeros(len(group_id), dtype=bool)
+    first_in_group[first_rows] = True
+    return first_in_group
+
+
+def _fail_if_components_are_incompatible(
+    components: Sequence[PopulationComponent],
+) -> None:
+    if not components:
+        msg = "Specify at least one population component."
+        raise ValueError(msg)
+    first = components[0].persona
+    qnames = set(dt.qnames(first.input_data_tree))
+    for c in components:
+        if c.persona.policy_date != first.policy_date:
+            msg = (
+                "All personas of a population must have the same policy date, got: "
+                f"{first.policy_date} and {c.persona.policy_date}."
+            )
+            raise ValueError(msg)
+        if c.persona.evaluation_date != first.evaluation_date:
+            msg = "All personas of a population must have the same evaluation date."
+            raise ValueError(msg)
+        differing = qnames ^ set(dt.qnames(c.persona.input_data_tree))
+        if differing:
+            msg = (
+                "All personas of a population must have the same input columns. "
+                f"The following columns are not part of all personas: "
+                f"{sorted(differing)}"
+            )
+            raise ValueError(msg)
+        if c.bruttolohn_m_linspace_grid is not None:
+            _fail_if_bruttolohn_m_linspace_grid_is_invalid(
+                linspace_grid=c.bruttolohn_m_linspace_grid,
+                p_id_array=c.persona.input_data_tree["p_id"],
+            )
+        if np.ndim(c.weight) and np.shape(c.weight) != (c.n_points,):
+            msg = (
+                "Weights given as arrays must have one entry per grid point "
+                f"({c.n_points}), got shape {np.shape(c.weight)}."
+            )
+            raise ValueError(msg)
+        if np.any(np.asarray(c.weight) < 0):
+            msg = "Weights must be non-negative."
+            raise ValueError(msg)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import fnmatch
+import functools
+import importlib
+from typing import TYPE_CHECKING
+
+from _gettsim_personas.persona_objects import OrigPersonaOverTime
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+PERSONA_AREAS = (
+    "einkommensteuer_sozialabgaben",
+    "gesetzliche_altersrente",
+    "grundsicherung_für_erwerbsfähige",
+    "grundsicherung_im_alter",
+)
+
+
+@functools.cache
+def persona_registry() -> dict[str, OrigPersonaOverTime]:
+    """All personas shipped with this package, keyed by `<area>.<name>`.
+
+    Example:
+        >>> persona_registry()["einkommensteuer_sozialabgaben.Couple1Child"]
+    """
+    registry: dict[str, OrigPersonaOverTime] = {}
+    for area in PERSONA_AREAS:
+        module = importlib.import_module(f"_gettsim_personas.de.{area}")
+        for name in module.__all__:
+            obj = getattr(module, name)
+            if isinstance(obj, OrigPersonaOverTime):
+                registry[f"{area}.{name}"] = obj
+    return registry
+
+
+def get_persona(
+    name: str,
+    registry: dict[str, OrigPersonaOverTime] | None = None,
+) -> OrigPersonaOverTime:
+    """The persona named *name* in *registry* (default: `persona_registry()`)."""
+    registry = persona_registry() if registry is None else registry
+    if name not in registry:
+        msg = f"Unknown persona: '{name}'. Available personas are:\n\n" + "\n".join(
+            registry
+        )
+        raise ValueError(msg)
+    return registry[name]
+
+
+def select_personas(
+    patterns: Iterable[str],
+    registry: dict[str, OrigPersonaOverTime] | None = None,
+) -> dict[str, OrigPersonaOverTime]:
+    """Personas in *registry* whose names match any of the glob *patterns*.
+
+    Example:
+        >>> select_personas(["grundsicherung_im_alter.*"])
+    """
+    registry = persona_registry() if registry is None else registry
+    selected: dict[str, OrigPersonaOverTime] = {}
+    for pattern in patterns:
+        matches = fnmatch.filter(registry, pattern)
+        if not matches:
+            get_persona(pattern, registry=registry)
+        selected.update({name: registry[name] for name in matches})
+    return selected
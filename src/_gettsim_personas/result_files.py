@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import importlib.util
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+OUTPUT_SUFFIXES = (".parquet", ".npz")
+
+
+def write_results(table: dict[str, np.ndarray], path: Path) -> None:
+    """Write *table* to Parquet or NPZ, depending on the suffix of *path*."""
+    _fail_if_output_suffix_is_invalid(path)
+    _fail_if_pyarrow_is_missing(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".npz":
+        np.savez(path, **table)
+        return
+    import pyarrow as pa  # noqa: PLC0415
+    import pyarrow.parquet as pq  # noqa: PLC0415
+
+    pq.write_table(pa.table(table), path)
+
+
+def _fail_if_output_suffix_is_invalid(path: Path) -> None:
+    if path.suffix not in OUTPUT_SUFFIXES:
+        msg = f"Output file must end in one of {OUTPUT_SUFFIXES}, got: '{path.name}'."
+        raise ValueError(msg)
+
+
+def _fail_if_pyarrow_is_missing(path: Path) -> None:
+    if path.suffix == ".parquet" and importlib.util.find_spec("pyarrow") is None:
+        msg = (
+            "Writing Parquet files requires pyarrow. Install it via "
+            "`pip install gettsim-personas[arrow]` or write to a .npz file."
+        )
+        raise ImportError(msg)
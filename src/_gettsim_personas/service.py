@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+import copy
+import functools
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs, urlparse
+
+import dags.tree as dt
+import numpy as np
+from ttsim.interface_dag_elements.shared import to_datetime
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.registry import get_persona, persona_registry
+from _gettsim_personas.upsert import _fail_if_data_lengths_are_incompatible
+
+if TYPE_CHECKING:
+    import datetime
+    from collections.abc import Hashable
+
+    from _gettsim_personas.persona_objects import OrigPersonaOverTime, Persona
+    from _gettsim_personas.typing import NestedData
+
+DEFAULT_BATCH_WINDOW = 0.01
+ARROW_STREAM_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+
+
+@dataclass
+class _Batch:
+    """Requests for the same persona and dates that are evaluated together."""
+
+    input_data: list[NestedData | None] = field(default_factory=list)
+    done: threading.Event = field(default_factory=threading.Event)
+    outcomes: list[NestedData | Exception] = field(default_factory=list)
+
+
+class PersonaService:
+    """Evaluate persona requests, keeping personas and policy environments warm.
+
+    A request is a dictionary (e.g. parsed from JSON) with keys
+
+    - `persona`: the name of the persona, see `persona_registry`,
+    - `policy_date`: the policy date as a dashed ISO string,
+    - `evaluation_date` (optional): the evaluation date as a dashed ISO string,
+    - `input_data` (optional): nested lists with input data to upsert, see
+      `Persona.upsert_input_data`.
+
+    Requests for the same persona and dates that upsert the same columns and arrive
+    within *batch_window* seconds are stacked and evaluated in a single call to
+    GETTSIM. If that call fails, the requests of the batch are evaluated one by one,
+    so that an invalid request does not fail the others. Policy environments are
+    created once per policy date.
+
+    Args:
+        personas:
+            The personas that can be requested by name. Defaults to all personas
+            shipped with this package.
+        batch_window:
+            Number of seconds to wait for further requests to batch with.
+    """
+
+    def __init__(
+        self,
+        personas: dict[str, OrigPersonaOverTime] | None = None,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+    ) -> None:
+        self.personas = personas if personas is not None else persona_registry()
+        self.batch_window = batch_window
+        self._lock = threading.Lock()
+        self._open_batches: dict[Hashable, _Batch] = {}
+
+    def evaluate(self, request: dict[str, Any]) -> NestedData:
+        """Evaluate a single request, batching it with concurrent similar requests.
+
+        Returns:
+            The results with the same structure as the persona's targets.
+        """
+        orig_persona_name, policy_date, evaluation_date, input_data = (
+            self._parse_request(request)
+        )
+        key = (
+            orig_persona_name,
+            policy_date,
+            evaluation_date,
+            tuple(sorted(dt.qnames(input_data))) if input_data else None,
+        )
+        with self._lock:
+            batch = self._open_batches.get(key)
+            is_leader = batch is None
+            if batch is None:
+                batch = self._open_batches[key] = _Batch()
+            position = len(batch.input_data)
+            batch.input_data.append(input_data)
+
+        if is_leader:
+            time.sleep(self.batch_window)
+            with self._lock:
+                del self._open_batches[key]
+            try:
+                batch.outcomes = self._evaluate_batch(
+                    orig_persona_name=orig_persona_name,
+                    policy_date=policy_date,
+                    evaluation_date=evaluation_date,
+                    input_data=batch.input_data,
+                )
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        outcome = batch.outcomes[position]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def warm_up(self, policy_date_str: str) -> None:
+        """Create all personas and the policy environment at *policy_date_str*."""
+        policy_date = to_datetime(policy_date_str)
+        evaluation.cached_policy_environment(policy_date)
+        for orig_persona in self.personas.values():
+            if orig_persona.start_date <= policy_date <= orig_persona.end_date:
+                _base_persona(orig_persona, policy_date, policy_date)
+
+    def _parse_request(
+        self, request: dict[str, Any]
+    ) -> tuple[str, datetime.date, datetime.date, NestedData | None]:
+        _fail_if_request_is_invalid(request)
+        name = request["persona"]
+        orig_persona = get_persona(name, registry=self.personas)
+        policy_date = to_datetime(request["policy_date"])
+        evaluation_date = (
+            to_datetime(request["evaluation_date"])
+            if request.get("evaluation_date")
+            else policy_date
+        )
+        input_data = (
+            dt.unflatten_from_qnames(
+                {
+                    qname: np.asarray(values)
+                    for qname, values in dt.flatten_to_qnames(
+                        request["input_data"]
+                    ).items()
+                }
+            )
+            if request.get("input_data")
+            else None
+        )
+        if input_data:
+            _fail_if_data_lengths_are_incompatible(
+                data_to_upsert=input_data,
+                data_from_persona=_base_persona(
+                    orig_persona, policy_date, evaluation_date
+                ).input_data_tree,
+            )
+        return name, policy_date, evaluation_date, input_data
+
+    def _evaluate_batch(
+        self,
+        orig_persona_name: str,
+        policy_date: datetime.date,
+        evaluation_date: datetime.date,
+        input_data: list[NestedData | None],
+    ) -> list[NestedData | Exception]:
+        """The results of each request in the batch, or the error it raised."""
+        evaluate_stacked = functools.partial(
+            self._evaluate_stacked,
+            orig_persona_name=orig_persona_name,
+            policy_date=policy_date,
+            evaluation_date=evaluation_date,
+        )
+        try:
+            return evaluate_stacked(input_data=input_data)
+        except Exception as e:  # noqa: BLE001
+            if len(input_data) == 1 or input_data[0] is None:
+                return [e] * len(input_data)
+
+        outcomes: list[NestedData | Exception] = []
+        for data in input_data:
+            try:
+                outcomes.extend(evaluate_stacked(input_data=[data]))
+            except Exception as e:  # noqa: BLE001
+                outcomes.append(e)
+        return outcomes
+
+    def _evaluate_stacked(
+        self,
+        orig_persona_name: str,
+        policy_date: datetime.date,
+        evaluation_date: datetime.date,
+        input_data: list[NestedData | None],
+    ) -> list[NestedData]:
+        persona = _base_persona(
+            self.personas[orig_persona_name], policy_date, evaluation_date
+        )
+        policy_environment = evaluation.cached_policy_environment(policy_date)
+        if input_data[0] is None:
+            # Identical requests, evaluate once.
+            results = evaluation.evaluate(persona, policy_environment)
+            return [results, *(copy.deepcopy(results) for _ in input_data[1:])]
+
+        flat_input_data = [dt.flatten_to_qnames(data) for data in input_data]
+        lengths = [len(next(iter(data.values()))) for data in flat_input_data]
+        stacked_input_data = {
+            qname: np.concatenate([data[qname] for data in flat_input_data])
+            for qname in flat_input_data[0]
+        }
+        results = evaluation.evaluate(
+            persona.upsert_input_data(dt.unflatten_from_qnames(stacked_input_data)),
+            policy_environment,
+        )
+        if "hh_id" not in persona.tt_targets_tree:
+            # Upserting adds `hh_id` as a target once the stacked data holds several
+            # households, which a request evaluated on its own would not return.
+            results = {k: v for k, v in results.items() if k != "hh_id"}
+        return split_results(results, lengths=lengths)
+
+
+@functools.lru_cache(maxsize=256)
+def _base_persona(
+    orig_persona: OrigPersonaOverTime,
+    policy_date: datetime.date,
+    evaluation_date: datetime.date,
+) -> Persona:
+    return orig_persona(
+        policy_date_str=policy_date.isoformat(),
+        evaluation_date_str=evaluation_date.isoformat(),
+    )
+
+
+def split_results(results: NestedData, lengths: list[int]) -> list[NestedData]:
+    """Split the results of stacked requests into the results of each request."""
+    offsets = np.cumsum(lengths)[:-1]
+    flat_results = dt.flatten_to_qnames(results)
+    split_flat_results = {
+        qname: np.split(np.asarray(array), offsets)
+        for qname, array in flat_results.items()
+    }
+    return [
+        dt.unflatten_from_qnames(
+            {qname: arrays[i] for qname, arrays in split_flat_results.items()}
+        )
+        for i in range(len(lengths))
+    ]
+
+
+def results_to_json(results: NestedData) -> bytes:
+    """Serialize results as JSON with nested lists.
+
+    JSON has no representation of NaN and infinity, so they become `null`.
+    """
+    return json.dumps(
+        dt.unflatten_from_qnames(
+            {
+                qname: _to_json_list(array)
+                for qname, array in dt.flatten_to_qnames(results).items()
+            }
+        ),
+        allow_nan=False,
+    ).encode()
+
+
+def _to_json_list(array: np.ndarray) -> list[Any]:
+    array = np.asarray(array)
+    if np.issubdtype(array.dtype, np.floating):
+        array = np.where(np.isfinite(array), array, None)
+    return array.tolist()
+
+
+def results_to_arrow(results: NestedData) -> bytes:
+    """Serialize results as an Arrow IPC stream with one column per qname.
+
+    Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa  # noqa: PLC0415
+    except ImportError as e:
+        msg = (
+            "Returning results as Arrow requires pyarrow. Install it via "
+            "`pip install gettsim-personas[arrow]`."
+        )
+        raise ImportError(msg) from e
+    table = pa.table(
+        {
+            qname: np.asarray(array)
+            for qname, array in dt.flatten_to_qnames(results).items()
+        }
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def make_server(
+    service: PersonaService | None = None,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+) -> ThreadingHTTPServer:
+    """Create an HTTP server for *service*.
+
+    Endpoints:
+        - `GET /personas`: the names of all personas as a JSON list.
+        - `POST /evaluate`: evaluate the JSON request in the body (see
+          `PersonaService`). Results are returned as JSON, or as an Arrow IPC stream
+          if requested via `?format=arrow` or the `Accept` header.
+
+    Pass `port=0` to let the operating system choose a free port, available as
+    `server.server_address[1]`.
+    """
+    service = service or PersonaService()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if urlparse(self.path).path != "/personas":
+                self._respond(HTTPStatus.NOT_FOUND, {"error": "Not found."})
+                return
+            self._respond(HTTPStatus.OK, list(service.personas))
+
+        def do_POST(self) -> None:
+            url = urlparse(self.path)
+            if url.path != "/evaluate":
+                self._respond(HTTPStatus.NOT_FOUND, {"error": "Not found."})
+                return
+            as_arrow = (
+                parse_qs(url.query).get("format") == ["arrow"]
+                or self.headers.get("Accept") == ARROW_STREAM_CONTENT_TYPE
+            )
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"null")
+                results = service.evaluate(request)
+                body = (
+                    results_to_arrow(results) if as_arrow else results_to_json(results)
+                )
+            except (ValueError, TypeError, NotImplementedError, ImportError) as e:
+                self._respond(HTTPStatus.BAD_REQUEST, {"error": str(e).strip()})
+                return
+            except Exception as e:  # noqa: BLE001
+                self._respond(
+                    HTTPStatus.INTERNAL_SERVER_ERROR,
+                    {"error": f"{type(e).__name__}: {str(e).strip()}"},
+                )
+                return
+            self._send(
+                HTTPStatus.OK,
+                body,
+                ARROW_STREAM_CONTENT_TYPE if as_arrow else "application/json",
+            )
+
+        def _respond(self, status: HTTPStatus, content: object) -> None:
+            self._send(
+                status,
+                json.dumps(content, allow_nan=False).encode(),
+                "application/json",
+            )
+
+        def _send(self, status: HTTPStatus, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    warm_up_policy_dates: list[str] | None = None,
+    batch_window: float = DEFAULT_BATCH_WINDOW,
+) -> None:
+    """Serve all personas shipped with this package until interrupted."""
+    service = PersonaService(batch_window=batch_window)
+    for policy_date_str in warm_up_policy_dates or []:
+        service.warm_up(policy_date_str)
+    with make_server(service, host=host, port=port) as server:
+        server.serve_forever()
+
+
+def _fail_if_request_is_invalid(request: Any) -> None:
+    if not isinstance(request, dict):
+        msg = f"The request must be a JSON object, got: {request!r}"
+        raise TypeError(msg)
+    missing_keys = {"persona", "policy_date"} - set(request)
+    if missing_keys:
+        msg = f"Missing keys in request: {sorted(missing_keys)}"
+        raise ValueError(msg)
+    unknown_keys = set(request) - {
+        "persona",
+        "policy_date",
+        "evaluation_date",
+        "input_data",
+    }
+    if unknown_keys:
+        msg = f"Unknown keys in request: {sorted(unknown_keys)}"
+        raise ValueError(msg)
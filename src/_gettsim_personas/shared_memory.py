@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import contextlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Self
+
+import dags.tree as dt
+import numpy as np
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.batch import PersonaBatch
+from _gettsim_personas.instrumentation import stage
+from _gettsim_personas.persona_objects import Persona
+
+if TYPE_CHECKING:
+    import datetime
+    from collections.abc import Iterator
+    from concurrent.futures import Executor
+
+    from _gettsim_personas.typing import NestedData, NestedStrings
+
+# Columns start at multiples of a cache line.
+ALIGNMENT = 64
+
+
+@dataclass(frozen=True)
+class SharedColumn:
+    """Location of an input column in a shared memory block."""
+
+    qname: str
+    dtype: str
+    shape: tuple[int, ...]
+    offset: int
+
+
+@dataclass(frozen=True)
+class SharedPersonaBatch:
+    """A persona whose input data lives in shared memory.
+
+    Only holds the name of the shared memory block and the location of each column, so
+    it is cheap to send to worker processes. Workers obtain the persona via
+    `attach_persona`.
+    """
+
+    shm_name: str
+    columns: tuple[SharedColumn, ...]
+    n_rows: int
+    description: str
+    policy_date: datetime.date
+    evaluation_date: datetime.date | tuple[datetime.date, ...]
+    tt_targets_tree: NestedStrings
+
+
+class SharedPersona:
+    """Owner of a shared memory block holding the input data of a persona.
+
+    The block is released when leaving the context.
+
+    Example:
+        >>> with SharedPersona(persona) as shared:
+        ...     executor.map(work, itertools.repeat(shared.batch), shared.row_slices(4))
+    """
+
+    def __init__(self, persona: Persona) -> None:
+        qname_input_data = {
+            qname: np.asarray(array)
+            for qname, array in dt.flatten_to_qnames(persona.input_data_tree).items()
+        }
+        _fail_if_input_data_cannot_be_shared(qname_input_data)
+        columns = []
+        offset = 0
+        for qname, array in qname_input_data.items():
+            columns.append(
+                SharedColumn(
+                    qname=qname,
+                    dtype=array.dtype.str,
+                    shape=array.shape,
+                    offset=offset,
+                )
+            )
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        self._shm = SharedMemory(create=True, size=max(offset, 1))
+        with stage("share_persona") as s:
+            for column, array in zip(columns, qname_input_data.values(), strict=True):
+                _view(self._shm, column)[...] = array
+            s.add_arrays(qname_input_data)
+
+        self._hh_id = qname_input_data.get("hh_id")
+        self._household_offsets = PersonaBatch(qname_input_data).household_offsets
+        self.batch = SharedPersonaBatch(
+            shm_name=self._shm.name,
+            columns=tuple(columns),
+            n_rows=len(qname_input_data["p_id"]),
+            description=persona.description,
+            policy_date=persona.policy_date,
+            evaluation_date=persona.evaluation_date,
+            tt_targets_tree=persona.tt_targets_tree,
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the shared memory block."""
+        self._shm.close()
+        with contextlib.suppress(FileNotFoundError):
+            self._shm.unlink()
+
+    def row_slices(self, n_parts: int) -> list[slice]:
+        """Split the rows into at most *n_parts* slices of whole households.
+
+        Pointers only refer to members of the same household, so each slice is a valid
+        persona without re-keying any IDs.
+        """
+        if self._hh_id is None:
+            return [slice(0, self.batch.n_rows)]
+        n_households = len(self._household_offsets) - 1
+        _fail_if_households_are_not_contiguous(self._hh_id, n_households=n_households)
+        bounds = [
+            int(self._household_offsets[households[0]])
+            for households in np.array_split(np.arange(n_households), n_parts)
+            if len(households)
+        ]
+        return [
+            slice(start, stop)
+            for start, stop in itertools.pairwise([*bounds, self.batch.n_rows])
+        ]
+
+
+@contextlib.contextmanager
+def attach_persona(
+    batch: SharedPersonaBatch,
+    rows: slice | None = None,
+) -> Iterator[Persona]:
+    """Attach to the shared input data of *batch* without copying it.
+
+    The input arrays of the persona are read-only views of the shared memory block. All
+    references to them must be dropped before leaving the context, otherwise the block
+    cannot be closed.
+
+    Args:
+        batch:
+            The batch, see `SharedPersona.batch`.
+        rows:
+            (Optional) The rows to select, see `SharedPersona.row_slices`.
+    """
+    shm = SharedMemory(name=batch.shm_name)
+    rows = rows if rows is not None else slice(None)
+    qname_input_data = {}
+    for column in batch.columns:
+        view = _view(shm, column)[rows]
+        view.flags.writeable = False
+        qname_input_data[column.qname] = view
+    try:
+        yield Persona(
+            description=batch.description,
+            policy_date=batch.policy_date,
+            evaluation_date=batch.evaluation_date,
+            input_data_tree=dt.unflatten_from_qnames(qname_input_data),
+            tt_targets_tree=batch.tt_targets_tree,
+        )
+    finally:
+        del qname_input_data, view
+        shm.close()
+
+
+def evaluate_shared_rows(
+    batch: SharedPersonaBatch,
+    rows: slice | None = None,
+) -> dict[str, np.ndarray]:
+    """Evaluate *rows* of a shared persona with GETTSIM, typically in a worker.
+
+    Returns:
+        The flat results, copied out of shared memory.
+    """
+    with attach_persona(batch, rows=rows) as persona:
+        results = dt.flatten_to_qnames(
+            evaluation.evaluate(
+                persona,
+                policy_environment=evaluation.cached_policy_environment(
+                    batch.policy_date
+                ),
+            )
+        )
+        # Results may be views of the input data, which must not outlive the context.
+        copied_results = {qname: np.array(array) for qname, array in results.items()}
+        del persona, results
+    return copied_results
+
+
+def evaluate_in_parallel(
+    persona: Persona,
+    n_workers: int,
+    executor: Executor | None = None,
+) -> NestedData:
+    """Evaluate *persona* with GETTSIM, split by households over *n_workers*.
+
+    The input data is placed in shared memory once; workers receive a small
+    `SharedPersonaBatch` and attach to their rows without copying them.
+
+    Args:
+        persona:
+            The persona, typically with many households, e.g. created via a linspace
+            grid.
+        n_workers:
+            The number of parts to split the households into.
+        executor:
+            (Optional) The executor to run the parts in. Defaults to a
+            `ProcessPoolExecutor` with *n_workers* processes.
+
+    Returns:
+        The results, as returned by `evaluate`.
+    """
+    with SharedPersona(persona) as shared:
+        row_slices = shared.row_slices(n_workers)
+        with (
+            contextlib.nullcontext(executor)
+            if executor is not None
+            else ProcessPoolExecutor(max_workers=n_workers)
+        ) as ex:
+            parts = list(
+                ex.map(evaluate_shared_rows, itertools.repeat(shared.batch), row_slices)
+            )
+    return dt.unflatten_from_qnames(
+        {qname: np.concatenate([part[qname] for part in parts]) for qname in parts[0]}
+    )
+
+
+def _view(shm: SharedMemory, column: SharedColumn) -> np.ndarray:
+    return np.ndarray(
+        shape=column.shape,
+        dtype=np.dtype(column.dtype),
+        buffer=shm.buf,
+        offset=column.offset,
+    )
+
+
+def _fail_if_input_data_cannot_be_shared(
+    qname_input_data: dict[str, np.ndarray],
+) -> None:
+    if "p_id" not in qname_input_data:
+        msg = "The input data of the persona must contain 'p_id'."
+        raise ValueError(msg)
+    object_columns = sorted(
+        qname for qname, array in qname_input_data.items() if array.dtype.hasobject
+    )
+    if object_columns:
+        msg = f"Columns of dtype object cannot be shared: {object_columns}"
+        raise TypeError(msg)
+
+
+def _fail_if_households_are_not_contiguous(
+    hh_id: np.ndarray,
+    n_households: int,
+) -> None:
+    if len(np.unique(hh_id)) != n_households:
+        msg = "Members of a household must be stored in consecutive rows."
+        raise ValueError(msg)
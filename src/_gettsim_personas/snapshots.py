@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import ast
+import datetime
+import functools
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOTS_DIRNAME = "_snapshots"
+_INDEX_FILENAME = "index.json"
+_ARRAYS_DIRNAME = "arrays"
+
+
+@dataclass(frozen=True)
+class SnapshotInterval:
+    """Precomputed persona data for a period with a constant set of active elements.
+
+    Attributes:
+        start_date:
+            First policy date of the interval.
+        end_date:
+            Last policy date of the interval.
+        description:
+            The active persona description.
+        input_qnames:
+            All active input qnames in the order in which the persona returns them.
+        live_input_qnames:
+            Input qnames that depend on the evaluation date and must be computed when
+            the persona is called.
+        array_files:
+            Mapping from the remaining input qnames to array files in the snapshot.
+        tt_targets:
+            The active target qnames.
+    """
+
+    start_date: datetime.date
+    end_date: datetime.date
+    description: str
+    input_qnames: tuple[str, ...]
+    live_input_qnames: tuple[str, ...]
+    array_files: dict[str, str]
+    tt_targets: tuple[str, ...]
+
+    def is_active(self, policy_date: datetime.date) -> bool:
+        return self.start_date <= policy_date <= self.end_date
+
+
+@dataclass(frozen=True)
+class PersonaSnapshot:
+    """Precomputed input data of an OrigPersonaOverTime for all of its intervals."""
+
+    path: Path
+    source_hash: str
+    persona_size: int
+    intervals: tuple[SnapshotInterval, ...]
+
+    def interval(self, policy_date: datetime.date) -> SnapshotInterval | None:
+        """The interval that contains *policy_date*, if any."""
+        return next((i for i in self.intervals if i.is_active(policy_date)), None)
+
+    def load_arrays(self, interval: SnapshotInterval) -> dict[str, np.ndarray]:
+        """Load the precomputed arrays of *interval* as read-only memory maps."""
+        return {
+            qname: _load_array(self.path / _ARRAYS_DIRNAME / filename)
+            for qname, filename in interval.array_files.items()
+        }
+
+
+def default_snapshot_path(path_to_persona_elements: Path) -> Path:
+    """Location of the snapshot of the persona defined at *path_to_persona_elements*.
+
+    Snapshots live in a `_snapshots` directory next to the persona elements.
+    """
+    return (
+        path_to_persona_elements.parent
+        / SNAPSHOTS_DIRNAME
+        / path_to_persona_elements.stem
+    )
+
+
+def source_hash(path_to_persona_elements: Path) -> str:
+    """Hash identifying the persona definition a snapshot was built from.
+
+    Covers the file with the persona elements and the local modules it imports,
+    directly or indirectly. Local modules are those within the same top-level package
+    as the file, e.g. helpers next to the persona elements or
+    `_gettsim_personas.persona_elements`.
+    """
+    digest = hashlib.sha256(f"{SNAPSHOT_FORMAT_VERSION}".encode())
+    for path in local_module_paths(path_to_persona_elements):
+        digest.update(_file_hash(path=path, mtime_ns=path.stat().st_mtime_ns).encode())
+    return digest.hexdigest()
+
+
+def local_module_paths(path: Path) -> list[Path]:
+    """*path* and the files of the local modules it imports, see `source_hash`."""
+    path = path.resolve()
+    root = _package_root(path)
+    paths = [path]
+    i = 0
+    while i < len(paths):
+        imported = (
+            _imported_local_paths(
+                path=paths[i], root=root, mtime_ns=paths[i].stat().st_mtime_ns
+            )
+            if paths[i].suffix == ".py"
+            else ()
+        )
+        paths.extend(p for p in imported if p not in paths)
+        i += 1
+    return paths
+
+
+@functools.cache
+def _file_hash(path: Path, mtime_ns: int) -> str:  # noqa: ARG001
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@functools.cache
+def _imported_local_paths(
+    path: Path,
+    root: Path,
+    mtime_ns: int,  # noqa: ARG001
+) -> tuple[Path, ...]:
+    package = path.parent.relative_to(root.parent).parts
+    candidates = []
+    for node in ast.walk(ast.parse(path.read_bytes(), filename=str(path))):
+        if isinstance(node, ast.Import):
+            candidates.extend(alias.name.split(".") for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = [*package[: len(package) - node.level + 1]] if node.level else []
+            base += node.module.split(".") if node.module else []
+            candidates.append(base)
+            candidates.extend([*base, alias.name] for alias in node.names)
+    paths = []
+    for parts in candidates:
+        if not parts or parts[0] != root.name:
+            continue
+        module_path = root.parent.joinpath(*parts)
+        for file in (module_path.with_suffix(".py"), module_path / "__init__.py"):
+            if file.is_file() and file.resolve() not in paths:
+                paths.append(file.resolve())
+    return tuple(paths)
+
+
+def _package_root(path: Path) -> Path:
+    """The top-level package containing *path*, its directory if not in a package."""
+    root = path.parent
+    while (root.parent / "__init__.py").is_file():
+        root = root.parent
+    return root
+
+
+def load_snapshot(path: Path, expected_source_hash: str) -> PersonaSnapshot | None:
+    """Load the snapshot at *path*.
+
+    Returns None if there is no snapshot or if it was built from a different persona
+    definition, in which case the persona is computed from its elements.
+    """
+    index_path = path / _INDEX_FILENAME
+    if not index_path.is_file():
+        return None
+    snapshot = _load_snapshot(
+        path=path.resolve(),
+        mtime_ns=index_path.stat().st_mtime_ns,
+    )
+    if snapshot is None or snapshot.source_hash != expected_source_hash:
+        return None
+    return snapshot
+
+
+@functools.cache
+def _load_snapshot(
+    path: Path,
+    mtime_ns: int,  # noqa: ARG001
+) -> PersonaSnapshot | None:
+    index = json.loads((path / _INDEX_FILENAME).read_text(encoding="utf-8"))
+    if index["format_version"] != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return PersonaSnapshot(
+        path=path,
+        source_hash=index["source_hash"],
+        persona_size=index["persona_size"],
+        intervals=tuple(
+            SnapshotInterval(
+                start_date=datetime.date.fromisoformat(i["start_date"]),
+                end_date=datetime.date.fromisoformat(i["end_date"]),
+                description=i["description"],
+                input_qnames=tuple(i["input_qnames"]),
+                live_input_qnames=tuple(i["live_input_qnames"]),
+                array_files=i["array_files"],
+                tt_targets=tuple(i["tt_targets"]),
+            )
+            for i in index["intervals"]
+        ),
+    )
+
+
+def write_snapshot(
+    path: Path,
+    *,
+    source_hash: str,
+    persona_size: int,
+    intervals: Iterable[tuple[SnapshotInterval, dict[str, np.ndarray]]],
+) -> None:
+    """Write a snapshot to *path*.
+
+    Args:
+        path:
+            The snapshot directory.
+        source_hash:
+            The hash of the persona definition, see `source_hash`.
+        persona_size:
+            The number of members of the persona.
+        intervals:
+            Pairs of intervals and their precomputed arrays. The `array_files` of the
+            intervals are ignored. Identical arrays are stored only once.
+    """
+    arrays_path = path / _ARRAYS_DIRNAME
+    arrays_path.mkdir(parents=True, exist_ok=True)
+    index_intervals = []
+    for interval, arrays in intervals:
+        array_files = {}
+        for qname, array in arrays.items():
+            filename = f"{_array_hash(array)}.npy"
+            if not (arrays_path / filename).exists():
+                np.save(arrays_path / filename, array, allow_pickle=False)
+            array_files[qname] = filename
+        index_intervals.append(
+            {
+                "start_date": interval.start_date.isoformat(),
+                "end_date": interval.end_date.isoformat(),
+                "description": interval.description,
+                "input_qnames": list(interval.input_qnames),
+                "live_input_qnames": list(interval.live_input_qnames),
+                "array_files": array_files,
+                "tt_targets": list(interval.tt_targets),
+            }
+        )
+    index = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "source_hash": source_hash,
+        "persona_size": persona_size,
+        "intervals": index_intervals,
+    }
+    (path / _INDEX_FILENAME).write_text(
+        json.dumps(index, indent=1, ensure_ascii=False), encoding="utf-8"
+    )
+
+
+def _array_hash(array: np.ndarray) -> str:
+    digest = hashlib.sha256(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:32]
+
+
+@functools.cache
+def _load_array(path: Path) -> np.ndarray:
+    # Arrays are read-only, so one memory map per file can be shared by all personas.
+    # Return a plain ndarray view on it; downstream code should not need to care about
+    # np.memmap.
+    return np.asarray(np.load(path, mmap_mode="r", allow_pickle=False))
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import ast
+import functools
+import inspect
+import tomllib
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from _gettsim_personas.persona_elements import (
+    DEFAULT_END_DATE,
+    DEFAULT_START_DATE,
+    persona_description,
+    persona_input_element,
+    persona_pid_element,
+    persona_target_element,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from _gettsim_personas.typing import PersonaElement
+
+
+FORMULA_NAMESPACE = {"np": np}
+"""Names that may be used in formulas in addition to other qnames."""
+
+_ALLOWED_KEYS = {
+    "description": {"name", "description", "start_date", "end_date"},
+    "input": {"name", "qname", "values", "formula", "start_date", "end_date"},
+    "target": {"qname", "start_date", "end_date"},
+}
+_REQUIRED_KEYS = {
+    "description": {"description"},
+    "input": {"qname"},
+    "target": {"qname"},
+}
+
+
+def load_persona_elements_from_toml(path: Path) -> list[PersonaElement]:
+    """Load persona elements from a declarative TOML file.
+
+    The file consists of a top-level `p_id` array and arrays of tables named
+    `description`, `input` and `target`. Input tables either contain constant
+    `values` (one per member) or a `formula` that may reference
+    `evaluation_date`, other input qnames and `np`.
+
+    Example:
+        p_id = [0, 1]
+
+        [[description]]
+        description = "Some couple."
+
+        [[input]]
+        qname = "alter"
+        values = [30, 30]
+
+        [[input]]
+        qname = "geburtsjahr"
+        formula = "evaluation_date.year - alter"
+
+        [[target]]
+        qname = "einkommensteuer__betrag_m_sn"
+        end_date = 2024-12-31
+
+    Parsing results are cached by path and modification time of the file.
+    """
+    resolved_path = path.resolve()
+    return list(
+        _load_persona_elements_from_toml(
+            path=resolved_path,
+            mtime_ns=resolved_path.stat().st_mtime_ns,
+        )
+    )
+
+
+@functools.cache
+def _load_persona_elements_from_toml(
+    path: Path,
+    mtime_ns: int,  # noqa: ARG001
+) -> tuple[PersonaElement, ...]:
+    with path.open("rb") as f:
+        spec = tomllib.load(f)
+
+    _fail_if_toml_spec_is_invalid(spec=spec, path=path)
+
+    p_id_values = spec["p_id"]
+    elements: list[PersonaElement] = [
+        persona_pid_element()(_constant_function("p_id", p_id_values))
+    ]
+    elements.extend(
+        persona_description(description=table["description"], **_dates(table))(
+            _noop_function(table.get("name", "description"))
+        )
+        for table in spec.get("description", [])
+    )
+    for table in spec.get("input", []):
+        orig_name = table.get("name", table["qname"])
+        if "values" in table:
+            func = _constant_function(orig_name, table["values"])
+        else:
+            func = _formula_function(orig_name, table["formula"])
+        elements.append(
+            persona_input_element(tt_qname=table["qname"], **_dates(table))(func)
+        )
+    elements.extend(
+        persona_target_element(**_dates(table))(_noop_function(table["qname"]))
+        for table in spec.get("target", [])
+    )
+    return tuple(elements)
+
+
+def _dates(table: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "start_date": table.get("start_date", DEFAULT_START_DATE),
+        "end_date": table.get("end_date", DEFAULT_END_DATE),
+    }
+
+
+def _constant_function(name: str, values: list[Any]) -> Callable[[], np.ndarray]:
+    """Create a function that returns *values* as a new array on every call."""
+
+    def constant() -> np.ndarray:
+        return np.array(values)
+
+    constant.__name__ = name
+    return constant
+
+
+def _noop_function(name: str) -> Callable[[], None]:
+    def noop() -> None:
+        pass
+
+    noop.__name__ = name
+    return noop
+
+
+def _formula_function(name: str, formula: str) -> Callable[..., Any]:
+    """Create a function from a formula.
+
+    The arguments of the function are all names in the formula that are not part of
+    FORMULA_NAMESPACE. They are resolved by dags like any other argument of a persona
+    input element.
+    """
+    tree = ast.parse(formula, mode="eval")
+    arg_names = list(
+        dict.fromkeys(
+            node.id
+            for node in ast.walk(tree)
+            if isinstance(node, ast.Name) and node.id not in FORMULA_NAMESPACE
+        )
+    )
+    code = compile(tree, filename=f"<formula of {name}>", mode="eval")
+    signature = inspect.Signature(
+        [
+            inspect.Parameter(arg, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+            for arg in arg_names
+        ]
+    )
+
+    def formula_function(*args: Any, **kwargs: Any) -> Any:
+        bound = signature.bind(*args, **kwargs)
+        return eval(  # noqa: S307
+            code,
+            {"__builtins__": {}, **FORMULA_NAMESPACE},
+            dict(bound.arguments),
+        )
+
+    formula_function.__name__ = name
+    formula_function.__signature__ = signature  # ty: ignore[unresolved-attribute]
+    return formula_function
+
+
+def _fail_if_toml_spec_is_invalid(spec: dict[str, Any], path: Path) -> None:
+    if "p_id" not in spec:
+        msg = f"Expected a top-level 'p_id' array in {path!s}."
+        raise ValueError(msg)
+
+    unknown_sections = set(spec) - {"p_id", *_ALLOWED_KEYS}
+    if unknown_sections:
+        msg = f"Unknown sections in {path!s}: {sorted(unknown_sections)}"
+        raise ValueError(msg)
+
+    for section, allowed_keys in _ALLOWED_KEYS.items():
+        for table in spec.get(section, []):
+            unknown_keys = set(table) - allowed_keys
+            if unknown_keys:
+                msg = (
+                    f"Unknown keys in '{section}' table of {path!s}: "
+                    f"{sorted(unknown_keys)}"
+                )
+                raise ValueError(msg)
+            missing_keys = _REQUIRED_KEYS[section] - set(table)
+            if missing_keys:
+                msg = (
+                    f"Missing keys in '{section}' table of {path!s}: "
+                    f"{sorted(missing_keys)}"
+                )
+                raise ValueError(msg)
+
+    for table in spec.get("input", []):
+        if ("values" in table) == ("formula" in table):
+            msg = (
+                f"Input '{table.get('qname')}' in {path!s} must specify exactly one "
+                "of 'values' and 'formula'."
+            )
+            raise ValueError(msg)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 
 import dags.tree as dt
 import numpy as np
@@ -9,44 +9,47 @@ if TYPE_CHECKING:
     from _gettsim_personas.typing import NestedData
 
 
-def upsert_input_data(
-    input_data: NestedData,
-    data_to_upsert: NestedData,
-) -> NestedData:
-    """Upsert persona input data."""
-    _fail_if_data_to_upsert_is_not_dict_with_array_leafs(data_to_upsert)
-    _fail_if_data_lengths_are_incompatible(data_to_upsert, input_data)
-    flat_data_to_upsert = dt.flatten_to_tree_paths(data_to_upsert)
-    flat_input_data = dt.flatten_to_tree_paths(input_data)
-
-    expected_length = len(next(iter(flat_data_to_upsert.values())))
-    persona_length = len(next(iter(flat_input_data.values())))
-    number_of_new_personas = expected_length // persona_length
-
-    upserted_data = flat_data_to_upsert.copy()
-    for path, array in flat_input_data.items():
-        if path in upserted_data:
-            continue
-        if path == ("p_id",):
-            broadcasted_array = broadcast_p_id(
-                original_array=array,
-                expected_length=expected_length,
-            )
-        elif "p_id_" in path[-1]:
-            broadcasted_array = broadcast_foreign_keys(
-                original_array=array,
-                expected_length=expected_length,
-            )
-        elif path[-1].endswith("_id"):
-            broadcasted_array = broadcast_group_ids(
-                original_array=array, expected_length=expected_length
-            )
-        else:
-            broadcasted_array = np.tile(array, number_of_new_personas)
-
-        upserted_data[path] = broadcasted_array
-
-    return dt.unflatten_from_tree_paths(upserted_data)
+ColumnRole = Literal["p_id", "foreign_key", "group_id", "data"]
+
+
+def column_role(qname: str) -> ColumnRole:
+    """How the column *qname* changes when households are copied or stacked.
+
+    Example:
+        >>> column_role("familie__p_id_ehepartner")
+        'foreign_key'
+    """
+    name = dt.tree_path_from_qname(qname)[-1]
+    if qname == "p_id":
+        return "p_id"
+    if "p_id_" in name:
+        return "foreign_key"
+    if name.endswith("_id"):
+        return "group_id"
+    return "data"
+
+
+def broadcast_column(
+    role: ColumnRole,
+    array: np.ndarray,
+    expected_length: int,
+) -> np.ndarray:
+    """Broadcast a column with *role* to copies of the persona.
+
+    IDs and pointers are shifted such that each copy of the persona forms its own
+    household, all other arrays are repeated.
+    """
+    if role == "p_id":
+        return broadcast_p_id(original_array=array, expected_length=expected_length)
+    if role == "foreign_key":
+        return broadcast_foreign_keys(
+            original_array=array, expected_length=expected_length
+        )
+    if role == "group_id":
+        return broadcast_group_ids(
+            original_array=array, expected_length=expected_length
+        )
+    return np.tile(array, expected_length // len(array))
 
 
 def broadcast_p_id(original_array: np.ndarray, expected_length: int) -> np.ndarray:
@@ -59,14 +62,22 @@ def broadcast_p_id(original_array: np.ndarray, expected_length: int) -> np.ndarr
     return np.arange(expected_length)
 
 
+_INT_DTYPES = tuple(
+    (np.dtype(dtype), np.iinfo(dtype).max)
+    for dtype in (np.int8, np.int16, np.int32, np.int64)
+)
+
+
 def broadcast_group_ids(original_array: np.ndarray, expected_length: int) -> np.ndarray:
     """Broadcast array with group IDs.
 
     Group IDs are used to identify groups of rows that should be treated together.
     The exact values don't matter as long as they maintain the same grouping pattern.
+    The result has dense IDs (0, 1, ..., number of groups - 1) in the smallest integer
+    dtype that holds them; negative IDs (e.g., -1 for "no group") remain -1.
 
     Example:
-        >>> original_array = np.array([0, 1, 1])
+        >>> original_array = np.array([0, 5, 5])
         >>> expected_length = 6
         >>> broadcast_group_ids(original_array, expected_length)
         >>> 0    0
@@ -77,18 +88,41 @@ def broadcast_group_ids(original_array: np.ndarray, expected_length: int) -> np.
         >>> 5    3
     """
     number_of_personas = expected_length // len(original_array)
+    dense_ids, n_groups = dense_group_ids(original_array)
+    dtype = smallest_int_dtype(number_of_personas * n_groups - 1)
 
-    repeated_array = np.tile(original_array, reps=number_of_personas)
+    # One offset per copy of the persona. The number of groups alone may not fit into
+    # dtype, so the IDs are computed in int64 and cast at the end.
+    offsets = np.arange(number_of_personas, dtype=np.int64)[:, None] * n_groups
+    broadcast_ids = offsets + dense_ids
+    is_sentinel = dense_ids < 0
+    if is_sentinel.any():
+        broadcast_ids[:, is_sentinel] = -1
+    return broadcast_ids.reshape(-1).astype(dtype)
 
-    max_original_id = original_array.max()
-    to_add = np.repeat(
-        np.arange(number_of_personas) * (max_original_id + 1),
-        repeats=len(original_array),
-    )
 
-    repeated_array += to_add
+def dense_group_ids(group_ids: np.ndarray) -> tuple[np.ndarray, int]:
+    """Map group IDs to 0, 1, ..., number of groups - 1, keeping their order.
 
-    return repeated_array
+    Negative IDs are sentinels for "no group" and are mapped to -1.
+
+    Returns:
+        The dense IDs (int64) and the number of groups.
+    """
+    is_group = group_ids >= 0
+    unique_ids, inverse = np.unique(group_ids[is_group], return_inverse=True)
+    dense_ids = np.full(len(group_ids), -1, dtype=np.int64)
+    dense_ids[is_group] = inverse
+    return dense_ids, len(unique_ids)
+
+
+def smallest_int_dtype(max_value: int) -> np.dtype:
+    """The smallest signed integer dtype holding -1 and *max_value*."""
+    for dtype, max_dtype_value in _INT_DTYPES:
+        if max_value <= max_dtype_value:
+            return dtype
+    msg = f"Group IDs up to {max_value} do not fit into a 64-bit integer."
+    raise OverflowError(msg)
 
 
 def broadcast_foreign_keys(
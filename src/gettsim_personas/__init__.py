@@ -1,3 +1,25 @@
+from _gettsim_personas.atlas import PersonaAtlas
+from _gettsim_personas.compositions import HouseholdComposition, compose_households
+from _gettsim_personas.evaluation import (
+    AsyncPersonaEvaluator,
+    aevaluate,
+    evaluate,
+    policy_environment_cache_info,
+)
+from _gettsim_personas.grid_evaluation import (
+    GridResults,
+    evaluate_linspace_grid,
+    reshape_grid_results,
+)
+from _gettsim_personas.instrumentation import record_stages
+from _gettsim_personas.jit import JittedPersonaEvaluator
+from _gettsim_personas.policy_sweep import evaluate_policy_variants
+from _gettsim_personas.population import (
+    PopulationComponent,
+    WeightedPopulation,
+    build_population,
+)
+from _gettsim_personas.shared_memory import evaluate_in_parallel
 from gettsim_personas import (
     einkommensteuer_sozialabgaben,
     gesetzliche_altersrente,
@@ -6,8 +28,25 @@ from gettsim_personas import (
 )
 
 __all__ = [
+    "AsyncPersonaEvaluator",
+    "GridResults",
+    "HouseholdComposition",
+    "JittedPersonaEvaluator",
+    "PersonaAtlas",
+    "PopulationComponent",
+    "WeightedPopulation",
+    "aevaluate",
+    "build_population",
+    "compose_households",
     "einkommensteuer_sozialabgaben",
+    "evaluate",
+    "evaluate_in_parallel",
+    "evaluate_linspace_grid",
+    "evaluate_policy_variants",
     "gesetzliche_altersrente",
     "grundsicherung_für_erwerbsfähige",
     "grundsicherung_im_alter",
+    "policy_environment_cache_info",
+    "record_stages",
+    "reshape_grid_results",
 ]
@@ -0,0 +1,5 @@
+import sys
+
+from _gettsim_personas.cli import main
+
+sys.exit(main())
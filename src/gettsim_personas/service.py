@@ -0,0 +1,15 @@
+from _gettsim_personas.service import (
+    PersonaService,
+    make_server,
+    results_to_arrow,
+    results_to_json,
+    serve,
+)
+
+__all__ = [
+    "PersonaService",
+    "make_server",
+    "results_to_arrow",
+    "results_to_json",
+    "serve",
+]
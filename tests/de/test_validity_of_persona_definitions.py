@@ -1,32 +1,24 @@
 """Test that all persona definitions are valid."""
 
-import dags.tree as dt
+import datetime
+
 import pytest
-from gettsim import InputData, MainTarget, TTTargets, main
 
-from tests.de.all_personas import persona_year_pairs
+from tests.de.all_personas import (
+    END_YEAR,
+    get_all_orig_personas_over_time,
+    persona_year_pairs,
+)
 
 
 @pytest.mark.parametrize(
-    (
-        "year",
-        "persona_class",
-    ),
-    persona_year_pairs(start=2015),
+    "persona_class",
+    get_all_orig_personas_over_time(),
 )
-def test_persona_inputs_does_not_contain_unnecessary_inputs(year, persona_class):
-    policy_date_str = f"{year}-01-01"
-    persona = persona_class(policy_date_str=policy_date_str)
-    root_nodes = main(
-        main_target=MainTarget.labels.root_nodes,
-        policy_date_str=policy_date_str,
-        input_data=InputData.tree(persona.input_data_tree),
-        tt_targets=TTTargets.tree(persona.tt_targets_tree),
-        include_warn_nodes=False,
+def test_persona_inputs_does_not_contain_unnecessary_inputs(persona_class):
+    persona_class.validate(
+        (datetime.date(2015, 1, 1), datetime.date(END_YEAR - 1, 12, 31))
     )
-    input_qnames = dt.flatten_to_qnames(persona.input_data_tree)
-    unnecessary_inputs = set(input_qnames) - set(root_nodes) - {"hh_id", "p_id"}
-    assert not unnecessary_inputs
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,249 @@
+import copy
+import dataclasses
+import datetime
+import importlib.metadata
+import json
+import os
+import shutil
+from collections.abc import Callable
+
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.atlas import (
+    PersonaAtlas,
+    dated_policy_object_digests,
+    persona_digest,
+    policy_environment_digest,
+)
+from _gettsim_personas.persona_objects import OrigPersonaOverTime
+from _gettsim_personas.registry import select_personas
+from tests.personas_for_testing import SamplePersonaFromToml
+
+DATES = [datetime.date(2020, 1, 1), datetime.date(2021, 1, 1)]
+
+
+@pytest.fixture
+def policy_objects(monkeypatch):
+    """Replace GETTSIM by a function that returns the earnings.
+
+    GETTSIM's policy objects hold a single parameter specification, which tests may
+    change to emulate a new GETTSIM version.
+    """
+
+    def fake_evaluate(persona, policy_environment=None):  # noqa: ARG001
+        return {
+            "einnahmen": {
+                "bruttolohn_m": persona.input_data_tree["einnahmen"]["bruttolohn_m"]
+            }
+        }
+
+    orig_policy_objects = {
+        ("kindergeld", "kindergeld.yaml", "satz"): {
+            "unit": "EUR",
+            datetime.date(2015, 1, 1): {"value": 100.0},
+        }
+    }
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    monkeypatch.setattr(
+        evaluation, "orig_policy_objects", lambda: copy.deepcopy(orig_policy_objects)
+    )
+    return orig_policy_objects
+
+
+@pytest.fixture
+def atlas(tmp_path):
+    return PersonaAtlas(
+        tmp_path / "atlas",
+        personas=select_personas(["grundsicherung_im_alter.Single*"]),
+    )
+
+
+def test_build_writes_partitioned_results_and_manifest(atlas, policy_objects):  # noqa: ARG001
+    report = atlas.build(DATES)
+    assert report.reused == ()
+    assert len(report.recomputed) == 2 * len(atlas.personas)
+    name, policy_date = report.recomputed[0]
+    assert atlas.partition_path(name, policy_date) == (
+        atlas.path / f"persona={name}" / "policy_date=2020-01-01" / "results.npz"
+    )
+    results = atlas.load(name, policy_date)
+    assert set(results) == {"persona", "policy_date", "p_id", "einnahmen__bruttolohn_m"}
+    manifest = json.loads((atlas.path / "manifest.json").read_text())
+    assert set(manifest["versions"]) == {"gettsim", "ttsim-backend"}
+    assert len(manifest["fingerprints"]) == len(report.recomputed)
+
+
+def test_rebuild_without_changes_reuses_all_results(atlas, policy_objects):  # noqa: ARG001
+    first = atlas.build(DATES)
+    second = atlas.build(DATES)
+    assert second.recomputed == ()
+    assert sorted(second.reused) == sorted(first.recomputed)
+
+
+def test_rebuild_recomputes_dates_with_changed_policy_objects(atlas, policy_objects):
+    atlas.build(DATES)
+    policy_objects["kindergeld", "kindergeld.yaml", "satz"][DATES[1]] = {"value": 150.0}
+    report = atlas.build(DATES)
+    assert {policy_date for _, policy_date in report.recomputed} == {DATES[1]}
+    assert {policy_date for _, policy_date in report.reused} == {DATES[0]}
+
+
+def test_rebuild_recomputes_all_dates_for_new_gettsim_version(
+    atlas,
+    policy_objects,  # noqa: ARG001
+    monkeypatch,
+):
+    first = atlas.build(DATES)
+    version = importlib.metadata.version
+    monkeypatch.setattr(
+        importlib.metadata,
+        "version",
+        lambda package: "99.0" if package == "gettsim" else version(package),
+    )
+    report = atlas.build(DATES)
+    assert sorted(report.recomputed) == sorted(first.recomputed)
+
+
+def test_rebuild_recomputes_missing_results(atlas, policy_objects):  # noqa: ARG001
+    first = atlas.build(DATES)
+    atlas.partition_path(*first.recomputed[0]).unlink()
+    report = atlas.build(DATES)
+    assert report.recomputed == (first.recomputed[0],)
+
+
+def test_interrupted_build_keeps_progress(atlas, policy_objects, monkeypatch):  # noqa: ARG001
+    fake_evaluate = evaluation.evaluate
+
+    def failing_evaluate(persona, policy_environment=None):
+        if persona.policy_date == DATES[1]:
+            msg = "Interrupted."
+            raise RuntimeError(msg)
+        return fake_evaluate(persona, policy_environment)
+
+    monkeypatch.setattr(evaluation, "evaluate", failing_evaluate)
+    with pytest.raises(RuntimeError, match="Interrupted"):
+        atlas.build(DATES)
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    report = atlas.build(DATES)
+    assert {policy_date for _, policy_date in report.recomputed} == {DATES[1]}
+    assert {policy_date for _, policy_date in report.reused} == {DATES[0]}
+
+
+def test_rebuild_extends_atlas_to_new_dates(atlas, policy_objects):  # noqa: ARG001
+    atlas.build(DATES[:1])
+    report = atlas.build(DATES)
+    assert {policy_date for _, policy_date in report.recomputed} == {DATES[1]}
+
+
+@dataclasses.dataclass(frozen=True)
+class _PolicyFunction:
+    function: Callable
+    start_date: datetime.date = datetime.date(1900, 1, 1)
+    end_date: datetime.date = datetime.date(2099, 12, 31)
+
+
+def _environment_digest(orig_policy_objects, policy_date=DATES[0]):
+    return policy_environment_digest(
+        dated_policy_object_digests(orig_policy_objects), policy_date=policy_date
+    )
+
+
+def test_policy_environment_digest_depends_on_values_and_functions():
+    def f(x):
+        return x
+
+    def g(x):
+        return 2 * x
+
+    def objects(value, function):
+        return {
+            ("a", "f"): _PolicyFunction(function),
+            ("a", "b"): {"unit": "EUR", DATES[0]: {"value": value}},
+        }
+
+    base = _environment_digest(objects(np.array([1.0, 2.0]), f))
+    assert base == _environment_digest(
+        dict(reversed(objects(np.array([1.0, 2.0]), f).items()))
+    )
+    assert base != _environment_digest(objects(np.array([1.0, 3.0]), f))
+    assert base != _environment_digest(objects(np.array([1.0, 2.0]), g))
+
+
+def test_policy_environment_digest_ignores_objects_not_affecting_the_date():
+    def f(x):
+        return x
+
+    def g(x):
+        return 2 * x
+
+    def objects(value_2021, function_until_2020):
+        return {
+            ("a", "f"): _PolicyFunction(
+                function_until_2020, end_date=datetime.date(2020, 12, 31)
+            ),
+            ("a", "b"): {DATES[0]: {"value": 1}, DATES[1]: {"value": value_2021}},
+        }
+
+    base = dated_policy_object_digests(objects(2, f))
+    changed_value = dated_policy_object_digests(objects(3, f))
+    changed_function = dated_policy_object_digests(objects(2, g))
+    assert policy_environment_digest(base, DATES[0]) == policy_environment_digest(
+        changed_value, DATES[0]
+    )
+    assert policy_environment_digest(base, DATES[1]) != policy_environment_digest(
+        changed_value, DATES[1]
+    )
+    assert policy_environment_digest(base, DATES[0]) != policy_environment_digest(
+        changed_function, DATES[0]
+    )
+    assert policy_environment_digest(base, DATES[1]) == policy_environment_digest(
+        changed_function, DATES[1]
+    )
+
+
+class _LookupTable:
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        self.values = values
+
+
+def test_policy_environment_digest_ignores_memory_addresses():
+    assert _environment_digest(
+        {("a",): {DATES[0]: _LookupTable(np.array([1, 2]))}}
+    ) == _environment_digest({("a",): {DATES[0]: _LookupTable(np.array([1, 2]))}})
+    assert _environment_digest(
+        {("a",): {DATES[0]: _LookupTable(np.array([1, 2]))}}
+    ) != _environment_digest({("a",): {DATES[0]: _LookupTable(np.array([1, 3]))}})
+
+
+def test_persona_digest_depends_on_persona_elements():
+    personas = select_personas(["grundsicherung_im_alter.Single*"])
+    single_1_child = personas["grundsicherung_im_alter.Single1Child"]
+    single_no_child = personas["grundsicherung_im_alter.SingleNoChild"]
+    assert persona_digest(single_1_child, DATES[0]) == persona_digest(
+        single_1_child, datetime.date(2020, 7, 1)
+    )
+    # Grundrentenzeiten are an input from 2021 on.
+    assert persona_digest(single_1_child, DATES[0]) != persona_digest(
+        single_1_child, DATES[1]
+    )
+    assert persona_digest(single_1_child, DATES[0]) != persona_digest(
+        single_no_child, DATES[0]
+    )
+
+
+def test_persona_digest_depends_on_source_of_persona_definition(tmp_path):
+    path = tmp_path / "persona_elements.toml"
+    shutil.copy(SamplePersonaFromToml.path_to_persona_elements, path)
+    before = persona_digest(OrigPersonaOverTime(path), DATES[0])
+    path.write_text(f"{path.read_text()}\n# Changed.\n")
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1))
+    assert persona_digest(OrigPersonaOverTime(path), DATES[0]) != before
+
+
+def test_invalid_suffix(tmp_path):
+    with pytest.raises(ValueError, match="must end in one of"):
+        PersonaAtlas(tmp_path, suffix=".csv")
@@ -0,0 +1,178 @@
+import sys
+
+import dags.tree as dt
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation, jit
+from _gettsim_personas.backends import backend_of, to_backend
+from _gettsim_personas.jit import JittedPersonaEvaluator
+from tests.personas_for_testing import SamplePersona
+
+
+def test_personas_have_numpy_arrays_by_default():
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    assert backend_of(persona.input_data_tree) == "numpy"
+    upserted = persona.upsert_input_data({"x": np.arange(6)})
+    assert backend_of(upserted.input_data_tree) == "numpy"
+
+
+def test_fail_if_backend_is_invalid():
+    with pytest.raises(ValueError, match="'numpy' or 'jax'"):
+        to_backend({"p_id": np.arange(3)}, backend="torch")
+
+
+def test_fail_if_jax_is_not_installed(monkeypatch):
+    monkeypatch.setitem(sys.modules, "jax", None)
+    with pytest.raises(ImportError, match=r"gettsim-personas\[jax\]"):
+        SamplePersona(policy_date_str="2015-01-01", backend="jax")
+
+
+def test_persona_with_jax_arrays():
+    jax = pytest.importorskip("jax")
+    persona = SamplePersona(policy_date_str="2015-01-01", backend="jax")
+    assert isinstance(persona.input_data_tree["p_id"], jax.Array)
+
+    upserted = persona.upsert_input_data({"x": np.arange(6)})
+    assert isinstance(upserted.input_data_tree["x"], jax.Array)
+    assert backend_of(upserted.input_data_tree) == "jax"
+    as_numpy = persona.upsert_input_data({"x": np.arange(6)}, backend="numpy")
+    assert backend_of(as_numpy.input_data_tree) == "numpy"
+
+    upserted = persona.upsert_household_data({"x_hh": np.arange(2)})
+    assert backend_of(upserted.input_data_tree) == "jax"
+    as_numpy = persona.upsert_household_data({"x_hh": np.arange(2)}, backend="numpy")
+    assert backend_of(as_numpy.input_data_tree) == "numpy"
+
+
+@pytest.fixture
+def n_traces(monkeypatch):
+    """Replace GETTSIM by a function that counts how often it is traced by JAX."""
+    n_traces = [0]
+
+    def tt_function(processed_data):
+        n_traces[0] += 1
+        bruttolohn_m = processed_data["einnahmen__bruttolohn_m"]
+        return {
+            "some_target_qname": 2 * bruttolohn_m,
+            "some_target_qname_since_2010": bruttolohn_m,
+        }
+
+    def fake_main(*, main_targets, input_data, **kwargs):  # noqa: ARG001
+        processed_data = dt.flatten_to_qnames(input_data.tree)
+        return {
+            "processed_data": processed_data,
+            "labels": {"root_nodes": ["p_id", "einnahmen__bruttolohn_m"]},
+            "tt_function": tt_function,
+        }
+
+    monkeypatch.setattr(jit, "main", fake_main)
+    monkeypatch.setattr(
+        evaluation,
+        "cached_policy_environment",
+        lambda policy_date, backend: policy_date,  # noqa: ARG005
+    )
+    return n_traces
+
+
+def test_jitted_evaluator_compiles_once_per_shape(n_traces):
+    pytest.importorskip("jax")
+    evaluator = JittedPersonaEvaluator(
+        SamplePersona(policy_date_str="2015-01-01", backend="jax")
+    )
+
+    for factor in range(1, 4):
+        results = evaluator({"einnahmen": {"bruttolohn_m": factor * np.arange(3)}})
+        np.testing.assert_array_equal(
+            results["some_target_qname"], 2 * factor * np.arange(3)
+        )
+    np.testing.assert_array_equal(evaluator()["some_target_qname"], [2, 4, 6])
+    assert n_traces[0] == 1
+
+
+@pytest.mark.parametrize(
+    ("input_data_to_update", "match"),
+    [
+        ({"einnahmen": {"bruttolohn_m": np.arange(4)}}, "must not change"),
+        ({"x": np.arange(3)}, r"not inputs of the persona: \['x'\]"),
+        ({"hh_id": np.arange(3)}, "IDs and pointers"),
+    ],
+)
+def test_fail_if_data_to_update_is_incompatible(n_traces, input_data_to_update, match):  # noqa: ARG001
+    pytest.importorskip("jax")
+    evaluator = JittedPersonaEvaluator(
+        SamplePersona(policy_date_str="2015-01-01", backend="jax")
+    )
+    with pytest.raises(ValueError, match=match):
+        evaluator(input_data_to_update)
+
+
+@pytest.fixture
+def kinked_persona_evaluator(monkeypatch):
+    """An evaluator of a function with a kink at earnings of 50 and two households."""
+    jax = pytest.importorskip("jax")
+    jnp = jax.numpy
+
+    def tt_function(processed_data):
+        bruttolohn_m = processed_data["einnahmen__bruttolohn_m"]
+        hh_id = processed_data["hh_id"]
+        same_household = (hh_id[:, None] == hh_id[None, :]).astype(bruttolohn_m.dtype)
+        return {
+            "some_target_qname": 0.3 * bruttolohn_m + 1e-4 * bruttolohn_m**2,
+            "some_target_qname_since_2010": same_household
+            @ (0.25 * jnp.maximum(bruttolohn_m - 50, 0)),
+        }
+
+    def fake_main(*, main_targets, input_data, **kwargs):  # noqa: ARG001
+        return {
+            "processed_data": dt.flatten_to_qnames(input_data.tree),
+            "labels": {"root_nodes": ["p_id", "hh_id", "einnahmen__bruttolohn_m"]},
+            "tt_function": tt_function,
+        }
+
+    monkeypatch.setattr(jit, "main", fake_main)
+    monkeypatch.setattr(
+        evaluation,
+        "cached_policy_environment",
+        lambda policy_date, backend: policy_date,  # noqa: ARG005
+    )
+    persona = SamplePersona(policy_date_str="2015-01-01", backend="jax")
+    return JittedPersonaEvaluator(
+        persona.upsert_input_data(
+            {"einnahmen": {"bruttolohn_m": np.array([100.0, 20, 300, 10, 80, 200])}}
+        ),
+        rounding=False,
+    )
+
+
+def test_marginal_rates_equal_finite_differences(kinked_persona_evaluator):
+    evaluator = kinked_persona_evaluator
+    bruttolohn_m = np.array([100.0, 20, 300, 10, 80, 200])
+    tt_targets_tree = {"some_target_qname": None, "some_target_qname_since_2010": None}
+    rates = evaluator.marginal_rates(tt_targets_tree)
+
+    step = 1.0
+    position = np.arange(6) % 3
+    for qname in tt_targets_tree:
+        expected = np.empty(6)
+        for p in range(3):
+            up = bruttolohn_m + step * (position == p)
+            down = bruttolohn_m - step * (position == p)
+            difference = np.asarray(
+                evaluator({"einnahmen": {"bruttolohn_m": up}})[qname]
+            ) - np.asarray(evaluator({"einnahmen": {"bruttolohn_m": down}})[qname])
+            expected[position == p] = (difference / (2 * step))[position == p]
+        np.testing.assert_allclose(rates[qname], expected, rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(
+        rates["some_target_qname_since_2010"], [0.25, 0, 0.25, 0, 0.25, 0.25]
+    )
+
+
+def test_fail_if_marginal_rates_of_unknown_targets(kinked_persona_evaluator):
+    with pytest.raises(ValueError, match=r"not targets of the persona: \['x'\]"):
+        kinked_persona_evaluator.marginal_rates({"x": None})
+
+
+def test_fail_if_marginal_rates_with_respect_to_non_floats(kinked_persona_evaluator):
+    with pytest.raises(TypeError, match="floating point dtype"):
+        kinked_persona_evaluator.marginal_rates({"some_target_qname": None}, wrt="p_id")
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from _gettsim_personas.batch import PersonaBatch
+from _gettsim_personas.upsert import column_role
+
+
+@pytest.fixture
+def batch():
+    return PersonaBatch(
+        {
+            "p_id": np.array([0, 1, 2]),
+            "hh_id": np.array([0, 0, 1]),
+            "familie__p_id_ehepartner": np.array([1, 0, -1]),
+            "einnahmen__bruttolohn_m": np.array([1000, 0, 500]),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("qname", "expected"),
+    [
+        ("p_id", "p_id"),
+        ("familie__p_id_ehepartner", "foreign_key"),
+        ("hh_id", "group_id"),
+        ("einnahmen__bruttolohn_m", "data"),
+    ],
+)
+def test_column_role(qname, expected):
+    assert column_role(qname) == expected
+
+
+def test_household_offsets(batch):
+    assert batch.n_rows == 3
+    assert batch.n_households == 2
+    np.testing.assert_array_equal(batch.household_offsets, [0, 2, 3])
+
+
+def test_replicate(batch):
+    replicated = batch.replicate(2)
+    np.testing.assert_array_equal(replicated.columns["hh_id"], [0, 0, 1, 2, 2, 3])
+    np.testing.assert_array_equal(
+        replicated.columns["familie__p_id_ehepartner"], [1, 0, -1, 4, 3, -1]
+    )
+    np.testing.assert_array_equal(replicated.household_offsets, [0, 2, 3, 5, 6])
+
+
+def test_upsert(batch):
+    upserted = batch.upsert({"einnahmen__bruttolohn_m": np.arange(6)})
+
+    assert list(upserted.columns) == list(batch.columns)
+    np.testing.assert_array_equal(upserted.columns["p_id"], np.arange(6))
+    np.testing.assert_array_equal(upserted.columns["hh_id"], [0, 0, 1, 2, 2, 3])
+    np.testing.assert_array_equal(
+        upserted.columns["familie__p_id_ehepartner"], [1, 0, -1, 4, 3, -1]
+    )
+    np.testing.assert_array_equal(
+        upserted.columns["einnahmen__bruttolohn_m"], np.arange(6)
+    )
+    np.testing.assert_array_equal(
+        upserted.household_offsets,
+        PersonaBatch(upserted.columns).household_offsets,
+    )
+
+
+def test_concat(batch):
+    single = PersonaBatch(
+        {
+            "p_id": np.array([0]),
+            "hh_id": np.array([0]),
+            "familie__p_id_ehepartner": np.array([-1]),
+            "einnahmen__bruttolohn_m": np.array([7]),
+        }
+    )
+    stacked = PersonaBatch.concat([single, batch])
+    np.testing.assert_array_equal(stacked.columns["p_id"], [0, 1, 2, 3])
+    np.testing.assert_array_equal(stacked.columns["hh_id"], [0, 1, 1, 2])
+    np.testing.assert_array_equal(
+        stacked.columns["familie__p_id_ehepartner"], [-1, 2, 1, -1]
+    )
+    np.testing.assert_array_equal(stacked.household_offsets, [0, 1, 3, 4])
+
+
+def test_slice_households_returns_views(batch):
+    sliced = batch.replicate(3).slice_households(2, 4)
+    np.testing.assert_array_equal(sliced.columns["p_id"], [3, 4, 5])
+    np.testing.assert_array_equal(sliced.household_offsets, [0, 2, 3])
+    assert not sliced.columns["p_id"].flags.owndata
+
+
+def test_to_tree(batch):
+    assert (
+        batch.to_tree()["einnahmen"]["bruttolohn_m"]
+        is batch.columns["einnahmen__bruttolohn_m"]
+    )
+
+
+def test_household_values_to_rows(batch):
+    np.testing.assert_array_equal(
+        batch.household_values_to_rows(np.array([10, 20, 30, 40])),
+        [10, 10, 20, 30, 30, 40],
+    )
@@ -0,0 +1,180 @@
+import datetime
+import sys
+
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.cli import (
+    SweepTask,
+    main,
+    run_sweep,
+    stack_results,
+    sweep_tasks,
+)
+from _gettsim_personas.persona_objects import LinspaceRange
+from _gettsim_personas.registry import select_personas
+
+
+@pytest.fixture(autouse=True)
+def fake_gettsim(monkeypatch):
+    """Replace GETTSIM by a function that returns the earnings."""
+
+    def fake_evaluate(persona, policy_environment=None):  # noqa: ARG001
+        return {
+            "einnahmen": {
+                "bruttolohn_m": persona.input_data_tree["einnahmen"]["bruttolohn_m"]
+            }
+        }
+
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    monkeypatch.setattr(
+        evaluation, "cached_policy_environment", lambda policy_date: policy_date
+    )
+
+
+def test_sweep_tasks_skip_dates_personas_are_not_defined_for():
+    personas = select_personas(["einkommensteuer_sozialabgaben.*"])
+    tasks = sweep_tasks(
+        personas=personas,
+        policy_dates=[datetime.date(2000, 1, 1), datetime.date(2020, 1, 1)],
+        grid=((0, LinspaceRange(0, 1)), (5, 0.0)),
+    )
+    assert tasks == [
+        SweepTask(
+            persona_name="einkommensteuer_sozialabgaben.Couple1Child",
+            policy_date=datetime.date(2020, 1, 1),
+            grid=((0, LinspaceRange(0, 1)),),
+        )
+    ]
+
+
+def test_cli_writes_npz_and_reports_throughput(tmp_path, capsys):
+    output = tmp_path / "results.npz"
+    exit_code = main(
+        [
+            "grundsicherung_im_alter.Single*",
+            "--years",
+            "2020:2021",
+            "--grid",
+            "p0=0:1000",
+            "--n-points",
+            "3",
+            "--output",
+            str(output),
+        ]
+    )
+
+    assert exit_code == 0
+    assert "households/second" in capsys.readouterr().out
+    table = np.load(output)
+    # Two personas (one with 2 members) times two years times three grid points.
+    assert len(table["p_id"]) == 2 * (1 + 2) * 3
+    assert set(table["persona"]) == {
+        "grundsicherung_im_alter.Single1Child",
+        "grundsicherung_im_alter.SingleNoChild",
+    }
+    assert set(table["policy_date"]) == {"2020-01-01", "2021-01-01"}
+    assert sorted(set(table["einnahmen__bruttolohn_m"][table["p_id"] % 2 == 0])) == [
+        0,
+        500,
+        1000,
+    ]
+
+
+def test_cli_writes_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output = tmp_path / "results.parquet"
+    main(
+        [
+            "einkommensteuer_sozialabgaben.*",
+            "--dates",
+            "2020-07-01",
+            "--output",
+            str(output),
+        ]
+    )
+    assert pq.read_table(output).num_rows == 3
+
+
+def test_run_sweep_in_parallel_gives_same_results():
+    tasks = sweep_tasks(
+        personas=select_personas(["grundsicherung_für_erwerbsfähige.*"]),
+        policy_dates=[datetime.date(2019, 1, 1), datetime.date(2020, 1, 1)],
+    )
+    sequential, n_households = run_sweep(tasks, jobs=1)
+    parallel, n_households_parallel = run_sweep(tasks, jobs=2)
+    assert n_households == n_households_parallel == len(tasks)
+    for expected, actual in zip(sequential, parallel, strict=True):
+        assert expected.keys() == actual.keys()
+        for column, array in expected.items():
+            np.testing.assert_array_equal(actual[column], array)
+
+
+def test_stack_results_fills_missing_columns_with_nan():
+    stacked = stack_results(
+        [
+            {"p_id": np.array([0, 1]), "a": np.array([True, False])},
+            {"p_id": np.array([0]), "b": np.array([1])},
+        ]
+    )
+    np.testing.assert_array_equal(stacked["p_id"], [0, 1, 0])
+    np.testing.assert_array_equal(stacked["a"], [1.0, 0.0, np.nan])
+    np.testing.assert_array_equal(stacked["b"], [np.nan, np.nan, 1.0])
+
+
+@pytest.mark.parametrize(
+    ("args", "match"),
+    [
+        (["unknown.*", "--years", "2020"], "Unknown persona"),
+        (["grundsicherung_im_alter.*"], "Specify policy dates"),
+        (
+            ["grundsicherung_im_alter.*", "--years", "2020", "--grid", "x=1"],
+            "Invalid grid",
+        ),
+        (
+            ["grundsicherung_im_alter.*", "--years", "2020", "--jobs", "0"],
+            "must be at least 1",
+        ),
+        (
+            ["grundsicherung_im_alter.*", "--years", "2020", "--n-points", "0"],
+            "must be at least 1",
+        ),
+    ],
+)
+def test_cli_fails_for_invalid_arguments(tmp_path, capsys, args, match):
+    with pytest.raises(SystemExit) as e:
+        main([*args, "--output", str(tmp_path / "results.npz")])
+    assert e.value.code == 2
+    assert match in capsys.readouterr().err
+
+
+def test_cli_fails_for_invalid_output_suffix(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main(
+            [
+                "grundsicherung_im_alter.*",
+                "--years",
+                "2020",
+                "--output",
+                str(tmp_path / "results.csv"),
+            ]
+        )
+    assert "Output file must end in" in capsys.readouterr().err
+
+
+def test_cli_fails_for_parquet_output_without_pyarrow_before_sweep(
+    tmp_path, capsys, monkeypatch
+):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(SystemExit):
+        main(
+            [
+                "grundsicherung_im_alter.*",
+                "--years",
+                "2020",
+                "--output",
+                str(tmp_path / "results.parquet"),
+            ]
+        )
+    assert "requires pyarrow" in capsys.readouterr().err
@@ -0,0 +1,116 @@
+import datetime
+
+import dags.tree as dt
+import numpy as np
+import pytest
+
+from _gettsim_personas.compositions import HouseholdComposition, compose_households
+from gettsim_personas import grundsicherung_für_erwerbsfähige
+
+STRUCTURE_QNAMES = [
+    "p_id",
+    "hh_id",
+    "familie__p_id_ehepartner",
+    "familie__p_id_elternteil_1",
+    "familie__p_id_elternteil_2",
+    "kindergeld__p_id_empfänger",
+    "bürgergeld__p_id_einstandspartner",
+    "einkommensteuer__abzüge__p_id_kinderbetreuungskostenträger",
+    "einkommensteuer__gemeinsam_veranlagt",
+    "familie__alleinerziehend",
+    "sozialversicherung__pflege__beitrag__hat_kinder",
+]
+
+
+@pytest.fixture
+def template():
+    return grundsicherung_für_erwerbsfähige.Couple1Child(policy_date_str="2025-01-01")
+
+
+@pytest.mark.parametrize(
+    ("composition", "hand_written"),
+    [
+        (HouseholdComposition(n_adults=1), "SingleAdult"),
+        (HouseholdComposition(n_adults=1, child_ages=(7,)), "Single1Child"),
+        (HouseholdComposition(n_adults=2), "CoupleNoChildren"),
+        (HouseholdComposition(n_adults=2, child_ages=(7, 5)), "Couple2Children"),
+    ],
+)
+def test_structure_equals_hand_written_personas(template, composition, hand_written):
+    composed = dt.flatten_to_qnames(
+        compose_households(template, [composition]).input_data_tree
+    )
+    expected = dt.flatten_to_qnames(
+        getattr(grundsicherung_für_erwerbsfähige, hand_written)(
+            policy_date_str="2025-01-01"
+        ).input_data_tree
+    )
+    for qname in STRUCTURE_QNAMES:
+        np.testing.assert_array_equal(composed[qname], expected[qname], err_msg=qname)
+
+
+def test_compositions_are_stacked_into_one_batch(template):
+    persona = compose_households(
+        template,
+        [
+            HouseholdComposition(n_adults=2, child_ages=(3, 10), joint_filing=False),
+            HouseholdComposition(n_adults=1, child_ages=(1,)),
+        ],
+    )
+    data = dt.flatten_to_qnames(persona.input_data_tree)
+
+    assert persona.tt_targets_tree["hh_id"] is None
+    np.testing.assert_array_equal(data["hh_id"], [0, 0, 0, 0, 1, 1])
+    np.testing.assert_array_equal(
+        data["familie__p_id_ehepartner"], [1, 0, -1, -1] + [-1] * 2
+    )
+    np.testing.assert_array_equal(
+        data["kindergeld__p_id_empfänger"], [-1, -1, 0, 0, -1, 4]
+    )
+    np.testing.assert_array_equal(
+        data["familie__p_id_elternteil_2"], [-1, -1, 1, 1, -1, -1]
+    )
+    np.testing.assert_array_equal(
+        data["einkommensteuer__gemeinsam_veranlagt"], [False] * 6
+    )
+    np.testing.assert_array_equal(
+        data["familie__alleinerziehend"], [False] * 4 + [True, False]
+    )
+    np.testing.assert_array_equal(data["alter"], [30, 30, 3, 10, 30, 1])
+    np.testing.assert_array_equal(data["alter_monate"], data["alter"] * 12)
+    np.testing.assert_array_equal(data["geburtsjahr"], 2025 - data["alter"])
+    np.testing.assert_array_equal(
+        data["einkommensteuer__abzüge__kinderbetreuungskosten_m"],
+        [0, 0, 100, 100, 0, 100],
+    )
+    np.testing.assert_array_equal(
+        data["einnahmen__bruttolohn_m"], [1000, 0, 0, 0, 1000, 0]
+    )
+
+
+def test_fail_if_template_has_no_child():
+    single = grundsicherung_für_erwerbsfähige.SingleAdult(policy_date_str="2025-01-01")
+    with pytest.raises(ValueError, match="must have a child"):
+        compose_households(single, [HouseholdComposition(child_ages=(3,))])
+
+
+def test_fail_if_template_has_several_evaluation_dates():
+    template = grundsicherung_für_erwerbsfähige.Couple1Child(
+        policy_date_str="2025-01-01",
+        evaluation_date_str=["2025-01-01", "2026-01-01"],
+    )
+    assert not isinstance(template.evaluation_date, datetime.date)
+    with pytest.raises(ValueError, match="single evaluation date"):
+        compose_households(template, [HouseholdComposition()])
+
+
+@pytest.mark.parametrize(
+    ("kwargs", "match"),
+    [
+        ({"n_adults": 3}, "n_adults must be 1 or 2"),
+        ({"child_ages": (-1,)}, "non-negative"),
+    ],
+)
+def test_fail_if_composition_is_invalid(kwargs, match):
+    with pytest.raises(ValueError, match=match):
+        HouseholdComposition(**kwargs)
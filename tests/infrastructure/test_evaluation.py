@@ -0,0 +1,344 @@
+import asyncio
+import collections
+import datetime
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.evaluation import (
+    AsyncPersonaEvaluator,
+    PolicyEnvironmentCache,
+    PolicyEnvironmentCacheInfo,
+)
+from tests.personas_for_testing import SamplePersona
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace the GETTSIM call by a slow function that records its inputs."""
+    calls = []
+    lock = threading.Lock()
+    running = [0]
+
+    def fake_evaluate(persona):
+        with lock:
+            running[0] += 1
+            calls.append((persona, running[0]))
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {"p_id": persona.input_data_tree["p_id"]}
+
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    return calls
+
+
+def test_concurrent_identical_requests_are_coalesced(calls):
+    evaluator = AsyncPersonaEvaluator()
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                evaluator.aevaluate(SamplePersona, policy_date_str="2015-01-01")
+                for _ in range(3)
+            ],
+            evaluator.aevaluate(SamplePersona, policy_date_str="2016-01-01"),
+        )
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert results[0] is results[1] is results[2]
+    assert results[3] is not results[0]
+
+
+def test_requests_with_different_upserted_data_are_not_coalesced(calls):
+    evaluator = AsyncPersonaEvaluator()
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                evaluator.aevaluate(
+                    SamplePersona,
+                    policy_date_str="2015-01-01",
+                    input_data_to_upsert={"x": np.arange(6) * factor},
+                )
+                for factor in (1, 1, 2)
+            ]
+        )
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 2
+    np.testing.assert_array_equal(results[0]["p_id"], np.arange(6))
+
+
+def test_in_flight_work_is_bounded(calls):
+    evaluator = AsyncPersonaEvaluator(max_concurrency=2)
+
+    async def run():
+        await asyncio.gather(
+            *[
+                evaluator.aevaluate(SamplePersona, policy_date_str=f"{year}-01-01")
+                for year in range(2010, 2016)
+            ]
+        )
+        return evaluator.n_in_flight
+
+    assert asyncio.run(run()) == 0
+    assert len(calls) == 6
+    assert max(n_running for _, n_running in calls) <= 2
+
+
+def test_aevaluate_via_orig_persona(calls):
+    results = asyncio.run(
+        SamplePersona.aevaluate(
+            policy_date_str="2015-01-01",
+            evaluation_date_str=["2015-01-01", "2016-01-01"],
+        )
+    )
+    persona, _ = calls[0]
+    assert persona.evaluation_date[1].year == 2016
+    np.testing.assert_array_equal(results["p_id"], np.arange(6))
+
+
+@pytest.mark.parametrize("max_concurrency", [0, 1.5])
+def test_fail_if_max_concurrency_is_invalid(max_concurrency):
+    with pytest.raises(ValueError, match="positive integer"):
+        AsyncPersonaEvaluator(max_concurrency=max_concurrency)
+
+
+@pytest.fixture
+def root_nodes_calls(monkeypatch):
+    """Replace GETTSIM by a function that returns root nodes for each target."""
+    root_nodes_calls = []
+
+    def fake_main(*, main_target, tt_targets, **kwargs):  # noqa: ARG001
+        root_nodes_calls.append(tt_targets)
+        if "some_target_qname" in tt_targets.tree:
+            return ["some_time_dependent_persona_input_element", "p_id_not_in_data"]
+        return ["einnahmen__bruttolohn_m"]
+
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    monkeypatch.setattr(evaluation, "_REQUIRED_INPUT_QNAMES", collections.OrderedDict())
+    monkeypatch.setattr(
+        evaluation, "cached_policy_environment", lambda policy_date: policy_date
+    )
+    return root_nodes_calls
+
+
+def test_required_input_qnames_are_cached(root_nodes_calls):
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    expected = {"p_id", "hh_id", "some_time_dependent_persona_input_element"}
+    assert evaluation.required_input_qnames(persona) == expected
+    assert (
+        evaluation.required_input_qnames(
+            SamplePersona(
+                policy_date_str="2015-01-01", evaluation_date_str="2020-01-01"
+            )
+        )
+        == expected
+    )
+    assert len(root_nodes_calls) == 1
+
+
+def test_least_recently_used_required_input_qnames_are_dropped(
+    root_nodes_calls, monkeypatch
+):
+    monkeypatch.setattr(evaluation, "MAX_REQUIRED_INPUT_QNAMES", 2)
+    for year in (2015, 2016, 2015, 2017, 2015, 2016):
+        evaluation.required_input_qnames(SamplePersona(policy_date_str=f"{year}-01-01"))
+
+    assert len(root_nodes_calls) == 4
+    assert len(evaluation._REQUIRED_INPUT_QNAMES) == 2  # noqa: SLF001
+
+
+def test_select_tt_targets_drops_unneeded_inputs(root_nodes_calls):  # noqa: ARG001
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    selected = persona.select_tt_targets({"some_target_qname_since_2010": None})
+
+    assert selected.tt_targets_tree == {"some_target_qname_since_2010": None}
+    assert set(selected.input_data_tree) == {"p_id", "hh_id", "einnahmen"}
+    assert selected.input_data_tree["p_id"] is persona.input_data_tree["p_id"]
+
+
+def test_select_tt_targets_fails_for_unknown_targets():
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    with pytest.raises(ValueError, match=r"not targets of this persona: \['x'\]"):
+        persona.select_tt_targets({"x": None})
+
+
+def test_call_persona_with_targets_prunes_before_applying_grid(root_nodes_calls):  # noqa: ARG001
+    persona = SamplePersona(
+        policy_date_str="2015-01-01",
+        tt_targets_tree={"some_target_qname": None},
+        bruttolohn_m_linspace_grid=SamplePersona.LinspaceGrid(
+            p0=SamplePersona.LinspaceRange(bottom=0, top=1),
+            p1=0,
+            p2=0,
+            n_points=2,
+        ),
+    )
+    assert persona.tt_targets_tree == {"hh_id": None, "some_target_qname": None}
+    assert set(persona.input_data_tree) == {
+        "p_id",
+        "hh_id",
+        "some_time_dependent_persona_input_element",
+        "einnahmen",
+    }
+    np.testing.assert_array_equal(persona.input_data_tree["hh_id"], [0, 0, 0, 1, 1, 1])
+
+
+@pytest.fixture
+def environment_calls(monkeypatch):
+    """Replace GETTSIM by a function that returns a new environment for each call."""
+    environment_calls = []
+
+    def fake_main(*, main_target, policy_date, backend):  # noqa: ARG001
+        environment_calls.append((policy_date, backend))
+        return {"kindergeld": {"satz": 250, "betrag_m": len}}
+
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    return environment_calls
+
+
+def test_policy_environments_are_cached_by_date(environment_calls):
+    cache = PolicyEnvironmentCache()
+    first = cache.get(datetime.date(2025, 1, 1))
+
+    assert cache.get(datetime.date(2025, 1, 1)) is first
+    assert cache.get(datetime.date(2024, 1, 1)) is not first
+    assert len(environment_calls) == 2
+    assert cache.cache_info() == PolicyEnvironmentCacheInfo(
+        hits=1, misses=2, maxsize=8, currsize=2
+    )
+
+
+def test_least_recently_used_policy_environment_is_dropped(environment_calls):
+    cache = PolicyEnvironmentCache(maxsize=2)
+    for year in (2023, 2024, 2023, 2025, 2023, 2024):
+        cache.get(datetime.date(year, 1, 1))
+
+    assert [d.year for d, _ in environment_calls] == [2023, 2024, 2025, 2024]
+    assert cache.cache_info().currsize == 2
+
+
+def test_policy_environments_are_cached_by_backend(environment_calls):
+    cache = PolicyEnvironmentCache()
+    numpy_environment = cache.get(datetime.date(2025, 1, 1))
+
+    assert cache.get(datetime.date(2025, 1, 1), backend="jax") is not numpy_environment
+    assert cache.get(datetime.date(2025, 1, 1), backend="numpy") is numpy_environment
+    assert environment_calls == [
+        (datetime.date(2025, 1, 1), "numpy"),
+        (datetime.date(2025, 1, 1), "jax"),
+    ]
+
+
+def test_policy_environment_is_created_once_for_concurrent_requests(monkeypatch):
+    calls = []
+
+    def fake_main(*, main_target, policy_date, backend):  # noqa: ARG001
+        calls.append(policy_date)
+        time.sleep(0.1)
+        return {"kindergeld": {"satz": 250}}
+
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    cache = PolicyEnvironmentCache()
+    environments = []
+    threads = [
+        threading.Thread(
+            target=lambda: environments.append(cache.get(datetime.date(2025, 1, 1)))
+        )
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [datetime.date(2025, 1, 1)]
+    assert all(env is environments[0] for env in environments)
+    assert cache.cache_info().misses == 1
+
+
+def test_other_policy_environments_are_available_while_one_is_created(monkeypatch):
+    release = threading.Event()
+
+    def fake_main(*, main_target, policy_date, backend):  # noqa: ARG001
+        if policy_date.year == 2025:
+            release.wait(timeout=5)
+        return {"kindergeld": {"satz": policy_date.year}}
+
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    cache = PolicyEnvironmentCache()
+    cache.get(datetime.date(2023, 1, 1))
+    thread = threading.Thread(target=cache.get, args=(datetime.date(2025, 1, 1),))
+    thread.start()
+    try:
+        start = time.perf_counter()
+        assert cache.get(datetime.date(2023, 1, 1))["kindergeld"]["satz"] == 2023
+        assert cache.get(datetime.date(2024, 1, 1))["kindergeld"]["satz"] == 2024
+        assert time.perf_counter() - start < 1
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_failed_creation_of_policy_environment_is_not_cached(monkeypatch):
+    calls = []
+
+    def fake_main(*, main_target, policy_date, backend):  # noqa: ARG001
+        calls.append(policy_date)
+        if len(calls) == 1:
+            msg = "Parameter files are missing."
+            raise ValueError(msg)
+        return {"kindergeld": {"satz": 250}}
+
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    cache = PolicyEnvironmentCache()
+    with pytest.raises(ValueError, match="Parameter files are missing"):
+        cache.get(datetime.date(2025, 1, 1))
+    assert cache.get(datetime.date(2025, 1, 1)) == {"kindergeld": {"satz": 250}}
+    assert len(calls) == 2
+
+
+def test_modified_policy_environments_are_cached_by_content(environment_calls):
+    cache = PolicyEnvironmentCache()
+    policy_date = datetime.date(2025, 1, 1)
+    modified = cache.get(policy_date, {"kindergeld": {"satz": np.arange(3)}})
+
+    assert modified["kindergeld"]["satz"] is not None
+    assert cache.get(policy_date)["kindergeld"]["satz"] == 250
+    assert cache.get(policy_date, {"kindergeld": {"satz": np.arange(3)}}) is modified
+    other = cache.get(policy_date, {"kindergeld": {"satz": np.arange(4)}})
+    assert other is not modified
+    assert cache.get(policy_date, {"kindergeld": {"betrag_m": abs}}) is not modified
+    assert len(environment_calls) == 1
+
+
+def test_evaluate_uses_cached_policy_environment(monkeypatch):
+    calls = []
+
+    def fake_main(**kwargs):
+        calls.append(kwargs)
+        return {}
+
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    monkeypatch.setattr(
+        evaluation,
+        "cached_policy_environment",
+        lambda policy_date, backend: f"{policy_date} {backend}",
+    )
+    evaluation.evaluate(SamplePersona(policy_date_str="2015-01-01"))
+
+    assert calls[0]["policy_environment"] == "2015-01-01 numpy"
+
+
+@pytest.mark.parametrize("maxsize", [0, 1.5])
+def test_fail_if_maxsize_is_invalid(maxsize):
+    with pytest.raises(ValueError, match="positive integer"):
+        PolicyEnvironmentCache(maxsize=maxsize)
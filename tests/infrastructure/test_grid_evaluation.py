@@ -0,0 +1,135 @@
+import dags.tree as dt
+import networkx as nx
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation, grid_evaluation
+from _gettsim_personas.grid_evaluation import (
+    evaluate_linspace_grid,
+    hoisted_nodes,
+    reshape_grid_results,
+)
+from tests.personas_for_testing import SamplePersona
+
+# A small stand-in for GETTSIM's graph: qname -> (arguments, function).
+FUNCTIONS = {
+    "freibetrag": (("input_qname_via_decorator",), lambda x: 10 * x),
+    # A param function, which is a scalar.
+    "satz": ((), lambda: np.float64(0.5)),
+    "some_target_qname": (
+        ("einnahmen__bruttolohn_m", "freibetrag", "satz"),
+        lambda lohn, freibetrag, satz: satz * lohn - freibetrag,
+    ),
+    "some_target_qname_since_2010": (
+        ("freibetrag",),
+        lambda freibetrag: freibetrag + 1,
+    ),
+    "bg_id": (("hh_id",), lambda hh_id: hh_id),
+}
+TT_DAG = nx.DiGraph(
+    [(arg, qname) for qname, (args, _) in FUNCTIONS.items() for arg in args]
+)
+
+
+@pytest.fixture
+def computed_rows(monkeypatch):
+    """Replace GETTSIM by an evaluation of FUNCTIONS that counts the computed rows."""
+    computed_rows = {}
+
+    def compute(qname, data):
+        if qname not in data:
+            args, func = FUNCTIONS[qname]
+            data[qname] = func(*(compute(arg, data) for arg in args))
+            computed_rows[qname] = computed_rows.get(qname, 0) + np.size(data[qname])
+        return data[qname]
+
+    def fake_main(*, main_target, input_data, tt_targets, **kwargs):  # noqa: ARG001
+        if main_target == "specialized_environment__tt_dag":
+            return TT_DAG
+        data = dt.flatten_to_qnames(input_data.tree)
+        return dt.unflatten_from_qnames(
+            {qname: compute(qname, data) for qname in dt.qnames(tt_targets.tree)}
+        )
+
+    monkeypatch.setattr(grid_evaluation, "main", fake_main)
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    monkeypatch.setattr(
+        evaluation,
+        "cached_policy_environment",
+        lambda policy_date, backend: policy_date,  # noqa: ARG005
+    )
+    return computed_rows
+
+
+@pytest.fixture
+def linspace_grid():
+    return SamplePersona.LinspaceGrid(
+        p0=SamplePersona.LinspaceRange(bottom=0, top=100),
+        p1=SamplePersona.LinspaceRange(bottom=0, top=50),
+        p2=0,
+        n_points=5,
+    )
+
+
+def test_hoisted_nodes():
+    hoisted = hoisted_nodes(
+        tt_dag=TT_DAG,
+        varied_qnames=["einnahmen__bruttolohn_m"],
+        input_qnames=["einnahmen__bruttolohn_m", "input_qname_via_decorator", "hh_id"],
+        target_qnames=["some_target_qname", "some_target_qname_since_2010", "hh_id"],
+    )
+
+    assert hoisted.boundary == {"freibetrag", "satz"}
+    assert hoisted.invariant_targets == {"some_target_qname_since_2010"}
+
+
+def test_results_equal_evaluation_of_full_grid(computed_rows, linspace_grid):  # noqa: ARG001
+    results = evaluate_linspace_grid(
+        SamplePersona(policy_date_str="2015-01-01"), linspace_grid
+    )
+    expected = evaluation.evaluate(
+        SamplePersona(
+            policy_date_str="2015-01-01", bruttolohn_m_linspace_grid=linspace_grid
+        )
+    )
+
+    assert dt.qnames(results) == dt.qnames(expected)
+    for qname, values in dt.flatten_to_qnames(expected).items():
+        np.testing.assert_array_equal(dt.flatten_to_qnames(results)[qname], values)
+
+
+def test_invariant_nodes_are_computed_once(computed_rows, linspace_grid):
+    evaluate_linspace_grid(SamplePersona(policy_date_str="2015-01-01"), linspace_grid)
+
+    # Scalar boundary nodes are recomputed in the evaluation over the grid.
+    assert computed_rows == {
+        "freibetrag": 3,
+        "satz": 2,
+        "some_target_qname_since_2010": 3,
+        "some_target_qname": 15,
+    }
+
+
+def test_reshape_grid_results(linspace_grid):
+    persona = SamplePersona(
+        policy_date_str="2015-01-01", bruttolohn_m_linspace_grid=linspace_grid
+    )
+    bruttolohn_m = persona.input_data_tree["einnahmen"]["bruttolohn_m"]
+    results = {
+        "einnahmen": {"bruttolohn_m": bruttolohn_m},
+        "betrag_m_hh": np.repeat(np.arange(5.0), 3),
+    }
+    grid_results = reshape_grid_results(results, linspace_grid)
+
+    reshaped = grid_results.results["einnahmen"]["bruttolohn_m"]
+    assert reshaped.shape == (5, 3)
+    assert np.shares_memory(reshaped, bruttolohn_m)
+    np.testing.assert_array_equal(reshaped, grid_results.bruttolohn_m)
+    np.testing.assert_array_equal(reshaped[:, 1], np.linspace(0, 50, 5))
+    np.testing.assert_array_equal(grid_results.results["betrag_m_hh"], np.arange(5.0))
+    np.testing.assert_array_equal(grid_results.p_id, [0, 1, 2])
+
+
+def test_fail_if_results_do_not_match_grid(linspace_grid):
+    with pytest.raises(ValueError, match="'x' has 14 rows, but the grid has 5 points"):
+        reshape_grid_results({"x": np.zeros(14)}, linspace_grid)
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+
+from _gettsim_personas.instrumentation import record_stages, stage
+from tests.personas_for_testing import SamplePersona
+
+
+def test_stages_are_not_recorded_by_default():
+    assert stage("a") is stage("b")
+
+
+def test_record_stages_of_persona_creation_and_upsert():
+    with record_stages() as recorder:
+        persona = SamplePersona(policy_date_str="2015-01-01")
+        persona.upsert_input_data({"x": np.arange(6)})
+    SamplePersona(policy_date_str="2015-01-01")
+
+    summary = recorder.summary()
+    assert list(summary) == [
+        "orig_elements",
+        "active_elements",
+        "input_data",
+        "upsert_input_data",
+    ]
+    assert all(s.n_calls == 1 for s in summary.values())
+    assert summary["input_data"].total_nbytes == sum(
+        a.nbytes
+        for a in [
+            *persona.input_data_tree.values(),
+            persona.input_data_tree["einnahmen"]["bruttolohn_m"],
+        ]
+        if isinstance(a, np.ndarray)
+    )
+    assert summary["upsert_input_data"].total_nbytes > 0
+    assert stage("a") is stage("b")
+
+
+def test_record_stages_are_nested():
+    with record_stages() as outer:
+        with stage("a"):
+            pass
+        with record_stages() as inner, stage("b"):
+            pass
+        with stage("a"):
+            pass
+    assert list(outer.summary()) == ["a"]
+    assert outer.summary()["a"].n_calls == 2
+    assert list(inner.summary()) == ["b"]
+
+
+def test_write_chrome_trace(tmp_path):
+    with record_stages() as recorder:
+        SamplePersona(policy_date_str="2015-01-01")
+    path = tmp_path / "trace.json"
+    recorder.write_chrome_trace(path)
+
+    events = json.loads(path.read_text())["traceEvents"]
+    assert {e["name"] for e in events} == {
+        "orig_elements",
+        "active_elements",
+        "input_data",
+    }
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
@@ -1,4 +1,6 @@
 import datetime
+import gc
+import weakref
 
 import numpy as np
 import pytest
@@ -6,9 +8,11 @@ from numpy.testing import assert_array_equal
 
 from _gettsim_personas.persona_elements import (
     TimeDependentPersonaElement,
+    constant_input_data,
     persona_description,
     persona_input_element,
     persona_target_element,
+    shared_read_only_array,
 )
 from tests.personas_for_testing.persona_elements import (
     description_since_2010,
@@ -127,3 +131,71 @@ def test_can_call_persona_input_elements():
         p_id(),
         np.array([0, 1, 2]),
     )
+
+
+def test_persona_input_elements_without_arguments_are_constant():
+    assert some_time_dependent_persona_input_element.is_constant
+    assert p_id.is_constant
+    assert not some_qname_depending_on_another_qname.is_constant
+    assert not true_if_evaluation_year_at_least_2015.is_constant
+
+
+def test_constant_input_data_is_read_only_and_evaluated_once():
+    calls = []
+
+    @persona_input_element()
+    def counted() -> np.ndarray:
+        calls.append(1)
+        return np.array([5, 6, 7])
+
+    first = constant_input_data(counted)
+    second = constant_input_data(counted)
+
+    assert first is second
+    assert len(calls) == 1
+    assert not first.flags.writeable
+    assert_array_equal(first, np.array([5, 6, 7]))
+
+
+def test_constant_input_data_is_shared_among_elements_with_equal_values():
+    @persona_input_element()
+    def a() -> np.ndarray:
+        return np.array([0, 0, 1])
+
+    @persona_input_element()
+    def b() -> np.ndarray:
+        return np.array([0, 0, 1])
+
+    @persona_input_element()
+    def c() -> np.ndarray:
+        return np.array([0.0, 0.0, 1.0])
+
+    assert constant_input_data(a) is constant_input_data(b)
+    assert constant_input_data(a) is not constant_input_data(c)
+    assert constant_input_data(c).dtype == np.float64
+
+
+def test_shared_read_only_array_does_not_freeze_the_original_array():
+    original = np.array([1, 2, 3])
+    shared = shared_read_only_array(original)
+    assert original.flags.writeable
+    assert not shared.flags.writeable
+    assert shared_read_only_array(np.array([1, 2, 3])) is shared
+
+
+def test_shared_read_only_array_is_released_when_unused():
+    shared = shared_read_only_array(np.array([8, 1, 5, 2]))
+    reference = weakref.ref(shared)
+    del shared
+    gc.collect()
+    assert reference() is None
+
+
+def test_constant_input_data_does_not_share_mutable_values():
+    @persona_input_element()
+    def as_list() -> list[int]:
+        return [0, 0, 1]
+
+    first = constant_input_data(as_list)
+    first.append(2)
+    assert constant_input_data(as_list) == [0, 0, 1]
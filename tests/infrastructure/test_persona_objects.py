@@ -1,23 +1,32 @@
+import collections
 import datetime
+import pickle
 from dataclasses import dataclass
 from pathlib import Path
 
+import dags.tree as dt
 import numpy as np
 import pytest
 from numpy.testing import assert_array_equal
 
+from _gettsim_personas import evaluation
 from _gettsim_personas.persona_elements import (
     persona_description,
     persona_input_element,
 )
 from _gettsim_personas.persona_objects import (
+    EvaluationDates,
     LinspaceGridProtocol,
+    OrigPersonaOverTime,
     _fail_if_active_tt_qnames_overlap,
     _fail_if_bruttolohn_m_linspace_grid_is_invalid,
     _fail_if_not_exactly_one_description_is_active,
+    _get_qname_input_data,
+    _unnecessary_inputs,
 )
 from tests.personas_for_testing import (
     SamplePersona,
+    SamplePersonaFromToml,
     SamplePersonaWithInvalidLengthOfInputData,
     SamplePersonaWithOverlappingElements,
     SamplePersonaWithStartAndEndDate,
@@ -373,3 +382,374 @@ def test_persona_description_is_string_after_instantiation():
         evaluation_date_str="2015-01-01",
     )
     assert isinstance(persona.description, str)
+
+
+def test_constant_input_data_is_shared_across_calls_and_personas():
+    first = SamplePersona(policy_date_str="2015-01-01")
+    second = SamplePersona(policy_date_str="2016-01-01")
+    from_toml = SamplePersonaFromToml(policy_date_str="2015-01-01")
+
+    assert first.input_data_tree["hh_id"] is second.input_data_tree["hh_id"]
+    assert first.input_data_tree["hh_id"] is from_toml.input_data_tree["hh_id"]
+    assert not first.input_data_tree["hh_id"].flags.writeable
+    # Identical values are shared even among different qnames.
+    assert (
+        first.input_data_tree["some_time_dependent_persona_input_element"]
+        is first.input_data_tree["einnahmen"]["bruttolohn_m"]
+    )
+
+
+def test_input_data_depending_on_evaluation_date_is_recomputed():
+    first = SamplePersona(policy_date_str="2015-01-01")
+    second = SamplePersona(policy_date_str="2015-01-01")
+    qname = "qname_depending_on_evaluation_date_and_another_qname"
+    assert first.input_data_tree[qname] is not second.input_data_tree[qname]
+    assert first.input_data_tree[qname].flags.writeable
+
+
+def test_upserted_persona_input_data_is_writeable():
+    persona = SamplePersona(policy_date_str="2015-01-01").upsert_input_data(
+        {"x": np.array([0, 0, 1, 1, 2, 2])}
+    )
+    assert persona.input_data_tree["hh_id"].flags.writeable
+
+
+def test_diff_between_periods_of_sample_persona():
+    persona_diff = SamplePersona.diff(
+        from_policy_date=datetime.date(2009, 1, 1),
+        to_policy_date=datetime.date(2010, 1, 1),
+    )
+    assert persona_diff.added_input_qnames == {
+        "time_dependent_persona_input_element_since_2010"
+    }
+    assert persona_diff.removed_input_qnames == {
+        "time_dependent_persona_input_element_until_2009"
+    }
+    assert persona_diff.recomputed_input_qnames == {
+        "true_if_evaluation_year_at_least_2015",
+        "qname_depending_on_evaluation_date_and_another_qname",
+    }
+    assert "hh_id" in persona_diff.unchanged_input_qnames
+    assert persona_diff.added_tt_targets == {"some_target_qname_since_2010"}
+    assert persona_diff.removed_tt_targets == {"some_target_qname_until_2009"}
+    assert persona_diff.description_changed
+    assert persona_diff.input_data_changed
+
+
+def test_diff_is_empty_within_period_and_fixed_evaluation_date():
+    persona_diff = SamplePersona.diff(
+        from_policy_date=datetime.date(2015, 1, 1),
+        to_policy_date=datetime.date(2016, 1, 1),
+        from_evaluation_date=datetime.date(2015, 1, 1),
+        to_evaluation_date=datetime.date(2015, 1, 1),
+    )
+    assert not persona_diff.input_data_changed
+    assert not persona_diff.tt_targets_changed
+    assert not persona_diff.description_changed
+
+
+@pytest.mark.parametrize(
+    ("from_dates", "to_dates"),
+    [
+        (("2009-01-01", None), ("2010-01-01", None)),
+        (("2014-01-01", None), ("2015-01-01", None)),
+        (("2015-01-01", "2014-01-01"), ("2015-01-01", "2016-01-01")),
+        (("2016-01-01", None), ("2009-06-01", "2020-01-01")),
+    ],
+)
+def test_advance_is_identical_to_calling_persona(from_dates, to_dates):
+    persona = SamplePersona(
+        policy_date_str=from_dates[0], evaluation_date_str=from_dates[1]
+    )
+    actual = SamplePersona.advance(
+        persona, policy_date_str=to_dates[0], evaluation_date_str=to_dates[1]
+    )
+    expected = SamplePersona(
+        policy_date_str=to_dates[0], evaluation_date_str=to_dates[1]
+    )
+
+    assert actual.description == expected.description
+    assert actual.policy_date == expected.policy_date
+    assert actual.evaluation_date == expected.evaluation_date
+    assert actual.tt_targets_tree == expected.tt_targets_tree
+    assert list(actual.input_data_tree) == list(expected.input_data_tree)
+    for qname, array in expected.input_data_tree.items():
+        if isinstance(array, dict):
+            continue
+        assert_array_equal(actual.input_data_tree[qname], array)
+
+
+def test_advance_shares_unchanged_arrays():
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    advanced = SamplePersona.advance(persona, policy_date_str="2016-01-01")
+    # Not constant, but does not depend on the evaluation date.
+    qname = "some_qname_depending_on_another_qname"
+    assert advanced.input_data_tree[qname] is persona.input_data_tree[qname]
+    qname = "qname_depending_on_evaluation_date_and_another_qname"
+    assert advanced.input_data_tree[qname] is not persona.input_data_tree[qname]
+
+
+def test_advance_fails_for_upserted_persona():
+    persona = SamplePersona(policy_date_str="2015-01-01").upsert_input_data(
+        {"x": np.array([0, 0, 1, 1, 2, 2])}
+    )
+    with pytest.raises(ValueError, match="can be advanced"):
+        SamplePersona.advance(persona, policy_date_str="2016-01-01")
+
+
+def test_call_persona_with_multiple_evaluation_dates():
+    evaluation_dates = ["2014-01-01", "2015-01-01", "2016-01-01"]
+    persona = SamplePersona(
+        policy_date_str="2015-01-01", evaluation_date_str=evaluation_dates
+    )
+    single_date_personas = [
+        SamplePersona(policy_date_str="2015-01-01", evaluation_date_str=date)
+        for date in evaluation_dates
+    ]
+
+    assert persona.evaluation_date == tuple(
+        datetime.date.fromisoformat(date) for date in evaluation_dates
+    )
+    assert_array_equal(persona.input_data_tree["p_id"], np.arange(9))
+    assert_array_equal(persona.input_data_tree["hh_id"], np.repeat([0, 1, 2], 3))
+    assert "hh_id" in persona.tt_targets_tree
+    for qname in (
+        "true_if_evaluation_year_at_least_2015",
+        "qname_depending_on_evaluation_date_and_another_qname",
+        "some_qname_depending_on_another_qname",
+    ):
+        assert_array_equal(
+            persona.input_data_tree[qname],
+            np.concatenate([p.input_data_tree[qname] for p in single_date_personas]),
+        )
+
+
+@persona_input_element()
+def alter():
+    return np.array([30, 5])
+
+
+@persona_input_element()
+def geburtsjahr(evaluation_date, alter):
+    return evaluation_date.year - alter
+
+
+@persona_input_element()
+def jahr(evaluation_date):
+    return np.array([evaluation_date.year, evaluation_date.year])
+
+
+@persona_input_element()
+def stichtag_jahr(evaluation_date):
+    stichtag = evaluation_date.replace(month=1, day=1)
+    return np.array([stichtag.year, stichtag.year])
+
+
+@persona_input_element()
+def ab_2015(evaluation_date):
+    return np.full(2, np.all(evaluation_date.year >= 2015))
+
+
+@pytest.mark.parametrize(
+    ("elements", "expected"),
+    [
+        ([alter, geburtsjahr], {"geburtsjahr": [[1980, 2005], [1990, 2015]]}),
+        # Not vectorizable, evaluated date by date.
+        ([alter, geburtsjahr, jahr], {"jahr": [[2010, 2010], [2020, 2020]]}),
+        ([alter, stichtag_jahr], {"stichtag_jahr": [[2010, 2010], [2020, 2020]]}),
+        ([alter, ab_2015], {"ab_2015": [[False, False], [True, True]]}),
+    ],
+)
+def test_date_dependent_input_data_has_one_row_per_evaluation_date(elements, expected):
+    qname_input_data = _get_qname_input_data(
+        evaluation_date=EvaluationDates(
+            dates=(datetime.date(2010, 1, 1), datetime.date(2020, 1, 1))
+        ),
+        persona_input_elements={el.tt_qname: el for el in elements},
+    )
+    assert_array_equal(qname_input_data["alter"], [30, 5])
+    for qname, array in expected.items():
+        assert_array_equal(qname_input_data[qname], array)
+
+
+def test_multiple_evaluation_dates_fail_with_linspace_grid():
+    with pytest.raises(ValueError, match="cannot be combined"):
+        SamplePersona(
+            policy_date_str="2015-01-01",
+            evaluation_date_str=["2015-01-01", "2016-01-01"],
+            bruttolohn_m_linspace_grid=SamplePersona.LinspaceGrid(
+                p0=SamplePersona.LinspaceRange(bottom=0, top=1),
+                p1=0,
+                p2=0,
+                n_points=2,
+            ),
+        )
+
+
+def test_persona_pickles_input_arrays_out_of_band():
+    persona = SamplePersona(policy_date_str="2015-01-01").upsert_input_data(
+        {"einnahmen": {"bruttolohn_m": np.arange(3000, dtype=float)}}
+    )
+    buffers = []
+    data = pickle.dumps(persona, protocol=5, buffer_callback=buffers.append)
+    unpickled = pickle.loads(data, buffers=buffers)
+
+    assert len(data) < 2_000
+    assert len(buffers) == len(dt.qnames(persona.input_data_tree))
+    assert unpickled.tt_targets_tree == persona.tt_targets_tree
+    bruttolohn_m = unpickled.input_data_tree["einnahmen"]["bruttolohn_m"]
+    assert np.shares_memory(
+        bruttolohn_m, persona.input_data_tree["einnahmen"]["bruttolohn_m"]
+    )
+
+
+@pytest.mark.parametrize("protocol", [4, 5])
+def test_persona_pickle_roundtrip(protocol):
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    unpickled = pickle.loads(pickle.dumps(persona, protocol=protocol))
+    assert unpickled.description == persona.description
+    for qname, array in dt.flatten_to_qnames(persona.input_data_tree).items():
+        np.testing.assert_array_equal(
+            dt.flatten_to_qnames(unpickled.input_data_tree)[qname], array
+        )
+
+
+def test_linspace_grid_can_be_pickled():
+    grid = SamplePersona.LinspaceGrid(
+        p0=SamplePersona.LinspaceRange(bottom=0, top=1), p1=2, p2=3, n_points=2
+    )
+    assert pickle.loads(pickle.dumps(grid)) == grid
+
+
+def test_upsert_household_data():
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    upserted = persona.upsert_household_data(
+        {"wohnen": {"bruttokaltmiete_m_hh": np.array([400, 600])}}
+    )
+    assert_array_equal(
+        upserted.input_data_tree["wohnen"]["bruttokaltmiete_m_hh"],
+        [400, 400, 400, 600, 600, 600],
+    )
+    assert_array_equal(upserted.input_data_tree["hh_id"], [0, 0, 0, 1, 1, 1])
+    assert upserted.tt_targets_tree["hh_id"] is None
+
+    # Households of the upserted persona are copied as a whole.
+    upserted_again = upserted.upsert_household_data(
+        {"wohnen": {"heizkosten_m_hh": np.arange(4)}}
+    )
+    assert_array_equal(
+        upserted_again.input_data_tree["wohnen"]["bruttokaltmiete_m_hh"],
+        [400] * 3 + [600] * 3 + [400] * 3 + [600] * 3,
+    )
+    assert_array_equal(
+        upserted_again.input_data_tree["wohnen"]["heizkosten_m_hh"],
+        np.repeat(np.arange(4), 3),
+    )
+
+
+@pytest.mark.parametrize(
+    ("household_data", "match"),
+    [
+        ({"a_hh": np.arange(2), "b_hh": np.arange(3)}, "differs"),
+        ({"a_hh": np.arange(3)}, "multiple of the number of households"),
+    ],
+)
+def test_fail_if_household_data_lengths_are_incompatible(household_data, match):
+    persona = SamplePersona(policy_date_str="2015-01-01").upsert_household_data(
+        {"a_hh": np.arange(2)}
+    )
+    with pytest.raises(ValueError, match=match):
+        persona.upsert_household_data(household_data)
+
+
+@pytest.fixture
+def root_node_calls(monkeypatch):
+    """Replace GETTSIM's root nodes by all inputs but `input_qname_via_decorator`.
+
+    GETTSIM's policy functions change on 2020-07-01.
+    """
+    calls = []
+
+    def fake_main(main_target, policy_date, input_data, **kwargs):  # noqa: ARG001
+        calls.append(policy_date)
+        return [
+            qname
+            for qname in dt.qnames(input_data.tree)
+            if qname != "input_qname_via_decorator"
+        ]
+
+    monkeypatch.setattr(evaluation, "main", fake_main)
+    monkeypatch.setattr(evaluation, "_REQUIRED_INPUT_QNAMES", collections.OrderedDict())
+    monkeypatch.setattr(
+        evaluation, "cached_policy_environment", lambda policy_date: policy_date
+    )
+    monkeypatch.setattr(
+        evaluation,
+        "gettsim_change_points",
+        lambda: frozenset({datetime.date(2020, 7, 1)}),
+    )
+    _unnecessary_inputs.cache_clear()
+    yield calls
+    _unnecessary_inputs.cache_clear()
+
+
+def test_validation_intervals_split_at_persona_and_gettsim_changes(root_node_calls):  # noqa: ARG001
+    persona = OrigPersonaOverTime(
+        path_to_persona_elements=SamplePersona.path_to_persona_elements
+    )
+    assert persona.validation_intervals(
+        (datetime.date(2005, 3, 1), datetime.date(2021, 12, 31))
+    ) == [
+        (datetime.date(2005, 3, 1), datetime.date(2009, 12, 31)),
+        (datetime.date(2010, 1, 1), datetime.date(2020, 6, 30)),
+        (datetime.date(2020, 7, 1), datetime.date(2021, 12, 31)),
+    ]
+
+
+def test_validate_checks_each_interval_once_and_caches_outcome(root_node_calls):
+    persona = OrigPersonaOverTime(
+        path_to_persona_elements=SamplePersona.path_to_persona_elements
+    )
+    date_range = (datetime.date(2015, 1, 1), datetime.date(2025, 12, 31))
+    with pytest.raises(ValueError, match="input_qname_via_decorator"):
+        persona.validate(date_range)
+    assert root_node_calls == [datetime.date(2010, 1, 1), datetime.date(2020, 7, 1)]
+    with pytest.raises(ValueError, match="input_qname_via_decorator"):
+        persona.validate(date_range)
+    with pytest.raises(ValueError, match="input_qname_via_decorator"):
+        persona.validate((datetime.date(2016, 3, 1), datetime.date(2020, 8, 31)))
+    assert len(root_node_calls) == 2
+
+
+def test_validate_passes_if_gettsim_needs_all_inputs(monkeypatch, root_node_calls):  # noqa: ARG001
+    monkeypatch.setattr(
+        evaluation,
+        "main",
+        lambda input_data, **kwargs: dt.qnames(input_data.tree),  # noqa: ARG005
+    )
+    persona = OrigPersonaOverTime(
+        path_to_persona_elements=SamplePersona.path_to_persona_elements
+    )
+    assert persona.validate(
+        (datetime.date(2020, 1, 1), datetime.date(2020, 12, 31))
+    ) == [
+        (datetime.date(2020, 1, 1), datetime.date(2020, 6, 30)),
+        (datetime.date(2020, 7, 1), datetime.date(2020, 12, 31)),
+    ]
+
+
+def test_validate_outside_persona_dates_checks_nothing(root_node_calls):
+    assert (
+        SamplePersonaWithStartAndEndDate.validate(
+            (datetime.date(2000, 1, 1), datetime.date(2010, 1, 1))
+        )
+        == []
+    )
+    assert root_node_calls == []
+
+
+def test_fail_if_date_range_is_invalid():
+    with pytest.raises(ValueError, match="first and last date"):
+        SamplePersona.validation_intervals(
+            (datetime.date(2021, 1, 1), datetime.date(2020, 1, 1))
+        )
@@ -0,0 +1,92 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation, policy_sweep
+from _gettsim_personas.policy_sweep import evaluate_policy_variants
+from tests.personas_for_testing import SamplePersona
+
+TT_DAG = nx.DiGraph()
+BASE_ENVIRONMENT = {
+    "kindergeld": {"satz": 250, "betrag_m": lambda satz: satz},
+    "p_id": None,
+}
+
+
+@pytest.fixture
+def main_calls(monkeypatch):
+    """Replace GETTSIM by a function that returns the parameter of the environment."""
+    main_calls = []
+
+    def fake_main(**kwargs):
+        main_calls.append(kwargs)
+        if "main_targets" in kwargs:
+            return {
+                "processed_data": {"p_id": np.arange(6)},
+                "specialized_environment": {"tt_dag": TT_DAG},
+            }
+        return {"satz": kwargs["policy_environment"]["kindergeld"]["satz"]}
+
+    monkeypatch.setattr(policy_sweep, "main", fake_main)
+    monkeypatch.setattr(
+        evaluation,
+        "cached_policy_environment",
+        lambda policy_date: BASE_ENVIRONMENT,  # noqa: ARG005
+    )
+    return main_calls
+
+
+def test_variants_are_evaluated_with_their_parameters(main_calls):
+    results = evaluate_policy_variants(
+        SamplePersona(policy_date_str="2015-01-01"),
+        {"status_quo": {}, "higher": {"kindergeld": {"satz": 300}}},
+    )
+
+    assert results == {"status_quo": {"satz": 250}, "higher": {"satz": 300}}
+    assert BASE_ENVIRONMENT["kindergeld"]["satz"] == 250
+    assert len(main_calls) == 3
+
+
+def test_input_data_is_processed_once(main_calls):
+    evaluate_policy_variants(
+        SamplePersona(policy_date_str="2015-01-01"),
+        {"a": {"kindergeld": {"satz": 1}}, "b": {"kindergeld": {"satz": 2}}},
+    )
+
+    for call in main_calls[1:]:
+        np.testing.assert_array_equal(call["processed_data"]["p_id"], np.arange(6))
+        assert call["specialized_environment"].tt_dag is TT_DAG
+
+
+def test_graph_is_not_reused_if_functions_are_replaced(main_calls):
+    evaluate_policy_variants(
+        SamplePersona(policy_date_str="2015-01-01"),
+        {"reform": {"kindergeld": {"betrag_m": lambda satz: 2 * satz}}},
+    )
+
+    assert main_calls[1]["specialized_environment"] is None
+
+
+def test_variants_are_evaluated_in_executor(main_calls):  # noqa: ARG001
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = evaluate_policy_variants(
+            SamplePersona(policy_date_str="2015-01-01"),
+            {str(satz): {"kindergeld": {"satz": satz}} for satz in range(4)},
+            executor=executor,
+        )
+
+    assert results == {str(satz): {"satz": satz} for satz in range(4)}
+
+
+@pytest.mark.parametrize(
+    ("variants", "match"),
+    [
+        ({}, "at least one policy variant"),
+        ({"a": {"kindergeld": {"typo": 1}}}, r"'a' sets .*\['kindergeld__typo'\]"),
+    ],
+)
+def test_fail_if_variants_are_invalid(main_calls, variants, match):  # noqa: ARG001
+    with pytest.raises(ValueError, match=match):
+        evaluate_policy_variants(SamplePersona(policy_date_str="2015-01-01"), variants)
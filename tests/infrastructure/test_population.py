@@ -0,0 +1,107 @@
+import dags.tree as dt
+import numpy as np
+import pytest
+
+from _gettsim_personas.persona_objects import LinspaceRange
+from _gettsim_personas.population import PopulationComponent, build_population
+from gettsim_personas import grundsicherung_für_erwerbsfähige
+from tests.personas_for_testing import SamplePersona
+
+
+@pytest.fixture
+def population():
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    return build_population(
+        [
+            PopulationComponent(
+                persona=persona,
+                weight=100,
+                bruttolohn_m_linspace_grid=SamplePersona.LinspaceGrid(
+                    p0=LinspaceRange(0, 300), p1=0, p2=0, n_points=4
+                ),
+            ),
+            PopulationComponent(persona=persona, weight=np.array([10.0])),
+        ]
+    )
+
+
+def test_build_population(population):
+    data = population.persona.input_data_tree
+    np.testing.assert_array_equal(data["p_id"], np.arange(15))
+    np.testing.assert_array_equal(data["hh_id"], np.repeat(np.arange(5), 3))
+    np.testing.assert_array_equal(
+        data["einnahmen"]["bruttolohn_m"][::3], [0, 100, 200, 300, 1]
+    )
+    np.testing.assert_array_equal(population.weight, [25] * 12 + [10] * 3)
+    np.testing.assert_array_equal(population.component, [0] * 12 + [1] * 3)
+    assert population.n_households == 5
+    assert population.persona.tt_targets_tree["hh_id"] is None
+
+
+def test_pointers_are_rekeyed_across_personas():
+    population = build_population(
+        [
+            PopulationComponent(
+                persona=getattr(grundsicherung_für_erwerbsfähige, name)(
+                    policy_date_str="2025-01-01"
+                ),
+                weight=1,
+            )
+            for name in ("Couple1Child", "Couple2Children")
+        ]
+    )
+    data = dt.flatten_to_qnames(population.persona.input_data_tree)
+    np.testing.assert_array_equal(data["hh_id"], [0, 0, 0, 1, 1, 1, 1])
+    np.testing.assert_array_equal(
+        data["familie__p_id_ehepartner"], [1, 0, -1, 4, 3, -1, -1]
+    )
+    np.testing.assert_array_equal(
+        data["kindergeld__p_id_empfänger"], [-1, -1, 0, -1, -1, 3, 3]
+    )
+
+
+def test_aggregate_counts_group_values_once_per_group(population):
+    results = {
+        "betrag_m": np.ones(15),
+        "betrag_m_hh": np.ones(15),
+        "x": {"betrag_m_bg": np.ones(15)},
+        "bg_id": np.arange(15),
+    }
+    totals = population.aggregate(results)
+    assert totals["betrag_m"] == 3 * 110
+    assert totals["betrag_m_hh"] == 110
+    assert totals["x"]["betrag_m_bg"] == 3 * 110
+    assert "bg_id" not in totals
+
+    by_component = population.aggregate(results, by_component=True)
+    np.testing.assert_array_equal(by_component["betrag_m_hh"], [100, 10])
+
+
+def test_fail_if_group_ids_are_missing_for_aggregation(population):
+    with pytest.raises(ValueError, match="without 'bg_id'"):
+        population.aggregate({"betrag_m_bg": np.ones(15)})
+
+
+def test_fail_if_personas_have_different_columns():
+    persona = SamplePersona(policy_date_str="2015-01-01")
+    with pytest.raises(ValueError, match=r"not part of all personas: \['x'\]"):
+        build_population(
+            [
+                PopulationComponent(persona=persona, weight=1),
+                PopulationComponent(
+                    persona=persona.upsert_input_data({"x": np.arange(3)}), weight=1
+                ),
+            ]
+        )
+
+
+def test_fail_if_weights_do_not_match_grid():
+    with pytest.raises(ValueError, match="one entry per grid point"):
+        build_population(
+            [
+                PopulationComponent(
+                    persona=SamplePersona(policy_date_str="2015-01-01"),
+                    weight=np.ones(3),
+                )
+            ]
+        )
@@ -0,0 +1,15 @@
+import pytest
+
+from _gettsim_personas.registry import get_persona, persona_registry
+from gettsim_personas.einkommensteuer_sozialabgaben import Couple1Child
+
+
+def test_persona_registry_contains_shipped_personas():
+    registry = persona_registry()
+    assert registry["einkommensteuer_sozialabgaben.Couple1Child"] is Couple1Child
+    assert len(registry) == len(set(registry.values()))
+
+
+def test_get_persona_fails_for_unknown_name():
+    with pytest.raises(ValueError, match="Unknown persona: 'Couple1Child'"):
+        get_persona("Couple1Child")
@@ -0,0 +1,248 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.service import (
+    PersonaService,
+    make_server,
+    results_to_json,
+    split_results,
+)
+from tests.personas_for_testing import (
+    SamplePersona,
+    SamplePersonaEvaluatedWithGettsim,
+)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace GETTSIM by a function that returns the upserted earnings."""
+    calls = []
+
+    def fake_evaluate(persona, policy_environment=None):
+        calls.append((persona, policy_environment))
+        return {
+            "p_id": persona.input_data_tree["p_id"],
+            "einnahmen": {
+                "bruttolohn_m": 2 * persona.input_data_tree["einnahmen"]["bruttolohn_m"]
+            },
+        }
+
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    monkeypatch.setattr(
+        evaluation, "cached_policy_environment", lambda policy_date: policy_date
+    )
+    return calls
+
+
+@pytest.fixture
+def service():
+    return PersonaService(personas={"sample": SamplePersona}, batch_window=0.1)
+
+
+@pytest.fixture
+def server(service):
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, request, **headers):
+    http_request = urllib.request.Request(  # noqa: S310
+        url,
+        data=json.dumps(request).encode(),
+        headers={"Content-Type": "application/json", **headers},
+    )
+    with urllib.request.urlopen(http_request) as response:  # noqa: S310
+        return response.headers["Content-Type"], response.read()
+
+
+def test_concurrent_requests_are_evaluated_in_one_batch(calls, service):
+    requests = [
+        {
+            "persona": "sample",
+            "policy_date": "2015-01-01",
+            "input_data": {"einnahmen": {"bruttolohn_m": [i, i, i]}},
+        }
+        for i in range(4)
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(service.evaluate, requests))
+
+    assert len(calls) == 1
+    persona, policy_environment = calls[0]
+    assert len(persona.input_data_tree["p_id"]) == 12
+    assert policy_environment == persona.policy_date
+    for i, result in enumerate(results):
+        np.testing.assert_array_equal(result["einnahmen"]["bruttolohn_m"], [2 * i] * 3)
+
+
+def test_requests_for_different_dates_are_not_batched(calls, service):
+    requests = [
+        {"persona": "sample", "policy_date": "2015-01-01"},
+        {"persona": "sample", "policy_date": "2015-01-01"},
+        {"persona": "sample", "policy_date": "2016-01-01"},
+    ]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(service.evaluate, requests))
+
+    assert len(calls) == 2
+    assert results[0] is not results[1]
+    np.testing.assert_array_equal(
+        results[0]["einnahmen"]["bruttolohn_m"], results[1]["einnahmen"]["bruttolohn_m"]
+    )
+
+
+def test_invalid_request_does_not_fail_its_batch(calls, service, monkeypatch):
+    def fake_evaluate(persona, policy_environment=None):
+        calls.append((persona, policy_environment))
+        bruttolohn_m = persona.input_data_tree["einnahmen"]["bruttolohn_m"]
+        if (bruttolohn_m < 0).any():
+            msg = "Negative earnings."
+            raise ValueError(msg)
+        return {"einnahmen": {"bruttolohn_m": 2 * bruttolohn_m}}
+
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    requests = [
+        {
+            "persona": "sample",
+            "policy_date": "2015-01-01",
+            "input_data": {"einnahmen": {"bruttolohn_m": [i, i, i]}},
+        }
+        for i in (1, -1, 3)
+    ]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(service.evaluate, r) for r in requests]
+
+    assert len(calls) == 4
+    np.testing.assert_array_equal(
+        futures[0].result()["einnahmen"]["bruttolohn_m"], [2, 2, 2]
+    )
+    with pytest.raises(ValueError, match="Negative earnings"):
+        futures[1].result()
+    np.testing.assert_array_equal(
+        futures[2].result()["einnahmen"]["bruttolohn_m"], [6, 6, 6]
+    )
+
+
+def test_split_results():
+    results = {"a": np.arange(9), "b": {"c": np.arange(9) * 2}}
+    split = split_results(results, lengths=[3, 6])
+    np.testing.assert_array_equal(split[0]["a"], [0, 1, 2])
+    np.testing.assert_array_equal(split[1]["b"]["c"], [6, 8, 10, 12, 14, 16])
+
+
+def test_server_returns_json(calls, server):  # noqa: ARG001
+    content_type, body = post(
+        f"{server}/evaluate",
+        {
+            "persona": "sample",
+            "policy_date": "2015-01-01",
+            "input_data": {"einnahmen": {"bruttolohn_m": [1, 2, 3, 4, 5, 6]}},
+        },
+    )
+    assert content_type == "application/json"
+    assert json.loads(body) == {
+        "p_id": [0, 1, 2, 3, 4, 5],
+        "einnahmen": {"bruttolohn_m": [2, 4, 6, 8, 10, 12]},
+    }
+
+
+def test_results_to_json_converts_nan_to_null():
+    results = {"a": np.array([1.0, np.nan, np.inf]), "b": np.array([1, 2])}
+    assert json.loads(results_to_json(results)) == {
+        "a": [1.0, None, None],
+        "b": [1, 2],
+    }
+
+
+def test_server_returns_internal_server_error_for_unexpected_errors(
+    server, monkeypatch
+):
+    def fake_evaluate(persona, policy_environment=None):  # noqa: ARG001
+        msg = "Something broke."
+        raise RuntimeError(msg)
+
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    monkeypatch.setattr(
+        evaluation, "cached_policy_environment", lambda policy_date: policy_date
+    )
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post(f"{server}/evaluate", {"persona": "sample", "policy_date": "2015-01-01"})
+    assert e.value.code == 500
+    assert json.loads(e.value.read()) == {"error": "RuntimeError: Something broke."}
+
+
+def test_server_returns_arrow(calls, server):  # noqa: ARG001
+    pa = pytest.importorskip("pyarrow")
+    content_type, body = post(
+        f"{server}/evaluate?format=arrow",
+        {"persona": "sample", "policy_date": "2015-01-01"},
+    )
+    assert content_type == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.column("einnahmen__bruttolohn_m").to_pylist() == [2, 4, 6]
+
+
+def test_server_lists_personas(server):
+    with urllib.request.urlopen(f"{server}/personas") as response:  # noqa: S310
+        assert json.loads(response.read()) == ["sample"]
+
+
+@pytest.mark.parametrize(
+    ("request_", "match"),
+    [
+        ({"persona": "sample"}, "Missing keys"),
+        ({"persona": "unknown", "policy_date": "2015-01-01"}, "Unknown persona"),
+        (
+            {
+                "persona": "sample",
+                "policy_date": "2015-01-01",
+                "input_data": {"x": [1, 2]},
+            },
+            "not a multiple",
+        ),
+    ],
+)
+def test_server_returns_bad_request_for_invalid_requests(
+    calls,  # noqa: ARG001
+    server,
+    request_,
+    match,
+):
+    with pytest.raises(urllib.error.HTTPError) as e:
+        post(f"{server}/evaluate", request_)
+    assert e.value.code == 400
+    assert match in json.loads(e.value.read())["error"]
+
+
+def test_batched_response_equals_unbatched_response_with_gettsim():
+    service = PersonaService(
+        personas={"sample": SamplePersonaEvaluatedWithGettsim}, batch_window=0.5
+    )
+    requests = [
+        {
+            "persona": "sample",
+            "policy_date": "2024-01-01",
+            "input_data": {"einnahmen": {"bruttolohn_m": [bruttolohn_m, 0, 0]}},
+        }
+        for bruttolohn_m in (2000, 4000, 6000)
+    ]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        batched = list(executor.map(service.evaluate, requests))
+    unbatched = [service.evaluate(request) for request in requests]
+
+    for batched_results, unbatched_results in zip(batched, unbatched, strict=True):
+        assert batched_results.keys() == unbatched_results.keys()
+        assert json.loads(results_to_json(batched_results)) == json.loads(
+            results_to_json(unbatched_results)
+        )
@@ -0,0 +1,93 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from _gettsim_personas import evaluation
+from _gettsim_personas.shared_memory import (
+    SharedPersona,
+    attach_persona,
+    evaluate_in_parallel,
+)
+from tests.personas_for_testing import SamplePersona
+
+
+@pytest.fixture
+def persona():
+    return SamplePersona(policy_date_str="2015-01-01").upsert_input_data(
+        {"einnahmen": {"bruttolohn_m": np.arange(3 * 1000, dtype=float)}}
+    )
+
+
+def test_attached_persona_equals_shared_persona(persona):
+    with SharedPersona(persona) as shared, attach_persona(shared.batch) as attached:
+        for qname in ("p_id", "hh_id", "some_time_dependent_persona_input_element"):
+            np.testing.assert_array_equal(
+                attached.input_data_tree[qname], persona.input_data_tree[qname]
+            )
+        assert attached.tt_targets_tree == persona.tt_targets_tree
+        del attached
+
+
+def test_attached_input_data_is_not_copied(persona):
+    with (
+        SharedPersona(persona) as shared,
+        attach_persona(shared.batch, rows=slice(3, 6)) as first,
+        attach_persona(shared.batch) as second,
+    ):
+        bruttolohn_m = second.input_data_tree["einnahmen"]["bruttolohn_m"]
+        assert not bruttolohn_m.flags.owndata
+        assert not bruttolohn_m.flags.writeable
+        bruttolohn_m.flags.writeable = True
+        bruttolohn_m[3] = -1
+        assert first.input_data_tree["einnahmen"]["bruttolohn_m"][0] == -1
+        del first, second, bruttolohn_m
+
+
+def test_batch_descriptor_is_small(persona):
+    with SharedPersona(persona) as shared:
+        n_bytes_descriptor = len(pickle.dumps(shared.batch))
+    assert n_bytes_descriptor < 2_000 < len(pickle.dumps(persona))
+
+
+def test_row_slices_contain_whole_households(persona):
+    with SharedPersona(persona) as shared:
+        row_slices = shared.row_slices(7)
+    assert len(row_slices) == 7
+    assert row_slices[0].start == 0
+    assert row_slices[-1].stop == 3000
+    assert all(s.start % 3 == 0 for s in row_slices)
+
+
+def test_evaluate_in_parallel(monkeypatch, persona):
+    def fake_evaluate(persona, policy_environment=None):  # noqa: ARG001
+        bruttolohn_m = persona.input_data_tree["einnahmen"]["bruttolohn_m"]
+        return {
+            "p_id": persona.input_data_tree["p_id"],
+            "einnahmen": {"bruttolohn_m": 2 * bruttolohn_m},
+            "input_data_owned_by_worker": np.full(
+                len(bruttolohn_m), bruttolohn_m.flags.owndata
+            ),
+        }
+
+    monkeypatch.setattr(evaluation, "evaluate", fake_evaluate)
+    monkeypatch.setattr(
+        evaluation, "cached_policy_environment", lambda policy_date: policy_date
+    )
+    with ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("fork")
+    ) as executor:
+        results = evaluate_in_parallel(persona, n_workers=4, executor=executor)
+
+    np.testing.assert_array_equal(results["p_id"], np.arange(3000))
+    np.testing.assert_array_equal(
+        results["einnahmen"]["bruttolohn_m"], 2 * np.arange(3000)
+    )
+    assert not results["input_data_owned_by_worker"].any()
+
+
+def test_fail_if_input_data_has_object_dtype(persona):
+    with pytest.raises(TypeError, match="dtype object"):
+        SharedPersona(persona.upsert_input_data({"x": np.array([None] * 3000)}))
@@ -0,0 +1,161 @@
+import dataclasses
+import datetime
+import json
+import os
+
+import dags.tree as dt
+import numpy as np
+import pytest
+
+from _gettsim_personas.persona_objects import (
+    OrigPersonaOverTime,
+    input_qnames_depending_on_evaluation_date,
+)
+from _gettsim_personas.snapshots import (
+    default_snapshot_path,
+    load_snapshot,
+    local_module_paths,
+    source_hash,
+)
+from tests.personas_for_testing import SamplePersona, SamplePersonaFromToml
+
+
+@pytest.fixture
+def sample_persona_with_snapshot(tmp_path):
+    path = SamplePersona.write_snapshot(tmp_path / "snapshot")
+    return dataclasses.replace(SamplePersona, path_to_snapshot=path)
+
+
+def test_active_periods_of_sample_persona():
+    assert SamplePersona.active_periods() == [
+        (datetime.date(1900, 1, 1), datetime.date(2009, 12, 31)),
+        (datetime.date(2010, 1, 1), datetime.date(2100, 12, 31)),
+    ]
+
+
+def test_input_qnames_depending_on_evaluation_date():
+    persona_input_elements = {
+        el.tt_qname: el
+        for el in SamplePersona.orig_elements()
+        if hasattr(el, "function")
+    }
+    assert input_qnames_depending_on_evaluation_date(persona_input_elements) == {
+        "true_if_evaluation_year_at_least_2015",
+        "qname_depending_on_evaluation_date_and_another_qname",
+    }
+
+
+def test_default_snapshot_path():
+    path = SamplePersona.path_to_persona_elements
+    assert (
+        default_snapshot_path(path) == path.parent / "_snapshots" / "persona_elements"
+    )
+
+
+def test_sample_persona_has_no_snapshot_by_default():
+    assert SamplePersona.snapshot() is None
+
+
+@pytest.mark.parametrize(
+    ("policy_date_str", "evaluation_date_str"),
+    [
+        ("2009-01-01", "2009-01-01"),
+        ("2015-01-01", "2014-01-01"),
+        ("2015-01-01", "2015-01-01"),
+    ],
+)
+def test_persona_from_snapshot_is_identical_to_persona_from_elements(
+    sample_persona_with_snapshot, policy_date_str, evaluation_date_str
+):
+    kwargs = {
+        "policy_date_str": policy_date_str,
+        "evaluation_date_str": evaluation_date_str,
+    }
+    expected = SamplePersona(**kwargs)
+    actual = sample_persona_with_snapshot(**kwargs)
+
+    assert actual.description == expected.description
+    assert actual.tt_targets_tree == expected.tt_targets_tree
+    flat_actual = dt.flatten_to_qnames(actual.input_data_tree)
+    flat_expected = dt.flatten_to_qnames(expected.input_data_tree)
+    assert list(flat_actual) == list(flat_expected)
+    for qname, array in flat_expected.items():
+        assert flat_actual[qname].dtype == array.dtype
+        np.testing.assert_array_equal(flat_actual[qname], array)
+
+
+def test_snapshot_arrays_are_read_only_memory_maps(sample_persona_with_snapshot):
+    persona = sample_persona_with_snapshot(policy_date_str="2015-01-01")
+    hh_id = persona.input_data_tree["hh_id"]
+    assert not hh_id.flags.writeable
+    assert isinstance(hh_id.base, np.memmap)
+    # Date-dependent inputs are computed live.
+    assert persona.input_data_tree["true_if_evaluation_year_at_least_2015"].all()
+
+
+def test_snapshot_stores_identical_arrays_once(sample_persona_with_snapshot):
+    snapshot = sample_persona_with_snapshot.snapshot()
+    array_files = [
+        filename
+        for interval in snapshot.intervals
+        for filename in interval.array_files.values()
+    ]
+    assert len(set(array_files)) < len(array_files)
+    assert len(list((snapshot.path / "arrays").iterdir())) == len(set(array_files))
+
+
+def test_linspace_grid_works_with_snapshot(sample_persona_with_snapshot):
+    persona = sample_persona_with_snapshot(
+        policy_date_str="2015-01-01",
+        bruttolohn_m_linspace_grid=SamplePersona.LinspaceGrid(
+            p0=SamplePersona.LinspaceRange(bottom=0, top=1),
+            p1=SamplePersona.LinspaceRange(bottom=0, top=1),
+            p2=0,
+            n_points=2,
+        ),
+    )
+    np.testing.assert_array_equal(persona.input_data_tree["hh_id"], [0, 0, 0, 1, 1, 1])
+    np.testing.assert_array_equal(
+        persona.input_data_tree["einnahmen"]["bruttolohn_m"], [0, 0, 0, 1, 1, 0]
+    )
+
+
+def test_snapshot_is_ignored_if_built_from_different_definition(tmp_path):
+    path = SamplePersona.write_snapshot(tmp_path / "snapshot")
+    persona = dataclasses.replace(SamplePersonaFromToml, path_to_snapshot=path)
+    assert persona.snapshot() is None
+
+
+def test_snapshot_with_unknown_format_version_is_ignored(tmp_path):
+    path = SamplePersona.write_snapshot(tmp_path / "snapshot")
+    index = json.loads((path / "index.json").read_text(encoding="utf-8"))
+    index["format_version"] = -1
+    (path / "index.json").write_text(json.dumps(index), encoding="utf-8")
+    assert load_snapshot(path, expected_source_hash=index["source_hash"]) is None
+
+
+def test_persona_from_snapshot_does_not_validate_active_elements(
+    sample_persona_with_snapshot, monkeypatch
+):
+    def fail(*args, **kwargs):  # noqa: ARG001
+        raise AssertionError
+
+    monkeypatch.setattr(OrigPersonaOverTime, "active_elements", fail)
+    persona = sample_persona_with_snapshot(policy_date_str="2015-01-01")
+    assert persona.input_data_tree["true_if_evaluation_year_at_least_2015"].all()
+
+
+def test_source_hash_covers_imported_local_modules(tmp_path):
+    (tmp_path / "pkg" / "areas").mkdir(parents=True)
+    (tmp_path / "pkg" / "__init__.py").write_text("")
+    (tmp_path / "pkg" / "areas" / "__init__.py").write_text("")
+    helpers = tmp_path / "pkg" / "helpers.py"
+    helpers.write_text("import numpy as np\n\nX = 1\n")
+    persona = tmp_path / "pkg" / "areas" / "persona.py"
+    persona.write_text("import datetime\n\nfrom ..helpers import X\n")
+
+    assert local_module_paths(persona) == [persona.resolve(), helpers.resolve()]
+    before = source_hash(persona)
+    helpers.write_text("import numpy as np\n\nX = 2\n")
+    os.utime(helpers, ns=(0, helpers.stat().st_mtime_ns + 1))
+    assert source_hash(persona) != before
@@ -0,0 +1,164 @@
+import datetime
+
+import dags.tree as dt
+import numpy as np
+import pytest
+
+from _gettsim_personas.persona_elements import (
+    PersonaDescription,
+    PersonaInputElement,
+    PersonaPIDElement,
+    PersonaTargetElement,
+)
+from _gettsim_personas.tabular_persona_elements import (
+    load_persona_elements_from_toml,
+)
+from tests.personas_for_testing import SamplePersona, SamplePersonaFromToml
+
+
+def test_toml_persona_has_same_orig_elements_as_python_persona():
+    def summary(elements):
+        return {
+            (
+                type(el).__name__,
+                el.orig_name,
+                getattr(el, "tt_qname", None),
+                getattr(el, "start_date", None),
+                getattr(el, "end_date", None),
+            )
+            for el in elements
+        }
+
+    assert summary(SamplePersonaFromToml.orig_elements()) == summary(
+        SamplePersona.orig_elements()
+    )
+
+
+@pytest.mark.parametrize(
+    ("policy_date_str", "evaluation_date_str"),
+    [
+        ("2009-01-01", "2009-01-01"),
+        ("2015-01-01", "2014-01-01"),
+        ("2015-01-01", "2015-01-01"),
+    ],
+)
+def test_toml_persona_produces_same_persona_as_python_persona(
+    policy_date_str, evaluation_date_str
+):
+    kwargs = {
+        "policy_date_str": policy_date_str,
+        "evaluation_date_str": evaluation_date_str,
+    }
+    expected = SamplePersona(**kwargs)
+    actual = SamplePersonaFromToml(**kwargs)
+
+    assert actual.description == expected.description
+    assert actual.tt_targets_tree == expected.tt_targets_tree
+    flat_actual = dt.flatten_to_qnames(actual.input_data_tree)
+    flat_expected = dt.flatten_to_qnames(expected.input_data_tree)
+    assert flat_actual.keys() == flat_expected.keys()
+    for qname, array in flat_expected.items():
+        assert flat_actual[qname].dtype == array.dtype
+        np.testing.assert_array_equal(flat_actual[qname], array)
+
+
+def test_toml_persona_supports_linspace_grid():
+    persona = SamplePersonaFromToml(
+        policy_date_str="2015-01-01",
+        bruttolohn_m_linspace_grid=SamplePersonaFromToml.LinspaceGrid(
+            p0=SamplePersonaFromToml.LinspaceRange(bottom=0, top=1),
+            p1=SamplePersonaFromToml.LinspaceRange(bottom=0, top=1),
+            p2=0,
+            n_points=2,
+        ),
+    )
+    np.testing.assert_array_equal(
+        persona.input_data_tree["einnahmen"]["bruttolohn_m"],
+        np.array([0, 0, 0, 1, 1, 0]),
+    )
+
+
+def test_load_persona_elements_from_toml(tmp_path):
+    path = tmp_path / "persona.toml"
+    path.write_text(
+        """
+p_id = [0, 1]
+
+[[description]]
+description = "A couple."
+
+[[input]]
+qname = "alter"
+values = [30, 40]
+start_date = "2005-01-01"
+
+[[input]]
+qname = "geburtsjahr"
+formula = "evaluation_date.year - alter"
+
+[[target]]
+qname = "einkommensteuer__betrag_m_sn"
+end_date = 2024-12-31
+""",
+        encoding="utf-8",
+    )
+    elements = {
+        getattr(el, "tt_qname", "description"): el
+        for el in load_persona_elements_from_toml(path)
+    }
+
+    assert isinstance(elements["p_id"], PersonaPIDElement)
+    assert elements["p_id"].persona_size == 2
+    assert isinstance(elements["description"], PersonaDescription)
+    assert isinstance(elements["alter"], PersonaInputElement)
+    assert elements["alter"].start_date == datetime.date(2005, 1, 1)
+    assert isinstance(elements["einkommensteuer__betrag_m_sn"], PersonaTargetElement)
+    assert elements["einkommensteuer__betrag_m_sn"].end_date == datetime.date(
+        2024, 12, 31
+    )
+    np.testing.assert_array_equal(
+        elements["geburtsjahr"](
+            evaluation_date=datetime.date(2020, 1, 1), alter=np.array([30, 40])
+        ),
+        np.array([1990, 1980]),
+    )
+
+
+def test_loading_from_toml_is_cached(tmp_path):
+    path = tmp_path / "persona.toml"
+    path.write_text('p_id = [0]\n\n[[description]]\ndescription = ""\n')
+    first = load_persona_elements_from_toml(path)
+    second = load_persona_elements_from_toml(path)
+    assert all(a is b for a, b in zip(first, second, strict=True))
+
+
+@pytest.mark.parametrize(
+    ("content", "match"),
+    [
+        ('[[description]]\ndescription = ""\n', "Expected a top-level 'p_id'"),
+        ("p_id = [0]\n\n[[foo]]\nbar = 1\n", r"Unknown sections .* \['foo'\]"),
+        (
+            'p_id = [0]\n\n[[input]]\nqname = "a"\nvalue = [1]\n',
+            r"Unknown keys in 'input' table .* \['value'\]",
+        ),
+        (
+            "p_id = [0]\n\n[[target]]\nstart_date = 2005-01-01\n",
+            r"Missing keys in 'target' table .* \['qname'\]",
+        ),
+        (
+            'p_id = [0]\n\n[[input]]\nqname = "a"\n',
+            "must specify exactly one of 'values' and 'formula'",
+        ),
+        (
+            'p_id = [0]\n\n[[input]]\nqname = "a"\nvalues = [1]\nformula = "1"\n',
+            "must specify exactly one of 'values' and 'formula'",
+        ),
+    ],
+)
+def test_load_persona_elements_from_toml_fails_for_invalid_spec(
+    tmp_path, content, match
+):
+    path = tmp_path / "persona.toml"
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(ValueError, match=match):
+        load_persona_elements_from_toml(path)
@@ -2,12 +2,14 @@ import dags.tree as dt
 import numpy as np
 import pytest
 
+from _gettsim_personas.batch import PersonaBatch
 from _gettsim_personas.upsert import (
     broadcast_foreign_keys,
     broadcast_group_ids,
     broadcast_p_id,
-    upsert_input_data,
+    smallest_int_dtype,
 )
+from tests.personas_for_testing import SamplePersona
 
 
 @pytest.mark.parametrize(
@@ -50,7 +52,9 @@ def test_broadcasting_p_id_fails_if_p_id_is_not_starting_with_0():
         (np.array([0, 1, 2]), 3, np.array([0, 1, 2])),
         (np.array([0, 1, 2]), 6, np.array([0, 1, 2, 3, 4, 5])),
         (np.array([0, 0, 0]), 6, np.array([0, 0, 0, 1, 1, 1])),
-        (np.array([0, 3, 5]), 6, np.array([0, 3, 5, 6, 9, 11])),
+        (np.array([0, 3, 5]), 6, np.array([0, 1, 2, 3, 4, 5])),
+        (np.array([3, 3, 1]), 6, np.array([1, 1, 0, 3, 3, 2])),
+        (np.array([-1, 2, 2]), 9, np.array([-1, 0, 0, -1, 1, 1, -1, 2, 2])),
     ],
 )
 def test_broadcast_array_with_group_or_foreign_keys(
@@ -60,6 +64,33 @@ def test_broadcast_array_with_group_or_foreign_keys(
     assert np.array_equal(broadcasted_array, expected_array)
 
 
+def test_broadcast_group_ids_does_not_mutate_input():
+    original_array = np.array([0, 0, 1])
+    broadcast_group_ids(original_array, 6)
+    assert np.array_equal(original_array, [0, 0, 1])
+
+
+@pytest.mark.parametrize(
+    ("n_copies", "expected_dtype"),
+    [(1, np.int8), (64, np.int8), (65, np.int16), (20_000, np.int32)],
+)
+def test_broadcast_group_ids_uses_smallest_safe_dtype(n_copies, expected_dtype):
+    broadcasted_array = broadcast_group_ids(np.array([0, 1]), 2 * n_copies)
+    assert broadcasted_array.dtype == expected_dtype
+    assert broadcasted_array[-1] == 2 * n_copies - 1
+
+
+def test_broadcast_group_ids_with_as_many_groups_as_the_dtype_holds_plus_one():
+    broadcasted_array = broadcast_group_ids(np.arange(128), 128)
+    assert broadcasted_array.dtype == np.int8
+    assert np.array_equal(broadcasted_array, np.arange(128))
+
+
+def test_smallest_int_dtype_fails_if_ids_do_not_fit():
+    with pytest.raises(OverflowError, match="64-bit"):
+        smallest_int_dtype(2**63)
+
+
 @pytest.mark.parametrize(
     (
         "original_array",
@@ -114,6 +145,7 @@ def test_broadcast_foreign_keys(original_array, expected_length, expected_array)
         # nested array updated with grouping variable broadcasted
         (
             {
+                "p_id": np.array([0, 1, 2]),
                 "a": {"b": np.array([0, 1, 2])},
                 "c_id": np.array([0, 2, 2]),
             },
@@ -121,13 +153,15 @@ def test_broadcast_foreign_keys(original_array, expected_length, expected_array)
                 "a": {"b": np.array([0, 1, 2, 3, 4, 5])},
             },
             {
+                "p_id": np.array([0, 1, 2, 3, 4, 5]),
                 "a": {"b": np.array([0, 1, 2, 3, 4, 5])},
-                "c_id": np.array([0, 2, 2, 3, 5, 5]),
+                "c_id": np.array([0, 1, 1, 2, 3, 3]),
             },
         ),
         # nested array updated with foreign key broadcasted
         (
             {
+                "p_id": np.array([0, 1, 2]),
                 "a": {"b": np.array([0, 1, 2])},
                 "c_p_id_d": np.array([0, -1, 2]),
             },
@@ -135,6 +169,7 @@ def test_broadcast_foreign_keys(original_array, expected_length, expected_array)
                 "a": {"b": np.array([0, 1, 2, 3, 4, 5])},
             },
             {
+                "p_id": np.array([0, 1, 2, 3, 4, 5]),
                 "a": {"b": np.array([0, 1, 2, 3, 4, 5])},
                 "c_p_id_d": np.array([0, -1, 2, 3, -1, 5]),
             },
@@ -142,6 +177,7 @@ def test_broadcast_foreign_keys(original_array, expected_length, expected_array)
         # nested array inserted with standard array broadcasted
         (
             {
+                "p_id": np.array([0, 1, 2]),
                 "a": {"b": np.array([0, 1, 2])},
                 "c": np.array([True, False, True]),
             },
@@ -149,6 +185,7 @@ def test_broadcast_foreign_keys(original_array, expected_length, expected_array)
                 "a": {"b": np.array([0, 1, 2, 3, 4, 5])},
             },
             {
+                "p_id": np.array([0, 1, 2, 3, 4, 5]),
                 "a": {"b": np.array([0, 1, 2, 3, 4, 5])},
                 "c": np.array([True, False, True, True, False, True]),
             },
@@ -156,7 +193,11 @@ def test_broadcast_foreign_keys(original_array, expected_length, expected_array)
     ],
 )
 def test_upsert_input_data(data_from_persona, data_to_upsert, expected_upserted_data):
-    upserted_data = upsert_input_data(data_from_persona, data_to_upsert)
+    upserted_data = (
+        PersonaBatch.from_tree(data_from_persona)
+        .upsert(dt.flatten_to_qnames(data_to_upsert))
+        .to_tree()
+    )
     flat_upserted_data = dt.flatten_to_tree_paths(upserted_data)
     flat_expected_upserted_data = dt.flatten_to_tree_paths(expected_upserted_data)
 
@@ -166,50 +207,36 @@ def test_upsert_input_data(data_from_persona, data_to_upsert, expected_upserted_
         assert np.array_equal(flat_upserted_data[key], flat_expected_upserted_data[key])
 
 
-def test_upsert_input_data_fails_if_upserted_data_is_not_dict():
-    data_from_persona = {
-        "p_id": np.array([0, 1, 2]),
-        "a": np.array([0, 1, 2]),
-    }
-    data_to_upsert = "not a dict"
+@pytest.fixture
+def persona():
+    return SamplePersona(policy_date_str="2020-01-01")
+
+
+def test_upsert_input_data_fails_if_upserted_data_is_not_dict(persona):
     match = "data_to_upsert must be a dictionary."
     with pytest.raises(TypeError, match=match):
-        upsert_input_data(data_from_persona, data_to_upsert)  # ty: ignore[invalid-argument-type]
+        persona.upsert_input_data("not a dict")  # ty: ignore[invalid-argument-type]
 
 
-def test_upsert_input_data_fails_if_data_to_upsert_is_not_dict_with_array_leafs():
-    data_from_persona = {
-        "p_id": np.array([0, 1, 2]),
-        "a": np.array([0, 1, 2]),
-    }
-    data_to_upsert = {"a": "not a array"}
+def test_upsert_input_data_fails_if_data_to_upsert_is_not_dict_with_array_leafs(
+    persona,
+):
     match = "All leafs in data_to_upsert must be numpy Arrays or lists."
     with pytest.raises(TypeError, match=match):
-        upsert_input_data(data_from_persona, data_to_upsert)
+        persona.upsert_input_data({"a": "not a array"})
 
 
-def test_upsert_input_data_fails_if_data_lengths_are_incompatible():
-    data_from_persona = {
-        "p_id": np.array([0, 1, 2]),
-        "a": np.array([0, 1, 2]),
-    }
-    data_to_upsert = {
-        "a": np.array([0, 1, 2, 3, 4]),
-    }
+def test_upsert_input_data_fails_if_data_lengths_are_incompatible(persona):
     match = "The length of data in data_to_upsert is not a multiple"
     with pytest.raises(ValueError, match=match):
-        upsert_input_data(data_from_persona, data_to_upsert)
+        persona.upsert_input_data({"a": np.array([0, 1, 2, 3, 4])})
 
 
-def test_upsert_input_data_fails_if_length_of_data_in_to_upsert_different():
-    data_from_persona = {
-        "p_id": np.array([0, 1, 2]),
-        "a": np.array([0, 1, 2]),
-    }
+def test_upsert_input_data_fails_if_length_of_data_in_to_upsert_different(persona):
     data_to_upsert = {
         "a": np.array([0, 1, 2, 3, 4]),
         "b": np.array([0, 1, 2, 3]),
     }
     match = "The length of data in data_to_upsert differ"
     with pytest.raises(ValueError, match=match):
-        upsert_input_data(data_from_persona, data_to_upsert)
+        persona.upsert_input_data(data_to_upsert)
@@ -8,6 +8,9 @@ from _gettsim_personas.persona_objects import OrigPersonaOverTime
 SamplePersona = OrigPersonaOverTime(
     path_to_persona_elements=Path(__file__).parent / "persona_elements.py"
 )
+SamplePersonaFromToml = OrigPersonaOverTime(
+    path_to_persona_elements=Path(__file__).parent / "persona_elements.toml"
+)
 SamplePersonaWithStartAndEndDate = OrigPersonaOverTime(
     start_date=datetime.date(2015, 1, 1),
     path_to_persona_elements=Path(__file__).parent / "persona_elements.py",
@@ -21,10 +24,16 @@ SamplePersonaWithInvalidLengthOfInputData = OrigPersonaOverTime(
     path_to_persona_elements=Path(__file__).parent
     / "persona_elements_with_invalid_length_of_input_data.py"
 )
+SamplePersonaEvaluatedWithGettsim = OrigPersonaOverTime(
+    path_to_persona_elements=Path(__file__).parent
+    / "persona_elements_evaluated_with_gettsim.py"
+)
 
 
 __all__ = [
     "SamplePersona",
+    "SamplePersonaEvaluatedWithGettsim",
+    "SamplePersonaFromToml",
     "SamplePersonaWithOverlappingElements",
     "SamplePersonaWithStartAndEndDate",
 ]
@@ -0,0 +1,50 @@
+"""Inputs of `einkommensteuer_sozialabgaben.Couple1Child` with targets that GETTSIM
+computes without pension inputs.
+
+Used by the tests that evaluate personas with GETTSIM instead of a fake.
+"""
+
+from _gettsim_personas.de.einkommensteuer_sozialabgaben.couple_1_child import (  # noqa: F401
+    alter,
+    arbeitsstunden_w,
+    behinderungsgrad,
+    description,
+    einkommensteuer__abzüge__beitrag_private_rentenversicherung_m,
+    einkommensteuer__abzüge__kinderbetreuungskosten_m,
+    einkommensteuer__abzüge__p_id_kinderbetreuungskostenträger,
+    einkommensteuer__einkünfte__aus_forst_und_landwirtschaft__betrag_m,
+    einkommensteuer__einkünfte__aus_gewerbebetrieb__betrag_m,
+    einkommensteuer__einkünfte__aus_nichtselbstständiger_arbeit__tatsächliche_werbungskosten_y,
+    einkommensteuer__einkünfte__aus_selbstständiger_arbeit__betrag_m,
+    einkommensteuer__einkünfte__aus_vermietung_und_verpachtung__betrag_m,
+    einkommensteuer__einkünfte__ist_hauptberuflich_selbstständig,
+    einkommensteuer__einkünfte__sonstige__alle_weiteren_m,
+    einkommensteuer__einkünfte__sonstige__rente__betrag_m,
+    einkommensteuer__gemeinsam_veranlagt,
+    einnahmen__bruttolohn_m,
+    einnahmen__kapitalerträge_y,
+    familie__alleinerziehend,
+    familie__p_id_ehepartner,
+    familie__p_id_elternteil_1,
+    familie__p_id_elternteil_2,
+    geburtsjahr,
+    hh_id,
+    kindergeld__in_ausbildung,
+    kindergeld__p_id_empfänger,
+    p_id,
+    sozialversicherung__kranken__beitrag__bemessungsgrundlage_rente_m,
+    sozialversicherung__kranken__beitrag__privat_versichert,
+    sozialversicherung__pflege__beitrag__hat_kinder,
+    wohnort_ost_hh,
+)
+from _gettsim_personas.persona_elements import persona_target_element
+
+
+@persona_target_element()
+def sozialversicherung__beiträge_versicherter_m_hh() -> None:  # noqa: PLC2401
+    pass
+
+
+@persona_target_element()
+def kindergeld__betrag_m_hh() -> None:
+    pass
@@ -1,7 +1,37 @@
+import asyncio
+import datetime
+import json
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import dags.tree as dt
 import numpy as np
+import pytest
 from gettsim import InputData, MainTarget, TTTargets, main
+from numpy.testing import assert_allclose
+from ttsim.tt.param_objects import ScalarParam
 
+from _gettsim_personas import cli
+from _gettsim_personas.atlas import PersonaAtlas
+from _gettsim_personas.cli import SweepTask, evaluate_sweep_task
+from _gettsim_personas.evaluation import cached_policy_environment
+from _gettsim_personas.persona_objects import LinspaceRange
+from _gettsim_personas.service import PersonaService, make_server
+from gettsim_personas import (
+    JittedPersonaEvaluator,
+    aevaluate,
+    evaluate,
+    evaluate_linspace_grid,
+    evaluate_policy_variants,
+)
 from gettsim_personas.einkommensteuer_sozialabgaben import Couple1Child
+from tests.personas_for_testing import SamplePersonaEvaluatedWithGettsim
+
+TT_TARGETS_TREE = {
+    "kindergeld": {"betrag_m_hh": None},
+    "sozialversicherung": {"beiträge_versicherter_m_hh": None},
+}
 
 
 def test_end_to_end():
@@ -58,3 +88,219 @@ def test_can_upsert_input_data():
         upserted_persona.input_data_tree["einnahmen"]["bruttolohn_m"],
         np.array([1, 2, 3, 4, 5, 6]),
     )
+
+
+def test_evaluate_linspace_grid_equals_evaluation_of_grid_persona():
+    grid = Couple1Child.LinspaceGrid(
+        p0=Couple1Child.LinspaceRange(bottom=0, top=8000),
+        p1=Couple1Child.LinspaceRange(bottom=0, top=1000),
+        p2=0,
+        n_points=7,
+    )
+    expected = evaluate(
+        Couple1Child(
+            policy_date_str="2024-01-01",
+            tt_targets_tree=TT_TARGETS_TREE,
+            bruttolohn_m_linspace_grid=grid,
+        )
+    )
+    actual = evaluate_linspace_grid(
+        Couple1Child(policy_date_str="2024-01-01", tt_targets_tree=TT_TARGETS_TREE),
+        grid,
+    )
+    for qname, values in dt.flatten_to_qnames(expected).items():
+        assert_allclose(dt.flatten_to_qnames(actual)[qname], values)
+
+
+def test_jax_backend_equals_numpy_backend():
+    pytest.importorskip("jax")
+    kwargs = {
+        "policy_date_str": "2024-01-01",
+        "tt_targets_tree": TT_TARGETS_TREE,
+        "bruttolohn_m_linspace_grid": Couple1Child.LinspaceGrid(
+            p0=Couple1Child.LinspaceRange(bottom=0, top=8000),
+            p1=0,
+            p2=0,
+            n_points=7,
+        ),
+    }
+    expected = dt.flatten_to_qnames(evaluate(Couple1Child(**kwargs)))
+    jax_persona = Couple1Child(**kwargs, backend="jax")
+    # JAX computes in single precision by default.
+    for results in (evaluate(jax_persona), JittedPersonaEvaluator(jax_persona)()):
+        for qname, values in dt.flatten_to_qnames(results).items():
+            assert_allclose(np.asarray(values), expected[qname], atol=0.05)
+
+
+def test_marginal_rates_equal_central_differences():
+    pytest.importorskip("jax")
+    tt_targets_tree = {"sozialversicherung": {"beiträge_versicherter_m_hh": None}}
+    persona = Couple1Child(
+        policy_date_str="2024-01-01",
+        tt_targets_tree=tt_targets_tree,
+        bruttolohn_m_linspace_grid=Couple1Child.LinspaceGrid(
+            p0=Couple1Child.LinspaceRange(bottom=300, top=8000),
+            p1=0,
+            p2=0,
+            n_points=12,
+        ),
+        backend="jax",
+    )
+    evaluator = JittedPersonaEvaluator(persona, rounding=False)
+    rates = evaluator.marginal_rates(tt_targets_tree)
+
+    # Differentiate with respect to the earnings of the first member. Grid points are
+    # away from the kinks of the contribution schedule.
+    bruttolohn_m = np.asarray(persona.input_data_tree["einnahmen"]["bruttolohn_m"])
+    is_p0 = np.arange(len(bruttolohn_m)) % 3 == 0
+
+    def contributions(step):
+        results = evaluator(
+            {"einnahmen": {"bruttolohn_m": bruttolohn_m + step * is_p0}}
+        )
+        return np.asarray(results["sozialversicherung"]["beiträge_versicherter_m_hh"])
+
+    central_differences = (contributions(1.0) - contributions(-1.0)) / 2
+    assert_allclose(
+        np.asarray(rates["sozialversicherung"]["beiträge_versicherter_m_hh"])[is_p0],
+        central_differences[is_p0],
+        atol=1e-3,
+    )
+
+
+def test_service_round_trip_equals_evaluate():
+    service = PersonaService(personas={"Couple1Child": Couple1Child}, batch_window=1)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/evaluate"
+    bruttolohn_m = [[3000, 0, 0], [5000, 1000, 0]]
+
+    def post(bruttolohn_m):
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(
+                {
+                    "persona": "Couple1Child",
+                    "policy_date": "2024-01-01",
+                    "input_data": {"einnahmen": {"bruttolohn_m": bruttolohn_m}},
+                }
+            ).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request) as response:  # noqa: S310
+            return json.loads(response.read())
+
+    try:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(post, bruttolohn_m))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for values, result in zip(bruttolohn_m, results, strict=True):
+        expected = evaluate(
+            Couple1Child(policy_date_str="2024-01-01").upsert_input_data(
+                {"einnahmen": {"bruttolohn_m": np.array(values)}}
+            )
+        )
+        for qname, array in dt.flatten_to_qnames(expected).items():
+            assert_allclose(dt.flatten_to_qnames(result)[qname], array)
+
+
+def test_evaluate_policy_variants_with_modified_parameter():
+    persona = Couple1Child(
+        policy_date_str="2024-01-01", tt_targets_tree=TT_TARGETS_TREE
+    )
+    satz_m = cached_policy_environment(persona.policy_date)["kindergeld"]["satz_m"]
+    results = evaluate_policy_variants(
+        persona,
+        {
+            "status_quo": {},
+            "higher_kindergeld": {
+                "kindergeld": {
+                    "satz_m": ScalarParam(
+                        value=300,
+                        unit=satz_m.unit,
+                        start_date=satz_m.start_date,
+                        end_date=satz_m.end_date,
+                    )
+                }
+            },
+        },
+    )
+    assert_allclose(results["status_quo"]["kindergeld"]["betrag_m_hh"], 250)
+    assert_allclose(results["higher_kindergeld"]["kindergeld"]["betrag_m_hh"], 300)
+
+
+def test_sweep_task_equals_evaluation_of_grid_persona(monkeypatch):
+    monkeypatch.setattr(
+        cli, "persona_registry", lambda: {"sample": SamplePersonaEvaluatedWithGettsim}
+    )
+    table, n_households = evaluate_sweep_task(
+        SweepTask(
+            persona_name="sample",
+            policy_date=datetime.date(2024, 1, 1),
+            grid=((0, LinspaceRange(bottom=0, top=8000)),),
+            n_points=5,
+        )
+    )
+    base_persona = SamplePersonaEvaluatedWithGettsim(policy_date_str="2024-01-01")
+    _, p1, p2 = base_persona.input_data_tree["einnahmen"]["bruttolohn_m"].tolist()
+    expected = evaluate(
+        SamplePersonaEvaluatedWithGettsim(
+            policy_date_str="2024-01-01",
+            bruttolohn_m_linspace_grid=SamplePersonaEvaluatedWithGettsim.LinspaceGrid(
+                p0=LinspaceRange(bottom=0, top=8000), p1=p1, p2=p2, n_points=5
+            ),
+        )
+    )
+
+    assert n_households == 5
+    for qname, values in dt.flatten_to_qnames(expected).items():
+        assert_allclose(table[qname], values)
+
+
+def test_atlas_of_sample_persona_equals_evaluate(tmp_path, monkeypatch):
+    personas = {"sample": SamplePersonaEvaluatedWithGettsim}
+    monkeypatch.setattr(cli, "persona_registry", lambda: personas)
+    atlas = PersonaAtlas(tmp_path / "atlas", personas=personas)
+    policy_dates = [datetime.date(2023, 1, 1), datetime.date(2024, 1, 1)]
+
+    first = atlas.build(policy_dates)
+    second = atlas.build(policy_dates)
+
+    assert len(first.recomputed) == 2
+    assert second.recomputed == ()
+    for policy_date in policy_dates:
+        expected = evaluate(
+            SamplePersonaEvaluatedWithGettsim(policy_date_str=policy_date.isoformat())
+        )
+        table = atlas.load("sample", policy_date)
+        for qname, values in dt.flatten_to_qnames(expected).items():
+            assert_allclose(table[qname], values)
+
+
+def test_aevaluate_of_sample_persona_equals_evaluate():
+    input_data_to_upsert = {
+        "einnahmen": {"bruttolohn_m": np.array([3000, 0, 0, 5000, 1000, 0])}
+    }
+
+    async def run():
+        return await asyncio.gather(
+            aevaluate(SamplePersonaEvaluatedWithGettsim, policy_date_str="2024-01-01"),
+            aevaluate(
+                SamplePersonaEvaluatedWithGettsim,
+                policy_date_str="2024-01-01",
+                input_data_to_upsert=input_data_to_upsert,
+            ),
+        )
+
+    default, upserted = asyncio.run(run())
+
+    persona = SamplePersonaEvaluatedWithGettsim(policy_date_str="2024-01-01")
+    for results, expected in (
+        (default, evaluate(persona)),
+        (upserted, evaluate(persona.upsert_input_data(input_data_to_upsert))),
+    ):
+        for qname, values in dt.flatten_to_qnames(expected).items():
+            assert_allclose(dt.flatten_to_qnames(results)[qname], values)